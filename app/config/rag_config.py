@@ -154,11 +154,46 @@ class RAGConfig(BaseSettings):
         alias="ENABLE_HYBRID_SEARCH",
         description="Enable hybrid search"
     )
+    enable_sparse_vectors: bool = Field(
+        default=True,
+        alias="ENABLE_SPARSE_VECTORS",
+        description="Store BM25 sparse vectors for hybrid search"
+    )
+    enable_hierarchical_search: bool = Field(
+        default=False,
+        alias="ENABLE_HIERARCHICAL_SEARCH",
+        description="Route paragraph search through section-level vectors"
+    )
+    hierarchical_coarse_top_k: int = Field(
+        default=3,
+        alias="HIERARCHICAL_COARSE_TOP_K",
+        description="Number of sections searched at paragraph level"
+    )
+    hierarchical_section_size: int = Field(
+        default=20,
+        alias="HIERARCHICAL_SECTION_SIZE",
+        description="Paragraphs per section for documents without explicit sections"
+    )
+    rag_expansion_confidence_threshold: float = Field(
+        default=0.7,
+        alias="RAG_EXPANSION_CONFIDENCE_THRESHOLD",
+        description="First-pass top score above which query expansion is skipped"
+    )
     rag_search_timeout: float = Field(
         default=5.0,
         alias="RAG_SEARCH_TIMEOUT",
         description="Search timeout in seconds"
     )
+    enable_warm_start: bool = Field(
+        default=True,
+        alias="ENABLE_WARM_START",
+        description="Restore the knowledge base from the vector store at startup"
+    )
+    warm_start_page_size: int = Field(
+        default=1024,
+        alias="WARM_START_PAGE_SIZE",
+        description="Points fetched per scroll request during warm start"
+    )
     
     # Fallback Embeddings (kept for backward compatibility)
     fallback_embedding_model: str = Field(
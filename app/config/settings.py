@@ -84,6 +84,22 @@ class Settings(BaseSettings):
     qdrant_hnsw_config_ef_construct: int = 100
     qdrant_timeout: int = 30
 
+    # Analysis pipeline
+    analysis_concurrency: int = 4  # Block windows assessed concurrently
+    analysis_reference_batch_size: int = 32  # Blocks per reference lookup window
+    analysis_cascade: bool = True  # Retrieve references only for flagged or borderline blocks
+    analysis_assessment_cache_size: int = 10000  # Block assessments reused across analyses
+    analysis_max_concurrent: int = 2  # Analyses running at once; the rest wait in per-client queues
+    analysis_max_queued: int = 50  # Waiting analyses before new ones are rejected with 503
+    analysis_archive_dir: str = "storage/analyses"  # Finished analyses as gzip JSON, loaded on demand
+    analysis_retained: int = 32  # Finished analyses kept in memory besides the archive
+    analysis_retention_seconds: float = 900.0  # Finished analyses older than this are served from the archive
+    analysis_job_backend: str = "memory"  # memory, sqlite or redis; the latter two are shared by workers
+    analysis_job_sqlite_path: str = "storage/analysis_jobs.sqlite3"
+    analysis_job_redis_url: Optional[str] = None
+    analysis_job_lease_seconds: float = 120.0  # A job is resumed elsewhere when its worker stops renewing
+    analysis_job_run_in_api: bool = True  # Run new analyses in the API process instead of only queueing them
+
     class Config:
         env_file = ".env"
         case_sensitive = False
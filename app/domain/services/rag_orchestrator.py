@@ -8,10 +8,12 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import re
-from typing import List, Optional, Dict, Any
+import uuid
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Set, Tuple
 from dataclasses import dataclass
 from datetime import datetime
+
+import numpy as np
 import heapq
 
 from app.infrastructure.services.embedding_service import (
@@ -22,9 +24,38 @@ from app.infrastructure.services.vector_database_service import (
     VectorDatabaseService,
     VectorSearchResult,
 )
+from app.infrastructure.services.query_context import RAGQueryContext
+from app.infrastructure.services.query_expansion import CooccurrenceQueryExpander
+from app.infrastructure.services.sparse_encoder import BM25SparseEncoder
+from app.infrastructure.services.text_tokenizer import (
+    count_overlap,
+    term_ids,
+    tokenize,
+)
 
 logger = logging.getLogger(__name__)
 
+# Payload fields holding index-time token statistics, hidden from result metadata
+_LEXICAL_PAYLOAD_FIELDS = ("term_ids", "metadata_term_ids", "token_count")
+# Payload fields added by indexing rather than taken from document metadata
+_INTERNAL_PAYLOAD_FIELDS = frozenset({
+    "text", "embedding_model", "batch_indexed", "batch_size", "indexed_at", "section_id",
+    *_LEXICAL_PAYLOAD_FIELDS,
+})
+# Paragraph filter keys mirrored in the section point payloads
+_SECTION_FILTER_FIELDS = ("document_id", "categories")
+_IMPORTANT_TERMS = ('script', 'rating', 'analysis', 'content', 'review')
+
+
+def _freeze(filter_metadata: Optional[Dict[str, Any]]) -> Hashable:
+    """Hashable form of a metadata filter for memo keys."""
+    if not filter_metadata:
+        return None
+    return tuple(sorted(
+        (key, tuple(sorted(value, key=str)) if isinstance(value, (list, tuple, set)) else value)
+        for key, value in filter_metadata.items()
+    ))
+
 
 @dataclass
 class RAGDocument:
@@ -42,6 +73,8 @@ class RAGSearchResult:
     score: float
     metadata: Dict[str, Any]
     embedding_model: Optional[str] = None
+    term_ids: Optional[List[int]] = None
+    metadata_term_ids: Optional[List[int]] = None
 
 
 @dataclass
@@ -67,6 +100,8 @@ class RAGMetrics:
     cache_hit_rate: float
     vector_db_status: str
     embedding_service_status: str
+    hierarchical_searches: int = 0
+    candidates_pruned: int = 0
 
 
 class RAGOrchestrator:
@@ -79,8 +114,8 @@ class RAGOrchestrator:
     - Legacy KnowledgeBase for backward compatibility
     
     Features:
-    - Document indexing with automatic embedding
-    - Hybrid search (vector + fallback)
+    - Document indexing with automatic dense and BM25 sparse vectors
+    - Hybrid search (dense + sparse with reciprocal rank fusion)
     - Metrics and monitoring
     - Error handling with retries
     - Graceful degradation
@@ -97,6 +132,14 @@ class RAGOrchestrator:
         max_query_expansions: int = 3,
         batch_indexing_size: int = 50,
         cache_embeddings: bool = True,
+        sparse_encoder: Optional[BM25SparseEncoder] = None,
+        hybrid_prefetch_multiplier: int = 4,
+        stem_tokens: bool = True,
+        coarse_vector_db_service: Optional[VectorDatabaseService] = None,
+        coarse_top_k: int = 3,
+        section_size: int = 20,
+        query_expander: Optional[CooccurrenceQueryExpander] = None,
+        expansion_confidence_threshold: float = 0.7,
     ):
         """
         Initialize RAGOrchestrator with performance optimizations.
@@ -111,6 +154,16 @@ class RAGOrchestrator:
             max_query_expansions: Maximum number of query expansions
             batch_indexing_size: Batch size for document indexing
             cache_embeddings: Enable embedding caching
+            sparse_encoder: Encoder for BM25 sparse vectors
+            hybrid_prefetch_multiplier: Candidates per hybrid leg relative to top_k
+            stem_tokens: Stem Russian tokens for index-time term ids
+            coarse_vector_db_service: Optional section-level collection enabling
+                coarse-to-fine retrieval
+            coarse_top_k: Number of sections searched at paragraph level
+            section_size: Paragraphs per section when documents have no sections
+            query_expander: Corpus-driven expander fed at indexing time
+            expansion_confidence_threshold: First-pass top score above which
+                query expansion is skipped
         """
         self.embedding_service = embedding_service
         self.vector_db_service = vector_db_service
@@ -121,27 +174,43 @@ class RAGOrchestrator:
         self.max_query_expansions = max_query_expansions
         self.batch_indexing_size = batch_indexing_size
         self.cache_embeddings = cache_embeddings
+        self.sparse_encoder = sparse_encoder or BM25SparseEncoder()
+        self.hybrid_prefetch_multiplier = hybrid_prefetch_multiplier
+        self.stem_tokens = stem_tokens
+        self._important_term_ids = frozenset(term_ids(_IMPORTANT_TERMS, stem=stem_tokens))
+        self.coarse_vector_db_service = coarse_vector_db_service
+        self.coarse_top_k = coarse_top_k
+        self.section_size = max(1, section_size)
+        self.query_expander = query_expander or CooccurrenceQueryExpander(
+            max_terms=max_query_expansions,
+        )
+        self.expansion_confidence_threshold = expansion_confidence_threshold
+
+        # Coarse-to-fine index state: running vector sums and sizes per section,
+        # mirrored in the section point payloads and loaded before the first update
+        self._section_sums: Dict[str, np.ndarray] = {}
+        self._section_sizes: Dict[str, int] = {}
+        self._section_documents: Dict[str, str] = {}
+        self._section_categories: Dict[str, Set[str]] = {}
+        self._point_sections: Dict[str, str] = {}
+        self._sections_loaded = False
+        self._sections_lock = asyncio.Lock()
 
         self._lock = asyncio.Lock()
 
-        # Query expansion terms for common concepts
-        self._query_expansion_terms = {
-            "ai": ["artificial intelligence", "machine learning", "neural networks", "deep learning"],
-            "ml": ["machine learning", "algorithms", "data science", "statistics"],
-            "data": ["information", "dataset", "database", "analytics"],
-            "script": ["screenplay", "manuscript", "story", "narrative"],
-            "rating": ["evaluation", "assessment", "classification", "analysis"],
-        }
-
         # Metrics
         self._metrics = {
             "indexed_documents": 0,
             "total_searches": 0,
+            "hybrid_searches": 0,
             "successful_searches": 0,
             "failed_searches": 0,
             "search_times_ms": [],
             "query_expansions_used": 0,
+            "expansions_skipped": 0,
             "reranking_applied": 0,
+            "hierarchical_searches": 0,
+            "candidates_pruned": 0,
             "cache_hits": 0,
             "cache_misses": 0,
             "errors": 0,
@@ -152,6 +221,8 @@ class RAGOrchestrator:
         try:
             await self.embedding_service.initialize()
             await self.vector_db_service.initialize()
+            if self.coarse_vector_db_service:
+                await self.coarse_vector_db_service.initialize()
             logger.info("RAGOrchestrator initialized successfully")
         except Exception as e:
             logger.error(f"Error initializing RAGOrchestrator: {e}")
@@ -161,6 +232,8 @@ class RAGOrchestrator:
         """Close all service connections."""
         await self.embedding_service.close()
         await self.vector_db_service.close()
+        if self.coarse_vector_db_service:
+            await self.coarse_vector_db_service.close()
 
     async def index_document(
         self,
@@ -180,15 +253,19 @@ class RAGOrchestrator:
         try:
             # Generate embedding
             embedding_result = await self.embedding_service.embed_text(document.text)
-            
+            section_payload = self._section_payload(document)
+
             # Prepare document for vector DB
             vector_doc = {
                 "id": document.id,
                 "vector": embedding_result.embedding,
+                "sparse_vector": self.sparse_encoder.encode_document(document.text).to_dict(),
                 "payload": {
                     "text": document.text,
                     "embedding_model": embedding_result.model,
                     **document.metadata,
+                    **self._lexical_payload(document.text, document.metadata),
+                    **section_payload,
                 },
             }
             
@@ -199,6 +276,8 @@ class RAGOrchestrator:
             )
             
             self._metrics["indexed_documents"] += 1
+            self.query_expander.add_documents([document.text])
+            await self._update_sections([(document, embedding_result.embedding)])
             logger.info(f"Indexed document {document.id}")
             
             return doc_ids[0] if doc_ids else document.id
@@ -325,6 +404,7 @@ class RAGOrchestrator:
             vector_docs.append({
                 "id": doc.id,
                 "vector": embedding_result.embedding,
+                "sparse_vector": self.sparse_encoder.encode_document(doc.text).to_dict(),
                 "payload": {
                     "text": doc.text,
                     "embedding_model": embedding_result.model,
@@ -332,6 +412,8 @@ class RAGOrchestrator:
                     "batch_size": len(documents),
                     "indexed_at": datetime.utcnow().isoformat(),
                     **doc.metadata,
+                    **self._lexical_payload(doc.text, doc.metadata),
+                    **self._section_payload(doc),
                 },
             })
 
@@ -342,20 +424,321 @@ class RAGOrchestrator:
         )
 
         self._metrics["indexed_documents"] += len(doc_ids)
+        self.query_expander.add_documents(texts)
+        await self._update_sections([
+            (doc, embedding_result.embedding)
+            for doc, embedding_result in zip(documents, embedding_results)
+        ])
         return doc_ids
 
-    async def delete_documents(self, document_ids: List[str]) -> bool:
+    async def iter_indexed_documents(self, page_size: int = 1024) -> AsyncIterator[List[RAGDocument]]:
+        """
+        Stream the documents already stored in the vector database.
+
+        Documents are rebuilt from point payloads without re-embedding,
+        and the query expander is fed each page as it arrives.
+        """
+        async for page in self.vector_db_service.scroll_payloads(page_size=page_size):
+            documents = [
+                RAGDocument(
+                    id=point.id,
+                    text=point.payload.get("text", ""),
+                    metadata={
+                        key: value
+                        for key, value in point.payload.items()
+                        if key not in _INTERNAL_PAYLOAD_FIELDS
+                    },
+                )
+                for point in page
+            ]
+            for point in page:
+                # Deleting a restored paragraph must still update its section
+                if point.payload.get("section_id"):
+                    self._point_sections[point.id] = point.payload["section_id"]
+            self.query_expander.add_documents([document.text for document in documents])
+            yield documents
+
+    def _lexical_payload(self, text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Tokenize once at ingest and keep compact term-id arrays in the payload."""
+        metadata_texts = [value for value in metadata.values() if isinstance(value, str)]
+        return {
+            "term_ids": term_ids([text], stem=self.stem_tokens),
+            "metadata_term_ids": term_ids(metadata_texts, stem=self.stem_tokens),
+            "token_count": len(tokenize(text)),
+        }
+
+    def _section_payload(self, document: RAGDocument) -> Dict[str, Any]:
+        """Return the section assignment stored with a paragraph point."""
+        if self.coarse_vector_db_service is None:
+            return {}
+        return {"section_id": self._section_key(document)}
+
+    def _section_key(self, document: RAGDocument) -> str:
+        """
+        Group a paragraph into a section of its source document.
+
+        An explicit ``section`` in the metadata wins; otherwise consecutive
+        paragraphs are bucketed into windows of ``section_size``.
+        """
+        metadata = document.metadata
+        document_id = str(metadata.get("document_id", document.id))
+        section = metadata.get("section")
+        if section is None:
+            position = metadata.get("paragraph_index", metadata.get("paragraph", 0))
+            try:
+                section = int(position) // self.section_size
+            except (TypeError, ValueError):
+                section = 0
+        return f"{document_id}:{section}"
+
+    @staticmethod
+    def _section_point_id(section_id: str) -> str:
+        """Stable point id of a section vector in the coarse collection."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, section_id))
+
+    async def _load_sections(self) -> bool:
+        """
+        Load the section sums and sizes stored with the section points.
+
+        Section vectors are updated read-modify-write, so after a restart the
+        stored sums must be known before the first update. Returns False when
+        the coarse collection cannot be read; callers then leave the stored
+        sections alone instead of overwriting them with partial sums.
+        """
+        if self._sections_loaded:
+            return True
+        async with self._sections_lock:
+            if self._sections_loaded:
+                return True
+            try:
+                async for page in self.coarse_vector_db_service.scroll_payloads():
+                    for point in page:
+                        section_id = point.payload.get("section_id")
+                        vector_sum = point.payload.get("vector_sum")
+                        if section_id is None or vector_sum is None:
+                            continue
+                        self._section_sums[section_id] = np.asarray(vector_sum, dtype=np.float32)
+                        self._section_sizes[section_id] = int(point.payload.get("paragraph_count", 0))
+                        self._section_documents[section_id] = str(point.payload.get("document_id", ""))
+                        self._section_categories[section_id] = set(point.payload.get("categories") or [])
+            except Exception as e:
+                logger.warning(f"Failed to load section vectors: {e}")
+                return False
+            self._sections_loaded = True
+            return True
+
+    def _section_point(self, section_id: str) -> Dict[str, Any]:
+        """Section point with its mean-pooled vector and the running sum behind it."""
+        vector_sum = self._section_sums[section_id]
+        mean = vector_sum / self._section_sizes[section_id]
+        norm = float(np.linalg.norm(mean))
+        if norm > 0:
+            mean = mean / norm
+        return {
+            "id": self._section_point_id(section_id),
+            "vector": mean.tolist(),
+            "payload": {
+                "section_id": section_id,
+                "document_id": self._section_documents[section_id],
+                "paragraph_count": self._section_sizes[section_id],
+                "categories": sorted(self._section_categories.get(section_id, ())),
+                "vector_sum": vector_sum.tolist(),
+            },
+        }
+
+    async def _update_sections(self, indexed: List[Tuple[RAGDocument, List[float]]]) -> None:
+        """Fold new paragraph embeddings into their mean-pooled section vectors."""
+        if self.coarse_vector_db_service is None or not indexed:
+            return
+        if not await self._load_sections():
+            return
+
+        touched = set()
+        for document, embedding in indexed:
+            if not embedding or document.id in self._point_sections:
+                continue
+            section_id = self._section_key(document)
+            vector = np.asarray(embedding, dtype=np.float32)
+            if section_id in self._section_sums:
+                self._section_sums[section_id] += vector
+            else:
+                self._section_sums[section_id] = vector.copy()
+            self._section_sizes[section_id] = self._section_sizes.get(section_id, 0) + 1
+            self._section_documents[section_id] = str(document.metadata.get("document_id", document.id))
+            categories = document.metadata.get("categories") or []
+            if isinstance(categories, str):
+                categories = [categories]
+            self._section_categories.setdefault(section_id, set()).update(categories)
+            self._point_sections[document.id] = section_id
+            touched.add(section_id)
+
+        try:
+            await self.coarse_vector_db_service.upsert_documents(
+                [self._section_point(section_id) for section_id in touched], wait=True,
+            )
+        except Exception as e:
+            # Paragraph search still works unscoped without section vectors
+            logger.warning(f"Failed to update section vectors: {e}")
+
+    async def _remove_from_sections(self, document_ids: List[str]) -> None:
+        """Drop deleted paragraphs from their sections and remove empty sections."""
+        if self.coarse_vector_db_service is None:
+            return
+        if not await self._load_sections():
+            return
+
+        emptied, shrunk = [], set()
+        for document_id in document_ids:
+            section_id = self._point_sections.pop(document_id, None)
+            if section_id is None or section_id not in self._section_sizes:
+                continue
+            # Section means and category unions are not recomputed on delete;
+            # they only steer routing
+            self._section_sizes[section_id] -= 1
+            if self._section_sizes[section_id] <= 0:
+                del self._section_sizes[section_id]
+                del self._section_sums[section_id]
+                del self._section_documents[section_id]
+                self._section_categories.pop(section_id, None)
+                shrunk.discard(section_id)
+                emptied.append(self._section_point_id(section_id))
+            else:
+                shrunk.add(section_id)
+
+        try:
+            if emptied:
+                await self.coarse_vector_db_service.delete_documents(emptied)
+            if shrunk:
+                await self.coarse_vector_db_service.upsert_documents(
+                    [self._section_point(section_id) for section_id in shrunk], wait=True,
+                )
+        except Exception as e:
+            logger.warning(f"Failed to update section vectors: {e}")
+
+    async def _scope_to_sections(
+        self,
+        query_vector: List[float],
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Narrow a paragraph search to the best matching sections.
+
+        The coarse collection is searched first; the returned filter restricts
+        the paragraph-level search to the selected sections. Falls back to the
+        unscoped filter when the coarse search finds no section.
+        """
+        if self.coarse_vector_db_service is None:
+            return filter_metadata
+        # Section sizes feed the pruning metric
+        await self._load_sections()
+
+        try:
+            sections = await self.coarse_vector_db_service.search(
+                query_vector=query_vector,
+                limit=self.coarse_top_k,
+                filter_conditions=self._coarse_filter(filter_metadata),
+                use_cache=False,
+            )
+        except Exception as e:
+            logger.warning(f"Section search failed, searching all paragraphs: {e}")
+            return filter_metadata
+
+        return self._section_filter(sections, filter_metadata)
+
+    async def _scope_many_to_sections(
+        self,
+        query_vectors: List[List[float]],
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Batch variant of ``_scope_to_sections`` using one coarse request."""
+        if self.coarse_vector_db_service is None:
+            return [filter_metadata] * len(query_vectors)
+        await self._load_sections()
+
+        try:
+            section_sets = await self.coarse_vector_db_service.search_batch(
+                query_vectors=query_vectors,
+                limit=self.coarse_top_k,
+                filter_conditions=[self._coarse_filter(filter_metadata)] * len(query_vectors),
+            )
+        except Exception as e:
+            logger.warning(f"Section search failed, searching all paragraphs: {e}")
+            return [filter_metadata] * len(query_vectors)
+
+        return [self._section_filter(sections, filter_metadata) for sections in section_sets]
+
+    @staticmethod
+    def _coarse_filter(filter_metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Keep the filter conditions that section points can answer.
+
+        Section points carry their document and the union of their paragraphs'
+        categories, so a section matches whenever any of its paragraphs can.
+        """
+        coarse_filter = {
+            key: value for key, value in (filter_metadata or {}).items()
+            if key in _SECTION_FILTER_FIELDS
+        }
+        return coarse_filter or None
+
+    def _candidate_paragraphs(self, coarse_filter: Optional[Dict[str, Any]]) -> int:
+        """Paragraphs in the sections a coarse search with ``coarse_filter`` can select."""
+        wanted = {}
+        for key, values in (coarse_filter or {}).items():
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            wanted[key] = {str(value) for value in values}
+
+        total = 0
+        for section_id, size in self._section_sizes.items():
+            documents = {self._section_documents.get(section_id)}
+            categories = self._section_categories.get(section_id, set())
+            if "document_id" in wanted and not wanted["document_id"] & documents:
+                continue
+            if "categories" in wanted and not wanted["categories"] & categories:
+                continue
+            total += size
+        return total
+
+    def _section_filter(
+        self,
+        sections: List[VectorSearchResult],
+        filter_metadata: Optional[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Restrict a paragraph filter to the selected sections."""
+        # The section points are authoritative; this process may not know them all
+        selected = [section.payload for section in sections if section.payload.get("section_id")]
+        if not selected:
+            return filter_metadata
+        section_ids = [payload["section_id"] for payload in selected]
+
+        total = self._candidate_paragraphs(self._coarse_filter(filter_metadata))
+        kept = sum(int(payload.get("paragraph_count", 0)) for payload in selected)
+        self._metrics["hierarchical_searches"] += 1
+        self._metrics["candidates_pruned"] += max(0, total - kept)
+
+        return {**(filter_metadata or {}), "section_id": section_ids}
+
+    async def delete_documents(
+        self,
+        document_ids: List[str],
+        texts: Optional[List[str]] = None,
+    ) -> bool:
         """
         Delete documents from the RAG system.
         
         Args:
             document_ids: List of document IDs to delete
+            texts: Texts of the deleted documents, to take their terms out of
+                the query expansion statistics
             
         Returns:
             Success status
         """
         try:
             await self.vector_db_service.delete_documents(document_ids)
+            await self._remove_from_sections(document_ids)
+            self.query_expander.remove_documents(texts or [])
             logger.info(f"Deleted {len(document_ids)} documents")
             return True
         except Exception as e:
@@ -370,6 +753,7 @@ class RAGOrchestrator:
         score_threshold: Optional[float] = None,
         filter_metadata: Optional[Dict[str, Any]] = None,
         use_cache: bool = True,
+        context: Optional[RAGQueryContext] = None,
     ) -> List[RAGSearchResult]:
         """
         Search for relevant documents using RAG with query optimization.
@@ -380,63 +764,56 @@ class RAGOrchestrator:
             score_threshold: Minimum similarity score
             filter_metadata: Metadata filters for search
             use_cache: Whether to use result caching
+            context: Per-request memo shared with other searches of the request
 
         Returns:
             List of search results
         """
         start_time = datetime.utcnow()
         self._metrics["total_searches"] += 1
+        context = context or RAGQueryContext()
 
         try:
-            # Apply query expansion if enabled
-            expanded_queries = [query]
-            if self.enable_query_expansion:
-                expanded_queries.extend(self._expand_query(query))
-                self._metrics["query_expansions_used"] += len(expanded_queries) - 1
+            search_kwargs = {
+                "limit": top_k * 2,  # Get more for re-ranking
+                "score_threshold": score_threshold,
+                "filter_metadata": filter_metadata,
+                "use_cache": use_cache,
+            }
 
-            # Generate embeddings for all query variations
+            # First pass with the original query
             all_results = []
-            for q in expanded_queries[:self.max_query_expansions + 1]:  # Include original + expansions
+            try:
+                embedding_result = await asyncio.wait_for(
+                    self._embed_query(query, context),
+                    timeout=self.search_timeout,
+                )
+                vector_results = await asyncio.wait_for(
+                    self._dense_search(context, query, embedding_result.embedding, **search_kwargs),
+                    timeout=self.search_timeout,
+                )
+                all_results.extend(self._to_search_result(vr) for vr in vector_results)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timeout for query: {query}")
+
+            # Expand only when the first pass is not already confident
+            expanded_queries = []
+            if self.enable_query_expansion:
+                top_score = max((r.score for r in all_results), default=0.0)
+                if top_score >= self.expansion_confidence_threshold:
+                    self._metrics["expansions_skipped"] += 1
+                else:
+                    expanded_queries = self._expand_query(query)
+                    self._metrics["query_expansions_used"] += len(expanded_queries)
+
+            if expanded_queries:
                 try:
-                    embedding_result = await asyncio.wait_for(
-                        self.embedding_service.embed_text(q),
+                    all_results.extend(await asyncio.wait_for(
+                        self._search_expansions(context, expanded_queries, search_kwargs),
                         timeout=self.search_timeout,
-                    )
-
-                    # Search in vector DB
-                    vector_results = await asyncio.wait_for(
-                        self.vector_db_service.search(
-                            query_vector=embedding_result.embedding,
-                            limit=top_k * 2,  # Get more for re-ranking
-                            score_threshold=score_threshold,
-                            filter_conditions=filter_metadata,
-                            use_cache=use_cache,
-                        ),
-                        timeout=self.search_timeout,
-                    )
-
-                    # Convert and collect results
-                    for vr in vector_results:
-                        result = RAGSearchResult(
-                            document_id=vr.id,
-                            text=vr.payload.get("text", ""),
-                            score=vr.score,
-                            metadata={
-                                k: v for k, v in vr.payload.items()
-                                if k not in ["text", "embedding_model"]
-                            },
-                            embedding_model=vr.payload.get("embedding_model"),
-                        )
-                        # Add query expansion info
-                        if q != query:
-                            result.metadata["query_expansion"] = q
-                            result.score *= 0.95  # Slight penalty for expanded queries
-
-                        all_results.append(result)
-
+                    ))
                 except asyncio.TimeoutError:
-                    logger.warning(f"Timeout for query variation: {q}")
-                    continue
+                    logger.warning(f"Timeout for query expansions of: {query}")
 
             # Apply result re-ranking if enabled
             if self.enable_result_reranking and all_results:
@@ -461,7 +838,7 @@ class RAGOrchestrator:
             logger.debug(
                 f"Search completed in {search_time_ms:.2f}ms, "
                 f"found {len(unique_results)} results "
-                f"(expanded: {len(expanded_queries)-1}, reranked: {self.enable_result_reranking})"
+                f"(expanded: {len(expanded_queries)}, reranked: {self.enable_result_reranking})"
             )
 
             return unique_results
@@ -478,50 +855,171 @@ class RAGOrchestrator:
 
             raise
 
+    async def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        score_threshold: Optional[float] = None,
+        filter_metadata: Optional[Dict[str, Any]] = None,
+        context: Optional[RAGQueryContext] = None,
+    ) -> List[List[RAGSearchResult]]:
+        """
+        Search several queries with one embedding batch and one vector request.
+
+        Query expansion is not applied in batch mode; results are re-ranked
+        per query when re-ranking is enabled.
+
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            score_threshold: Minimum similarity score
+            filter_metadata: Metadata filters applied to every query
+            context: Per-request memo shared with other searches of the request
+
+        Returns:
+            One list of search results per query, in input order
+        """
+        if not queries:
+            return []
+
+        start_time = datetime.utcnow()
+        self._metrics["total_searches"] += len(queries)
+        context = context or RAGQueryContext()
+
+        try:
+            embedding_results = await asyncio.wait_for(
+                context.embed_many(queries, self.embedding_service.embed_batch),
+                timeout=self.search_timeout,
+            )
+            query_vectors = [result.embedding for result in embedding_results]
+            scoped_filters = await self._scope_many_to_sections(query_vectors, filter_metadata)
+
+            result_sets = await asyncio.wait_for(
+                self.vector_db_service.search_batch(
+                    query_vectors=query_vectors,
+                    limit=top_k * 2,  # Get more for re-ranking
+                    score_threshold=score_threshold,
+                    filter_conditions=scoped_filters,
+                ),
+                timeout=self.search_timeout,
+            )
+
+            batch_results = []
+            for query, vector_results in zip(queries, result_sets):
+                results = [self._to_search_result(vr) for vr in vector_results]
+                if self.enable_result_reranking and results:
+                    results = self._rerank_results(results, query)
+                    self._metrics["reranking_applied"] += 1
+                batch_results.append(results[:top_k])
+
+            search_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+            self._metrics["search_times_ms"].append(search_time_ms)
+            self._metrics["successful_searches"] += len(queries)
+            return batch_results
+
+        except Exception as e:
+            self._metrics["failed_searches"] += len(queries)
+            self._metrics["errors"] += 1
+            logger.error(f"Batch search error: {e}")
+
+            # Return empty results on error (graceful degradation)
+            if self.enable_hybrid_search:
+                logger.warning("Batch search failed, returning empty results")
+                return [[] for _ in queries]
+
+            raise
+
+    async def _search_expansions(
+        self,
+        context: RAGQueryContext,
+        expanded_queries: List[str],
+        search_kwargs: Dict[str, Any],
+    ) -> List[RAGSearchResult]:
+        """Embed all query variants in one batch and search them concurrently."""
+        embedding_results = await context.embed_many(
+            expanded_queries, self.embedding_service.embed_batch,
+        )
+        result_sets = await asyncio.gather(*(
+            self._dense_search(context, q, embedding_result.embedding, **search_kwargs)
+            for q, embedding_result in zip(expanded_queries, embedding_results)
+        ))
+
+        results = []
+        for q, vector_results in zip(expanded_queries, result_sets):
+            for vr in vector_results:
+                result = self._to_search_result(vr)
+                # Add query expansion info
+                result.metadata["query_expansion"] = q
+                result.score *= 0.95  # Slight penalty for expanded queries
+                results.append(result)
+        return results
+
+    async def _embed_query(self, text: str, context: RAGQueryContext) -> EmbeddingResult:
+        """Embed a query text at most once per request context."""
+        return await context.embed(text, lambda: self.embedding_service.embed_text(text))
+
+    async def _dense_search(
+        self,
+        context: RAGQueryContext,
+        query: str,
+        query_vector: List[float],
+        limit: int,
+        score_threshold: Optional[float],
+        filter_metadata: Optional[Dict[str, Any]],
+        use_cache: bool,
+    ) -> List[VectorSearchResult]:
+        """Run a (section-scoped) dense search at most once per request context."""
+        key = ("dense", query, limit, score_threshold, _freeze(filter_metadata))
+
+        async def compute() -> List[VectorSearchResult]:
+            scoped_filter = await self._scope_to_sections(query_vector, filter_metadata)
+            return await self.vector_db_service.search(
+                query_vector=query_vector,
+                limit=limit,
+                score_threshold=score_threshold,
+                filter_conditions=scoped_filter,
+                use_cache=use_cache,
+            )
+
+        return await context.search(key, compute)
+
     def _expand_query(self, query: str) -> List[str]:
-        """Expand query with related terms for better recall."""
-        expanded = []
-        query_lower = query.lower()
-
-        # Check for expansion terms
-        for key, terms in self._query_expansion_terms.items():
-            if key in query_lower:
-                # Add related terms that aren't already in the query
-                for term in terms:
-                    if term not in query_lower:
-                        expanded_query = f"{query} {term}"
-                        expanded.append(expanded_query)
-                        if len(expanded) >= 2:  # Limit expansions per key
-                            break
-                if len(expanded) >= self.max_query_expansions:
-                    break
-
-        return expanded[:self.max_query_expansions]
+        """Expand query with corpus-related terms for better recall."""
+        return self.query_expander.expand(query)[:self.max_query_expansions]
 
     def _rerank_results(self, results: List[RAGSearchResult], original_query: str) -> List[RAGSearchResult]:
-        """Re-rank results based on relevance to original query."""
+        """
+        Re-rank results based on relevance to original query.
+
+        Term overlap is computed against the term-id arrays stored at index
+        time, so the cost per candidate depends on the query length only.
+        """
         if not results:
             return results
 
-        query_words = set(re.findall(r'\b\w+\b', original_query.lower()))
+        query_ids = term_ids([original_query], stem=self.stem_tokens)
+        important_matches = len(self._important_term_ids.intersection(query_ids))
 
         for result in results:
-            text_words = set(re.findall(r'\b\w+\b', result.text.lower()))
-            metadata_words = set()
-            for key, value in result.metadata.items():
-                if isinstance(value, str):
-                    metadata_words.update(re.findall(r'\b\w+\b', value.lower()))
+            text_ids = result.term_ids
+            if text_ids is None:
+                # Points indexed before term ids were stored
+                text_ids = term_ids([result.text], stem=self.stem_tokens)
+            metadata_ids = result.metadata_term_ids
+            if metadata_ids is None:
+                metadata_ids = term_ids(
+                    [value for value in result.metadata.values() if isinstance(value, str)],
+                    stem=self.stem_tokens,
+                )
 
             # Calculate word overlap score
-            text_overlap = len(query_words & text_words)
-            metadata_overlap = len(query_words & metadata_words)
+            text_overlap = count_overlap(query_ids, text_ids)
+            metadata_overlap = count_overlap(query_ids, metadata_ids)
 
             # Boost score for results with more query term matches
             relevance_boost = (text_overlap * 0.1) + (metadata_overlap * 0.05)
 
             # Boost score for results that contain important terms
-            important_terms = {'script', 'rating', 'analysis', 'content', 'review'}
-            important_matches = len(query_words & important_terms)
             result.score += relevance_boost + (important_matches * 0.02)
 
         # Re-sort by adjusted scores
@@ -535,66 +1033,94 @@ class RAGOrchestrator:
         vector_weight: float = 0.7,
         tfidf_weight: float = 0.3,
         filter_metadata: Optional[Dict[str, Any]] = None,
+        context: Optional[RAGQueryContext] = None,
     ) -> List[RAGSearchResult]:
         """
-        Perform hybrid search combining vector and TF-IDF approaches.
+        Perform hybrid search over dense and BM25 sparse vectors.
+
+        Both legs are queried in a single vector database request and fused
+        with reciprocal rank fusion, so exact term matches are retrieved even
+        when they rank poorly in embedding space.
 
         Args:
             query: Search query text
             top_k: Number of results to return
-            vector_weight: Weight for vector search results (0-1)
-            tfidf_weight: Weight for TF-IDF results (0-1)
+            vector_weight: Kept for backward compatibility; RRF is rank-based
+            tfidf_weight: Kept for backward compatibility; RRF is rank-based
             filter_metadata: Metadata filters for search
+            context: Per-request memo shared with other searches of the request
 
         Returns:
-            List of search results with combined scores
+            List of search results scored by reciprocal rank fusion
         """
+        context = context or RAGQueryContext()
         if not self.enable_hybrid_search:
-            return await self.search(query, top_k, filter_metadata=filter_metadata)
+            return await self.search(
+                query, top_k, filter_metadata=filter_metadata, context=context,
+            )
+
+        start_time = datetime.utcnow()
+        self._metrics["hybrid_searches"] += 1
 
         try:
-            # Get vector search results with optimizations
-            vector_results = await self.search(
-                query,
-                top_k=top_k * 3,  # Get more for better hybrid combining
-                filter_metadata=filter_metadata,
+            embedding_result = await asyncio.wait_for(
+                self._embed_query(query, context),
+                timeout=self.search_timeout,
             )
 
-            # Apply hybrid scoring
-            scored_results = []
-            for result in vector_results:
-                # Primary score from vector search
-                vector_score = result.score * vector_weight
-
-                # Secondary score from text matching (TF-IDF style)
-                query_words = set(re.findall(r'\b\w+\b', query.lower()))
-                text_words = set(re.findall(r'\b\w+\b', result.text.lower()))
-
-                # Calculate simple TF-IDF-like score
-                tfidf_score = len(query_words & text_words) / len(query_words) if query_words else 0
-                tfidf_score *= tfidf_weight
-
-                # Combine scores
-                combined_score = vector_score + tfidf_score
-
-                # Create new result with combined score
-                combined_result = RAGSearchResult(
-                    document_id=result.document_id,
-                    text=result.text,
-                    score=combined_score,
-                    metadata={**result.metadata, "vector_score": vector_score, "tfidf_score": tfidf_score},
-                    embedding_model=result.embedding_model,
+            async def fused_search() -> List[VectorSearchResult]:
+                sparse_query = self.sparse_encoder.encode_query(query)
+                scoped_filter = await self._scope_to_sections(
+                    embedding_result.embedding, filter_metadata,
                 )
-                scored_results.append(combined_result)
+                return await self.vector_db_service.hybrid_search(
+                    query_vector=embedding_result.embedding,
+                    sparse_vector=sparse_query.to_dict(),
+                    limit=top_k,
+                    filter_conditions=scoped_filter,
+                    prefetch_limit=top_k * self.hybrid_prefetch_multiplier,
+                )
+
+            vector_results = await asyncio.wait_for(
+                context.search(
+                    ("hybrid", query, top_k, _freeze(filter_metadata)),
+                    fused_search,
+                ),
+                timeout=self.search_timeout,
+            )
+
+            results = []
+            for vr in vector_results:
+                result = self._to_search_result(vr)
+                result.metadata["fusion"] = "rrf"
+                results.append(result)
 
-            # Sort by combined score and limit
-            scored_results.sort(key=lambda x: x.score, reverse=True)
-            return scored_results[:top_k]
+            search_time_ms = (datetime.utcnow() - start_time).total_seconds() * 1000
+            self._metrics["search_times_ms"].append(search_time_ms)
+            return results
 
         except Exception as e:
+            self._metrics["errors"] += 1
             logger.error(f"Hybrid search error: {e}")
             raise
 
+    @staticmethod
+    def _to_search_result(vector_result: VectorSearchResult) -> RAGSearchResult:
+        """Convert a vector database hit into a RAG search result."""
+        payload = vector_result.payload
+        return RAGSearchResult(
+            document_id=vector_result.id,
+            text=payload.get("text", ""),
+            score=vector_result.score,
+            metadata={
+                k: v for k, v in payload.items()
+                if k not in ("text", "embedding_model", *_LEXICAL_PAYLOAD_FIELDS)
+            },
+            embedding_model=payload.get("embedding_model"),
+            term_ids=payload.get("term_ids"),
+            metadata_term_ids=payload.get("metadata_term_ids"),
+        )
+
     async def get_metrics(self) -> RAGMetrics:
         """
         Get RAG system metrics with performance data.
@@ -627,6 +1153,8 @@ class RAGOrchestrator:
             cache_hit_rate=combined_cache_hit_rate,
             vector_db_status=vector_health.get("status", "unknown"),
             embedding_service_status=embedding_health.get("status", "unknown"),
+            hierarchical_searches=self._metrics["hierarchical_searches"],
+            candidates_pruned=self._metrics["candidates_pruned"],
         )
 
     async def health_check(self) -> Dict[str, Any]:
@@ -659,6 +1187,8 @@ class RAGOrchestrator:
                 "total_searches": metrics.total_searches,
                 "average_search_time_ms": metrics.average_search_time_ms,
                 "cache_hit_rate": metrics.cache_hit_rate,
+                "hierarchical_searches": metrics.hierarchical_searches,
+                "candidates_pruned": metrics.candidates_pruned,
             }
             
             # Determine overall status
@@ -0,0 +1,96 @@
+"""
+On-disk archive of finished analyses.
+
+A finished analysis is written once as gzip-compressed JSON, one file per
+analysis, so the manager can drop it from memory and load it again only when
+its results are requested. Block previews are not stored; they are cut from
+the block text again on load.
+"""
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from .analysis_jobs import json_default
+
+# Analysis ids are UUIDs; anything else never maps to a file
+_ANALYSIS_ID = re.compile(r"[A-Za-z0-9_-]+")
+_PREVIEW_LENGTH = 400
+
+
+class AnalysisArchive:
+    """Finished analyses stored as ``<analysis_id>.json.gz`` files."""
+
+    def __init__(self, directory: str = "storage/analyses", compresslevel: int = 6) -> None:
+        """
+        Initialize AnalysisArchive.
+
+        Args:
+            directory: Directory holding the archived analyses
+            compresslevel: gzip level; higher is smaller and slower
+        """
+        self._directory = Path(directory)
+        self._compresslevel = compresslevel
+
+    def _path(self, analysis_id: str) -> Optional[Path]:
+        if not _ANALYSIS_ID.fullmatch(analysis_id):
+            return None
+        return self._directory / f"{analysis_id}.json.gz"
+
+    async def save(self, analysis_id: str, snapshot: Mapping[str, Any]) -> int:
+        """Archive a snapshot; returns the size of its uncompressed JSON."""
+        path = self._path(analysis_id)
+        if path is None:
+            raise ValueError(f"Invalid analysis id: {analysis_id!r}")
+        document = {
+            **snapshot,
+            "scene_assessments": [
+                {name: value for name, value in assessment.items() if name != "text_preview"}
+                for assessment in snapshot.get("scene_assessments", [])
+            ],
+        }
+        raw = json.dumps(document, ensure_ascii=False, default=json_default).encode("utf-8")
+        await asyncio.to_thread(self._write, path, raw)
+        return len(raw)
+
+    def _write(self, path: Path, raw: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.tmp")
+        with gzip.open(partial, "wb", compresslevel=self._compresslevel) as handle:
+            handle.write(raw)
+        # Readers never see a half-written archive
+        os.replace(partial, path)
+
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Return an archived snapshot, or None if the analysis is not archived."""
+        path = self._path(analysis_id)
+        if path is None:
+            return None
+        try:
+            raw = await asyncio.to_thread(self._read, path)
+        except FileNotFoundError:
+            return None
+        snapshot = json.loads(raw)
+        for assessment in snapshot.get("scene_assessments", []):
+            assessment.setdefault("text_preview", assessment.get("text", "")[:_PREVIEW_LENGTH])
+        return snapshot
+
+    @staticmethod
+    def _read(path: Path) -> bytes:
+        with gzip.open(path, "rb") as handle:
+            return handle.read()
+
+    def stats(self) -> Dict[str, int]:
+        """Number and total compressed size of the archived analyses."""
+        count = size = 0
+        if self._directory.is_dir():
+            for entry in os.scandir(self._directory):
+                if entry.name.endswith(".json.gz") and not entry.name.startswith("."):
+                    count += 1
+                    size += entry.stat().st_size
+        return {"archived_analyses": count, "archive_bytes": size}
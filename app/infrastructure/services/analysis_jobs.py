@@ -0,0 +1,634 @@
+"""
+Persistent analysis jobs shared by every worker process.
+
+A job holds the analysis state fields, the script payload it analyzes and one
+checkpoint per completed block. The worker running a job holds a lease on it
+and renews the lease with every checkpoint and with a heartbeat while the job
+waits or works on a long block; a job whose lease expired (its
+worker crashed or was restarted) is claimed by another worker, which resumes
+after the last checkpointed block. Checkpoints from a worker that lost its
+lease are rejected, so two workers never interleave results.
+
+Backends:
+    ``InMemoryJobStore``  single process, nothing survives a restart
+    ``SqliteJobStore``    local file shared by the workers of one host
+    ``RedisJobStore``     any Redis-compatible server shared across hosts
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import aiosqlite
+import redis.asyncio as aioredis
+from redis.exceptions import WatchError
+
+# Statuses after which an analysis publishes no further updates
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+@dataclass
+class AnalysisJob:
+    """A leased job together with the blocks completed before the lease."""
+
+    analysis_id: str
+    state: Dict[str, Any]
+    script_payload: Dict[str, Any]
+    assessments: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def json_default(value: Any) -> Any:
+    """JSON encoding of the datetimes and enums found in analysis states."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=json_default)
+
+
+def _merge_fields(
+    state: Dict[str, Any],
+    fields: Dict[str, Any],
+    cancel_requested: bool,
+) -> Dict[str, Any]:
+    """Apply updated fields; a cancelled job keeps its cancelled status."""
+    updates = dict(fields)
+    if cancel_requested and updates.get("status", "cancelled") != "cancelled":
+        updates.pop("status")
+    return {**state, **updates}
+
+
+class AnalysisJobStore(ABC):
+    """Storage of analysis jobs, their leases and per-block checkpoints."""
+
+    @abstractmethod
+    async def create(
+        self,
+        analysis_id: str,
+        state: Dict[str, Any],
+        script_payload: Dict[str, Any],
+        owner: Optional[str] = None,
+        lease_seconds: float = 120.0,
+    ) -> None:
+        """Store a new job, leased to ``owner`` or queued for any worker."""
+
+    @abstractmethod
+    async def claim(self, worker_id: str, lease_seconds: float = 120.0) -> Optional[AnalysisJob]:
+        """Lease the oldest queued job or one whose lease expired."""
+
+    @abstractmethod
+    async def checkpoint(
+        self,
+        analysis_id: str,
+        fields: Dict[str, Any],
+        worker_id: str,
+        lease_seconds: float = 120.0,
+        block_index: Optional[int] = None,
+        assessment: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Store updated fields and optionally one block result.
+
+        Renews the lease, or releases it on a terminal status. Returns False
+        without writing anything when ``worker_id`` no longer holds the lease.
+        """
+
+    @abstractmethod
+    async def renew(self, analysis_id: str, worker_id: str, lease_seconds: float = 120.0) -> bool:
+        """Extend the lease; returns False when ``worker_id`` no longer holds it."""
+
+    @abstractmethod
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Return the stored state with its ``scene_assessments``, if any."""
+
+    @abstractmethod
+    async def request_cancel(self, analysis_id: str) -> None:
+        """Flag a job as cancelled; its worker stops at the next block."""
+
+    @abstractmethod
+    async def is_cancel_requested(self, analysis_id: str) -> bool:
+        """Whether cancellation was requested from any worker."""
+
+    async def discard(self, analysis_id: str) -> None:
+        """
+        Forget a finished job once it is archived elsewhere.
+
+        Shared backends keep finished jobs so other workers can still serve
+        them; only process-local stores drop them.
+        """
+
+    def memory_stats(self) -> Dict[str, int]:
+        """Jobs held in process memory, for health reporting."""
+        return {}
+
+    async def close(self) -> None:
+        """Release backend connections."""
+
+
+class InMemoryJobStore(AnalysisJobStore):
+    """Jobs of a single process; checkpoints do not survive a restart."""
+
+    def __init__(self) -> None:
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    async def create(
+        self,
+        analysis_id: str,
+        state: Dict[str, Any],
+        script_payload: Dict[str, Any],
+        owner: Optional[str] = None,
+        lease_seconds: float = 120.0,
+    ) -> None:
+        self._jobs[analysis_id] = {
+            "state": dict(state),
+            "script": script_payload,
+            "blocks": {},
+            "cancel": False,
+            "owner": owner,
+            "lease_until": time.time() + lease_seconds if owner else 0.0,
+        }
+
+    async def claim(self, worker_id: str, lease_seconds: float = 120.0) -> Optional[AnalysisJob]:
+        now = time.time()
+        for analysis_id, job in self._jobs.items():
+            if job["state"].get("status") in TERMINAL_STATUSES:
+                continue
+            if job["owner"] is not None and job["lease_until"] >= now:
+                continue
+            job["owner"] = worker_id
+            job["lease_until"] = now + lease_seconds
+            return AnalysisJob(
+                analysis_id=analysis_id,
+                state=dict(job["state"]),
+                script_payload=job["script"],
+                assessments=[job["blocks"][index] for index in sorted(job["blocks"])],
+            )
+        return None
+
+    async def checkpoint(
+        self,
+        analysis_id: str,
+        fields: Dict[str, Any],
+        worker_id: str,
+        lease_seconds: float = 120.0,
+        block_index: Optional[int] = None,
+        assessment: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        job = self._jobs.get(analysis_id)
+        if job is None or job["owner"] != worker_id:
+            return False
+        job["state"] = _merge_fields(job["state"], fields, job["cancel"])
+        if assessment is not None and block_index is not None:
+            job["blocks"][block_index] = assessment
+        if job["state"].get("status") in TERMINAL_STATUSES:
+            job["owner"], job["lease_until"] = None, 0.0
+        else:
+            job["lease_until"] = time.time() + lease_seconds
+        return True
+
+    async def renew(self, analysis_id: str, worker_id: str, lease_seconds: float = 120.0) -> bool:
+        job = self._jobs.get(analysis_id)
+        if job is None or job["owner"] != worker_id:
+            return False
+        job["lease_until"] = time.time() + lease_seconds
+        return True
+
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(analysis_id)
+        if job is None:
+            return None
+        blocks = job["blocks"]
+        return {**job["state"], "scene_assessments": [blocks[index] for index in sorted(blocks)]}
+
+    async def request_cancel(self, analysis_id: str) -> None:
+        job = self._jobs.get(analysis_id)
+        if job is not None:
+            job["cancel"] = True
+            job["state"]["status"] = "cancelled"
+
+    async def is_cancel_requested(self, analysis_id: str) -> bool:
+        job = self._jobs.get(analysis_id)
+        return bool(job and job["cancel"])
+
+    async def discard(self, analysis_id: str) -> None:
+        self._jobs.pop(analysis_id, None)
+
+    def memory_stats(self) -> Dict[str, int]:
+        return {
+            "stored_jobs": len(self._jobs),
+            "stored_blocks": sum(len(job["blocks"]) for job in self._jobs.values()),
+        }
+
+
+class SqliteJobStore(AnalysisJobStore):
+    """Jobs in a local SQLite file; claims are serialized by write transactions."""
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            analysis_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            script TEXT NOT NULL,
+            status TEXT NOT NULL,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            lease_owner TEXT,
+            lease_until REAL NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analysis_blocks (
+            analysis_id TEXT NOT NULL,
+            block_index INTEGER NOT NULL,
+            assessment TEXT NOT NULL,
+            PRIMARY KEY (analysis_id, block_index)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS analysis_jobs_claimable ON analysis_jobs (status, lease_until)",
+    )
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize SqliteJobStore.
+
+        Args:
+            path: Database file shared by all workers of the host
+        """
+        self._path = path
+        self._connection: Optional[aiosqlite.Connection] = None
+        # One connection per process; statements of a transaction must not interleave
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        if self._connection is None:
+            Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+            # Autocommit mode, so every write transaction is opened explicitly
+            connection = await aiosqlite.connect(self._path, timeout=30, isolation_level=None)
+            await connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self._SCHEMA:
+                await connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Write transaction holding the database lock from its first statement."""
+        async with self._lock:
+            connection = await self._connect()
+            await connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                await connection.execute("ROLLBACK")
+                raise
+            await connection.execute("COMMIT")
+
+    @staticmethod
+    async def _blocks(connection: aiosqlite.Connection, analysis_id: str) -> List[Dict[str, Any]]:
+        cursor = await connection.execute(
+            "SELECT assessment FROM analysis_blocks WHERE analysis_id = ? ORDER BY block_index",
+            (analysis_id,),
+        )
+        return [json.loads(assessment) for (assessment,) in await cursor.fetchall()]
+
+    async def create(
+        self,
+        analysis_id: str,
+        state: Dict[str, Any],
+        script_payload: Dict[str, Any],
+        owner: Optional[str] = None,
+        lease_seconds: float = 120.0,
+    ) -> None:
+        now = time.time()
+        async with self._transaction() as connection:
+            await connection.execute(
+                "INSERT INTO analysis_jobs (analysis_id, state, script, status, lease_owner, lease_until, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    analysis_id,
+                    _dumps(state),
+                    _dumps(script_payload),
+                    state.get("status", "processing"),
+                    owner,
+                    now + lease_seconds if owner else 0.0,
+                    now,
+                ),
+            )
+
+    async def claim(self, worker_id: str, lease_seconds: float = 120.0) -> Optional[AnalysisJob]:
+        now = time.time()
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                "SELECT analysis_id, state, script FROM analysis_jobs "
+                "WHERE status NOT IN (?, ?, ?) AND (lease_owner IS NULL OR lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (*TERMINAL_STATUSES, now),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            analysis_id, state, script = row
+            await connection.execute(
+                "UPDATE analysis_jobs SET lease_owner = ?, lease_until = ? WHERE analysis_id = ?",
+                (worker_id, now + lease_seconds, analysis_id),
+            )
+            assessments = await self._blocks(connection, analysis_id)
+
+        return AnalysisJob(
+            analysis_id=analysis_id,
+            state=json.loads(state),
+            script_payload=json.loads(script),
+            assessments=assessments,
+        )
+
+    async def checkpoint(
+        self,
+        analysis_id: str,
+        fields: Dict[str, Any],
+        worker_id: str,
+        lease_seconds: float = 120.0,
+        block_index: Optional[int] = None,
+        assessment: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                "SELECT state, cancel_requested, lease_owner FROM analysis_jobs WHERE analysis_id = ?",
+                (analysis_id,),
+            )
+            row = await cursor.fetchone()
+            if row is None or row[2] != worker_id:
+                return False
+
+            state = _merge_fields(json.loads(row[0]), fields, bool(row[1]))
+            status = state.get("status", "processing")
+            released = status in TERMINAL_STATUSES
+            await connection.execute(
+                "UPDATE analysis_jobs SET state = ?, status = ?, lease_owner = ?, lease_until = ? "
+                "WHERE analysis_id = ?",
+                (
+                    _dumps(state),
+                    status,
+                    None if released else worker_id,
+                    0.0 if released else time.time() + lease_seconds,
+                    analysis_id,
+                ),
+            )
+            if assessment is not None and block_index is not None:
+                await connection.execute(
+                    "INSERT OR REPLACE INTO analysis_blocks (analysis_id, block_index, assessment) "
+                    "VALUES (?, ?, ?)",
+                    (analysis_id, block_index, _dumps(assessment)),
+                )
+        return True
+
+    async def renew(self, analysis_id: str, worker_id: str, lease_seconds: float = 120.0) -> bool:
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                "UPDATE analysis_jobs SET lease_until = ? WHERE analysis_id = ? AND lease_owner = ?",
+                (time.time() + lease_seconds, analysis_id, worker_id),
+            )
+            return cursor.rowcount > 0
+
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        async with self._lock:
+            connection = await self._connect()
+            cursor = await connection.execute(
+                "SELECT state FROM analysis_jobs WHERE analysis_id = ?", (analysis_id,),
+            )
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            assessments = await self._blocks(connection, analysis_id)
+        return {**json.loads(row[0]), "scene_assessments": assessments}
+
+    async def request_cancel(self, analysis_id: str) -> None:
+        async with self._transaction() as connection:
+            cursor = await connection.execute(
+                "SELECT state FROM analysis_jobs WHERE analysis_id = ?", (analysis_id,),
+            )
+            row = await cursor.fetchone()
+            if row is not None:
+                state = {**json.loads(row[0]), "status": "cancelled"}
+                await connection.execute(
+                    "UPDATE analysis_jobs SET state = ?, status = 'cancelled', cancel_requested = 1 "
+                    "WHERE analysis_id = ?",
+                    (_dumps(state), analysis_id),
+                )
+
+    async def is_cancel_requested(self, analysis_id: str) -> bool:
+        async with self._lock:
+            connection = await self._connect()
+            cursor = await connection.execute(
+                "SELECT cancel_requested FROM analysis_jobs WHERE analysis_id = ?", (analysis_id,),
+            )
+            row = await cursor.fetchone()
+        return bool(row and row[0])
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+class RedisJobStore(AnalysisJobStore):
+    """
+    Jobs in a Redis-compatible server.
+
+    Per job: a hash of JSON-encoded state fields, the script payload, a hash
+    of block checkpoints, the lease owner and a cancel flag. Queued jobs wait
+    in a list; leased jobs sit in a sorted set scored by lease expiry, and a
+    worker wins an expired lease by being the one whose ZREM removed it.
+    """
+
+    def __init__(self, client: Any, prefix: str = "analysis") -> None:
+        """
+        Initialize RedisJobStore.
+
+        Args:
+            client: ``redis.asyncio.Redis`` or a compatible client
+            prefix: Namespace of all keys written by the store
+        """
+        self._redis = client
+        self._prefix = prefix
+
+    def _key(self, kind: str, analysis_id: Optional[str] = None) -> str:
+        return f"{self._prefix}:{kind}" if analysis_id is None else f"{self._prefix}:{kind}:{analysis_id}"
+
+    @staticmethod
+    def _text(value: Any) -> Any:
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    async def _lease(self, analysis_id: str, worker_id: str, lease_seconds: float) -> None:
+        await self._redis.set(self._key("owner", analysis_id), worker_id)
+        await self._redis.zadd(self._key("leases"), {analysis_id: time.time() + lease_seconds})
+
+    async def _state(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.hgetall(self._key("state", analysis_id))
+        if not raw:
+            return None
+        return {self._text(name): json.loads(self._text(value)) for name, value in raw.items()}
+
+    async def _blocks(self, analysis_id: str) -> List[Dict[str, Any]]:
+        raw = await self._redis.hgetall(self._key("blocks", analysis_id))
+        blocks = {int(self._text(index)): self._text(value) for index, value in raw.items()}
+        return [json.loads(blocks[index]) for index in sorted(blocks)]
+
+    async def create(
+        self,
+        analysis_id: str,
+        state: Dict[str, Any],
+        script_payload: Dict[str, Any],
+        owner: Optional[str] = None,
+        lease_seconds: float = 120.0,
+    ) -> None:
+        await self._redis.hset(
+            self._key("state", analysis_id),
+            mapping={name: _dumps(value) for name, value in state.items()},
+        )
+        await self._redis.set(self._key("script", analysis_id), _dumps(script_payload))
+        if owner:
+            await self._lease(analysis_id, owner, lease_seconds)
+        else:
+            await self._redis.rpush(self._key("queue"), analysis_id)
+
+    async def claim(self, worker_id: str, lease_seconds: float = 120.0) -> Optional[AnalysisJob]:
+        while True:
+            analysis_id = self._text(await self._redis.lpop(self._key("queue")))
+            if analysis_id is None:
+                expired = await self._redis.zrangebyscore(
+                    self._key("leases"), "-inf", time.time(), start=0, num=1,
+                )
+                if not expired:
+                    return None
+                analysis_id = self._text(expired[0])
+                if not await self._redis.zrem(self._key("leases"), analysis_id):
+                    continue  # another worker took it first
+
+            state = await self._state(analysis_id)
+            if state is None or state.get("status") in TERMINAL_STATUSES:
+                continue
+            await self._lease(analysis_id, worker_id, lease_seconds)
+            script = self._text(await self._redis.get(self._key("script", analysis_id)))
+            return AnalysisJob(
+                analysis_id=analysis_id,
+                state=state,
+                script_payload=json.loads(script) if script else {},
+                assessments=await self._blocks(analysis_id),
+            )
+
+    async def checkpoint(
+        self,
+        analysis_id: str,
+        fields: Dict[str, Any],
+        worker_id: str,
+        lease_seconds: float = 120.0,
+        block_index: Optional[int] = None,
+        assessment: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        def write(pipe: Any, cancelled: bool) -> None:
+            updates = _merge_fields({}, fields, cancelled)
+            if updates:
+                pipe.hset(
+                    self._key("state", analysis_id),
+                    mapping={name: _dumps(value) for name, value in updates.items()},
+                )
+            if assessment is not None and block_index is not None:
+                pipe.hset(self._key("blocks", analysis_id), str(block_index), _dumps(assessment))
+            if updates.get("status") in TERMINAL_STATUSES:
+                pipe.zrem(self._key("leases"), analysis_id)
+                pipe.delete(self._key("owner", analysis_id))
+            else:
+                pipe.zadd(self._key("leases"), {analysis_id: time.time() + lease_seconds})
+
+        return await self._fenced(analysis_id, worker_id, write)
+
+    async def renew(self, analysis_id: str, worker_id: str, lease_seconds: float = 120.0) -> bool:
+        def write(pipe: Any, cancelled: bool) -> None:
+            pipe.zadd(self._key("leases"), {analysis_id: time.time() + lease_seconds})
+
+        return await self._fenced(analysis_id, worker_id, write)
+
+    async def _fenced(
+        self,
+        analysis_id: str,
+        worker_id: str,
+        write: Callable[[Any, bool], None],
+    ) -> bool:
+        """
+        Queue ``write(pipe, cancelled)`` in a transaction fenced by the lease.
+
+        The owner and cancel keys are WATCHed, so the writes are dropped and
+        retried if another worker takes the lease over or a cancel arrives
+        between the owner check and EXEC.
+        """
+        owner_key = self._key("owner", analysis_id)
+        cancel_key = self._key("cancel", analysis_id)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(owner_key, cancel_key)
+                    if self._text(await pipe.get(owner_key)) != worker_id:
+                        await pipe.unwatch()
+                        return False
+                    cancelled = bool(await pipe.exists(cancel_key))
+                    pipe.multi()
+                    write(pipe, cancelled)
+                    await pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    async def load(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        state = await self._state(analysis_id)
+        if state is None:
+            return None
+        return {**state, "scene_assessments": await self._blocks(analysis_id)}
+
+    async def request_cancel(self, analysis_id: str) -> None:
+        await self._redis.set(self._key("cancel", analysis_id), "1")
+        await self._redis.hset(self._key("state", analysis_id), "status", _dumps("cancelled"))
+
+    async def is_cancel_requested(self, analysis_id: str) -> bool:
+        return bool(await self._redis.exists(self._key("cancel", analysis_id)))
+
+    async def close(self) -> None:
+        close = getattr(self._redis, "aclose", None) or getattr(self._redis, "close", None)
+        if close is not None:
+            await close()
+
+
+def create_job_store(
+    backend: str,
+    sqlite_path: Optional[str] = None,
+    redis_url: Optional[str] = None,
+) -> Optional[AnalysisJobStore]:
+    """
+    Build the job store selected by configuration (memory, sqlite or redis).
+
+    The memory backend returns None: a single process keeps its analyses in
+    the manager itself, and a second in-memory copy would only duplicate them.
+    """
+    backend = backend.lower()
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        if not sqlite_path:
+            raise ValueError("The sqlite analysis job backend requires a database path")
+        return SqliteJobStore(sqlite_path)
+    if backend == "redis":
+        if not redis_url:
+            raise ValueError("The redis analysis job backend requires a Redis URL")
+        return RedisJobStore(aioredis.from_url(redis_url, decode_responses=True))
+    raise ValueError(f"Unknown analysis job backend: {backend}")
@@ -10,35 +10,14 @@ from __future__ import annotations
 import asyncio
 import logging
 import math
+import os
+import socket
+import time
 import uuid
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-# Avoid circular imports by defining enums locally
-from enum import Enum
-
-class Severity(str, Enum):
-    """Content severity levels."""
-    NONE = "none"
-    MILD = "mild"
-    MODERATE = "moderate"
-    SEVERE = "severe"
-
-class Category(str, Enum):
-    """Content categories for analysis."""
-    VIOLENCE = "violence"
-    SEXUAL_CONTENT = "sexual_content"
-    LANGUAGE = "language"
-    ALCOHOL_DRUGS = "alcohol_drugs"
-    DISTURBING_SCENES = "disturbing_scenes"
-
-class AgeRating(str, Enum):
-    """Age rating categories."""
-    ZERO_PLUS = "0+"
-    SIX_PLUS = "6+"
-    TWELVE_PLUS = "12+"
-    SIXTEEN_PLUS = "16+"
-    EIGHTEEN_PLUS = "18+"
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Tuple
 
 # Runtime imports
 def get_enums():
@@ -48,118 +27,504 @@ def get_enums():
 
 
 
+from .analysis_archive import AnalysisArchive
+from .analysis_jobs import TERMINAL_STATUSES, AnalysisJob, AnalysisJobStore
+from .analysis_scheduler import AnalysisScheduler
+from .analysis_state import AnalysisState
+from .assessment_cache import BlockAssessmentCache, block_fingerprint
+from .block_fingerprint import NearDuplicateIndex
+from .content_categories import (
+    CATEGORY_KEYWORDS,
+    RATING_ORDER,
+    SEVERITY_ORDER,
+    AgeRating,
+    Category,
+    Severity,
+    category_keyword_matches,
+    tag_categories,
+)
+from .keyword_matcher import first_offsets
 from .knowledge_base import KnowledgeBase
 from .script_store import ScriptStore
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Category keywords using local enums
-CATEGORY_KEYWORDS = {
-    Category.VIOLENCE: {
-        Severity.SEVERE: ["убий", "расстрел", "кров", "пытк", "казн"],
-        Severity.MODERATE: ["драка", "бой", "оруж", "удар", "атака"],
-        Severity.MILD: ["спор", "угроз", "конфликт", "схват"],
-    },
-    Category.SEXUAL_CONTENT: {
-        Severity.SEVERE: ["порн", "секс", "интим", "эротич", "совокуп"],
-        Severity.MODERATE: ["поцелу", "страсть", "половой", "обнажен"],
-        Severity.MILD: ["флирт", "намек", "романтич", "симпат"],
-    },
-    Category.LANGUAGE: {
-        Severity.SEVERE: ["нецензур", "мат", "ругательств"],
-        Severity.MODERATE: ["оскорб", "бран", "ругал"],
-        Severity.MILD: ["груб", "сарказм", "насмеш"],
-    },
-    Category.ALCOHOL_DRUGS: {
-        Severity.SEVERE: ["наркот", "героин", "инъек", "употреб"],
-        Severity.MODERATE: ["алког", "пьян", "курен", "пиво"],
-        Severity.MILD: ["бар", "вин", "шампан", "сигар"],
-    },
-    Category.DISTURBING_SCENES: {
-        Severity.SEVERE: ["труп", "расчлен", "ужас", "кошмар", "паник"],
-        Severity.MODERATE: ["страх", "крик", "паник", "страшн"],
-        Severity.MILD: ["напряж", "тревог", "волн"],
-    },
-}
-
-# Severity and rating order using local enums
-SEVERITY_ORDER = [Severity.NONE, Severity.MILD, Severity.MODERATE, Severity.SEVERE]
-RATING_ORDER = [
-    AgeRating.ZERO_PLUS,
-    AgeRating.SIX_PLUS,
-    AgeRating.TWELVE_PLUS,
-    AgeRating.SIXTEEN_PLUS,
-    AgeRating.EIGHTEEN_PLUS,
+# Bump when a change to detection, retrieval or comments alters assessments,
+# so cached block assessments of the previous analyzer are not reused
+ANALYZER_VERSION = "1"
+
+# Optional last cascade stage: receives the block text, the rule-based
+# severities and the references, and returns revised severities or None
+BlockClassifier = Callable[
+    [str, Dict[Category, Severity], List[Dict[str, Any]]],
+    Awaitable[Optional[Dict[Category, Severity]]],
 ]
 
+class _ReferenceReuse:
+    """Reference lookups of one analysis, shared by near-duplicate blocks."""
+
+    def __init__(self, fingerprints: NearDuplicateIndex) -> None:
+        self.fingerprints = fingerprints
+        # Per block: the block whose lookup it uses, None when it needs none
+        self.sources: List[Optional[int]] = []
+        # Resolved once the owning block's window has fetched its references
+        self.references: Dict[int, asyncio.Future] = {}
+        self.lookups = 0
+        self.reused = 0
+
+    def plan(
+        self,
+        block_texts: List[str],
+        block_categories: List[Optional[List[Category]]],
+    ) -> None:
+        """
+        Decide up front which blocks query the knowledge base.
+
+        A block whose text nearly matches an earlier block with the same
+        retrieval categories reuses that block's lookup; blocks with an empty
+        category list need none, ``None`` asks for an unscoped lookup.
+        """
+        loop = asyncio.get_running_loop()
+        source_categories: Dict[int, Optional[List[Category]]] = {}
+        for block, (text, categories) in enumerate(zip(block_texts, block_categories)):
+            if categories is not None and not categories:
+                self.sources.append(None)
+                continue
+            original = self.fingerprints.find_or_add(block, text)
+            if original is not None and source_categories[original] == categories:
+                self.sources.append(original)
+                self.reused += 1
+            else:
+                source_categories[block] = categories
+                self.sources.append(block)
+                self.references[block] = loop.create_future()
+                self.lookups += 1
+
+    def stats(self, blocks_total: int) -> Dict[str, Any]:
+        with_references = self.lookups + self.reused
+        return {
+            "blocks_total": blocks_total,
+            "reference_lookups": self.lookups,
+            "references_reused": self.reused,
+            "reuse_rate": round(self.reused / with_references, 4) if with_references else 0.0,
+        }
+
 
 class AnalysisManager:
     """Coordinates script analysis and exposes incremental progress information."""
 
-    def __init__(self, knowledge_base: KnowledgeBase, script_store: ScriptStore) -> None:
+    def __init__(
+        self,
+        knowledge_base: KnowledgeBase,
+        script_store: ScriptStore,
+        reference_batch_size: int = 32,
+        near_duplicate_threshold: float = 0.8,
+        assessment_concurrency: int = 4,
+        cascade: bool = True,
+        block_classifier: Optional[BlockClassifier] = None,
+        assessment_cache_size: int = 10000,
+        job_store: Optional[AnalysisJobStore] = None,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = 120.0,
+        run_locally: bool = True,
+        poll_interval: float = 1.0,
+        scheduler: Optional[AnalysisScheduler] = None,
+        archive: Optional[AnalysisArchive] = None,
+        retained_analyses: int = 32,
+        retention_seconds: float = 900.0,
+    ) -> None:
         self._knowledge_base = knowledge_base
         self._script_store = script_store
-        self._analyses: Dict[str, Dict[str, Any]] = {}
-        self._lock = asyncio.Lock()
+        # Number of blocks whose references are fetched in one batch query
+        self._reference_batch_size = max(1, reference_batch_size)
+        # Estimated shingle similarity above which blocks share references
+        self._near_duplicate_threshold = near_duplicate_threshold
+        # Number of block windows assessed concurrently ahead of publishing
+        self._assessment_concurrency = max(1, assessment_concurrency)
+        # Cascade: retrieval only for flagged or borderline blocks, the
+        # classifier only for blocks the rules are unsure about
+        self._cascade = cascade
+        self._block_classifier = block_classifier
+        # Assessments of unchanged blocks are reused across analyses
+        self._assessment_cache = BlockAssessmentCache(max_entries=assessment_cache_size)
+        self._analyzer_version = (
+            f"{ANALYZER_VERSION}:cascade={cascade}:"
+            f"classifier={getattr(block_classifier, '__qualname__', block_classifier)}"
+        )
+        # One state object per analysis run by this process; readers never take a lock
+        self._analyses: Dict[str, AnalysisState] = {}
+        # Shared job store: analyses run by other workers are read from it
+        # and every published update is checkpointed to it
+        self._job_store = job_store
+        self._worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease_seconds = lease_seconds
+        # Without it new analyses are only queued for worker processes
+        self._run_locally = run_locally or job_store is None
+        # Interval of job store polls for new jobs and remote status changes
+        self._poll_interval = poll_interval
+        # Caps concurrent analyses and orders the waiting ones fairly per client
+        self._scheduler = scheduler or AnalysisScheduler()
+        # Finished analyses stay in memory while they are among the most recent
+        # ``retained_analyses`` and younger than ``retention_seconds``; older
+        # ones are only served from the archive (or the job store)
+        self._archive = archive
+        self._retained_analyses = max(0, retained_analyses)
+        self._retention_seconds = retention_seconds
+        # Finished analyses still in memory: finish time and archived JSON size
+        self._retired: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+
+    @property
+    def scheduler(self) -> AnalysisScheduler:
+        return self._scheduler
 
     async def start_analysis(
         self,
         document_id: str,
         options: Dict[str, Any],
         criteria_document_id: Optional[str],
-    ) -> Dict[str, Any]:
-        """Create a new analysis task and schedule its execution."""
+        client_id: str = "anonymous",
+    ) -> Mapping[str, Any]:
+        """
+        Create a new analysis task and schedule its execution.
+
+        The analysis starts right away when the scheduler has a free slot and
+        is queued behind ``client_id``'s earlier analyses otherwise. Raises
+        ``SchedulerOverloaded`` when the queue is full.
+        """
         script_payload = await self._script_store.get_script(document_id)
         if not script_payload:
             raise ValueError(f"Script with document_id={document_id} not found")
 
+        self._evict_retired()
         analysis_id = str(uuid.uuid4())
+        admitted = self._scheduler.submit(analysis_id, client_id) if self._run_locally else None
         initial_state = {
             "analysis_id": analysis_id,
             "document_id": document_id,
             "criteria_document_id": criteria_document_id,
             "options": options,
-            "status": "processing",
+            "client_id": client_id,
+            # Without a local run the job waits for a worker to claim it
+            "status": "processing" if admitted is not None and admitted.done() else "queued",
+            "queue_position": None,
+            "estimated_time_remaining": None,
             "progress": 0.0,
             "created_at": datetime.utcnow(),
             "scene_assessments": [],
             "rating_result": None,
             "recommendations": [],
+            "processing_stats": None,
             "errors": None,
         }
 
-        async with self._lock:
-            self._analyses[analysis_id] = initial_state
+        if self._job_store is not None:
+            await self._job_store.create(
+                analysis_id,
+                initial_state,
+                script_payload,
+                owner=self._worker_id if self._run_locally else None,
+                lease_seconds=self._lease_seconds,
+            )
+            if not self._run_locally:
+                return MappingProxyType(initial_state)
+
+        state = AnalysisState(initial_state)
+        self._analyses[analysis_id] = state
 
         asyncio.create_task(
-            self._run_analysis(
+            self._run_scheduled(
+                admitted,
                 analysis_id=analysis_id,
                 script_payload=script_payload,
                 options=options,
                 criteria_document_id=criteria_document_id,
             )
         )
+        await self._publish_queue_positions()
 
-        return initial_state
+        return state.snapshot
 
-    async def get_status(self, analysis_id: str) -> Dict[str, Any]:
-        """Return current state snapshot for the analysis."""
-        async with self._lock:
-            if analysis_id not in self._analyses:
-                raise KeyError(f"Analysis {analysis_id} not found")
-            return self._analyses[analysis_id]
+    async def get_status(self, analysis_id: str) -> Mapping[str, Any]:
+        """
+        Return the latest immutable state snapshot of the analysis.
+
+        Analyses no longer held in memory are loaded from the archive or the
+        job store on each call.
+        """
+        state = self._analyses.get(analysis_id)
+        if state is None:
+            return await self._load_stored(analysis_id)
+        return state.snapshot
+
+    async def run_worker(self) -> None:
+        """
+        Claim queued jobs and jobs whose worker stopped renewing its lease.
+
+        A claimed job resumes after its last checkpointed block. Jobs are
+        only claimed while the scheduler has a free slot, so a worker runs
+        as many jobs as the concurrency cap allows. Runs until cancelled.
+        """
+        if self._job_store is None:
+            raise RuntimeError("Analysis workers require a job store")
+        while True:
+            if not self._scheduler.has_capacity():
+                await asyncio.sleep(self._poll_interval)
+                continue
+            job = await self._job_store.claim(self._worker_id, self._lease_seconds)
+            if job is None:
+                await asyncio.sleep(self._poll_interval)
+                continue
+            asyncio.create_task(self._resume(job))
+            # Let the job take its slot before checking the capacity again
+            await asyncio.sleep(0)
+
+    async def _resume(self, job: AnalysisJob) -> None:
+        """Rebuild the state of a claimed job and continue its analysis."""
+        if job.analysis_id in self._analyses:
+            return  # still running here; the claim only renewed its lease
+        completed = [self._restore_assessment(assessment) for assessment in job.assessments]
+        state = AnalysisState({
+            name: value for name, value in job.state.items() if name != "scene_assessments"
+        })
+        for assessment in completed:
+            state.publish({"scene_assessments": assessment})
+        self._analyses[job.analysis_id] = state
+        logger.info(
+            "Worker %s resumes analysis %s after %d blocks",
+            self._worker_id, job.analysis_id, len(completed),
+        )
+        admitted = self._scheduler.submit(job.analysis_id, job.state.get("client_id") or "anonymous")
+        await self._run_scheduled(
+            admitted,
+            analysis_id=job.analysis_id,
+            script_payload=job.script_payload,
+            options=job.state.get("options") or {},
+            criteria_document_id=job.state.get("criteria_document_id"),
+            completed_blocks=completed,
+        )
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Analyses held in memory and on disk, for health reporting."""
+        self._evict_retired()
+        stats: Dict[str, Any] = {
+            "active_analyses": len(self._analyses) - len(self._retired),
+            "retained_analyses": len(self._retired),
+            "retained_json_bytes": sum(size for _, size in self._retired.values()),
+            "assessment_cache_entries": len(self._assessment_cache),
+            "queued_analyses": self._scheduler.queued,
+        }
+        if self._job_store is not None:
+            stats.update(self._job_store.memory_stats())
+        if self._archive is not None:
+            stats.update(self._archive.stats())
+        return stats
+
+    async def _load_stored(self, analysis_id: str) -> Mapping[str, Any]:
+        stored = await self._archive.load(analysis_id) if self._archive is not None else None
+        if stored is None and self._job_store is not None:
+            stored = await self._job_store.load(analysis_id)
+        if stored is None:
+            raise KeyError(f"Analysis {analysis_id} not found")
+        return MappingProxyType(stored)
+
+    async def stream_events(
+        self,
+        analysis_id: str,
+        since_block: int = 0,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield delta events of an analysis until it reaches a terminal status.
+
+        Every newly published block is yielded once as a ``block`` event,
+        followed by a ``progress`` event when progress or status changed.
+        The last event is ``status`` with the final results. Blocks before
+        ``since_block`` are skipped, which lets a client resume a stream.
+        """
+        state = self._analyses.get(analysis_id)
+        if state is None:
+            snapshots = self._poll_snapshots(analysis_id, await self._load_stored(analysis_id))
+        else:
+            snapshots = self._watch_snapshots(analysis_id, state)
+
+        try:
+            sent_blocks = max(0, since_block)
+            last_progress = None
+            async for snapshot in snapshots:
+                assessments = snapshot["scene_assessments"]
+                for index in range(sent_blocks, len(assessments)):
+                    yield {"event": "block", "index": index, "assessment": assessments[index]}
+                sent_blocks = max(sent_blocks, len(assessments))
+
+                progress = (snapshot.get("progress"), snapshot.get("status"))
+                if progress != last_progress:
+                    last_progress = progress
+                    yield {
+                        "event": "progress",
+                        "progress": snapshot.get("progress", 0.0),
+                        "status": snapshot.get("status"),
+                        "processed_blocks": len(assessments),
+                    }
+
+                if snapshot.get("status") in TERMINAL_STATUSES:
+                    yield {"event": "status", "snapshot": snapshot}
+                    return
+        finally:
+            await snapshots.aclose()
+
+    async def _watch_snapshots(
+        self,
+        analysis_id: str,
+        state: AnalysisState,
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        """
+        Yield the current snapshot, then every newer one as it is published.
+
+        If the analysis moves to another worker, follow it through the job
+        store instead.
+        """
+        changed = state.watch()
+        try:
+            while not state.detached:
+                yield state.snapshot
+                await changed.wait()
+                changed.clear()
+        finally:
+            state.unwatch(changed)
+        async for snapshot in self._poll_snapshots(analysis_id, await self._load_stored(analysis_id)):
+            yield snapshot
+
+    async def _poll_snapshots(
+        self,
+        analysis_id: str,
+        snapshot: Mapping[str, Any],
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        """Yield snapshots of an analysis run by another worker."""
+        while True:
+            yield snapshot
+            await asyncio.sleep(self._poll_interval)
+            snapshot = await self._load_stored(analysis_id)
 
     async def cancel_analysis(self, analysis_id: str) -> None:
         """Mark an analysis as cancelled."""
-        async with self._lock:
+        state = self._analyses.get(analysis_id)
+        snapshot = state.snapshot if state is not None else await self._load_stored(analysis_id)
+        if snapshot.get("status") == "completed":
+            raise ValueError("Analysis already completed")
+        if self._job_store is not None:
+            # The worker running the analysis sees the flag before its next block
+            await self._job_store.request_cancel(analysis_id)
+        if state is not None:
+            state.cancel_requested = True
+            state.publish({"status": "cancelled"})
+            if self._scheduler.withdraw(analysis_id):
+                await self._publish_queue_positions()
+
+    async def _run_scheduled(
+        self,
+        admitted: asyncio.Future,
+        analysis_id: str,
+        **run_arguments: Any,
+    ) -> None:
+        """Wait for a scheduler slot, run the analysis and hand the slot on."""
+        heartbeat = (
+            asyncio.create_task(self._heartbeat(analysis_id)) if self._job_store is not None else None
+        )
+        try:
+            if not await admitted:
+                return  # withdrawn while queued
+            await self._update_state(
+                analysis_id,
+                {
+                    "status": "processing",
+                    "queue_position": None,
+                    "estimated_time_remaining": None,
+                    "started_at": datetime.utcnow(),
+                },
+            )
+            if analysis_id not in self._analyses:
+                return  # another worker took the job over while it was queued
+            await self._run_analysis(analysis_id=analysis_id, **run_arguments)
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            self._scheduler.release(analysis_id)
+            await self._publish_queue_positions()
+            await self._retire(analysis_id)
+
+    async def _heartbeat(self, analysis_id: str) -> None:
+        """
+        Renew the lease of a held job while it waits for a slot or works.
+
+        Checkpoints renew the lease too, but a queued job or a slow window
+        may go longer than the lease without one.
+        """
+        interval = self._lease_seconds / 3
+        while analysis_id in self._analyses:
+            await asyncio.sleep(interval)
+            if analysis_id not in self._analyses:
+                return
+            try:
+                renewed = await self._job_store.renew(analysis_id, self._worker_id, self._lease_seconds)
+            except Exception as exc:  # noqa: BLE001 - the next beat or checkpoint retries
+                logger.warning("Failed to renew the lease of analysis %s: %s", analysis_id, exc)
+                continue
+            if not renewed:
+                self._drop_lost_lease(analysis_id)
+                return
+
+    def _drop_lost_lease(self, analysis_id: str) -> None:
+        """Forget an analysis whose lease expired and was claimed by another worker."""
+        logger.warning("Worker %s lost the lease of analysis %s", self._worker_id, analysis_id)
+        state = self._analyses.pop(analysis_id, None)
+        if state is not None:
+            # Watchers follow the analysis to its new worker
+            state.detach()
+        self._scheduler.withdraw(analysis_id)
+
+    async def _retire(self, analysis_id: str) -> None:
+        """Archive a finished analysis and apply the retention policy."""
+        state = self._analyses.get(analysis_id)
+        if state is None or state.snapshot.get("status") not in TERMINAL_STATUSES:
+            return
+        size = 0
+        if self._archive is not None:
+            try:
+                size = await self._archive.save(analysis_id, state.snapshot)
+            except Exception as exc:  # noqa: BLE001 - keep it in memory instead
+                logger.warning("Failed to archive analysis %s: %s", analysis_id, exc)
+                return
+        if self._job_store is not None:
+            # In-process stores would otherwise keep every finished job forever
+            await self._job_store.discard(analysis_id)
+        self._retired[analysis_id] = (time.monotonic(), size)
+        self._evict_retired()
+
+    def _evict_retired(self) -> None:
+        """Drop finished analyses beyond the retention count or age from memory."""
+        now = time.monotonic()
+        while self._retired:
+            analysis_id, (retired_at, _) = next(iter(self._retired.items()))
+            if (
+                len(self._retired) <= self._retained_analyses
+                and now - retired_at < self._retention_seconds
+            ):
+                break
+            del self._retired[analysis_id]
+            self._analyses.pop(analysis_id, None)
+
+    async def _publish_queue_positions(self) -> None:
+        """Publish the queue position and expected wait of every queued analysis."""
+        for analysis_id, position in self._scheduler.queue_positions().items():
             state = self._analyses.get(analysis_id)
-            if not state:
-                raise KeyError(f"Analysis {analysis_id} not found")
-            if state.get("status") == "completed":
-                raise ValueError("Analysis already completed")
-            state["status"] = "cancelled"
-            state["progress"] = state.get("progress", 0.0)
+            if state is None:
+                continue
+            update = {
+                "queue_position": position,
+                "estimated_time_remaining": self._scheduler.estimate_wait(position),
+            }
+            if any(state.snapshot.get(name) != value for name, value in update.items()):
+                await self._update_state(analysis_id, update)
 
     async def _run_analysis(
         self,
@@ -167,8 +532,14 @@ class AnalysisManager:
         script_payload: Dict[str, Any],
         options: Dict[str, Any],
         criteria_document_id: Optional[str],
+        completed_blocks: Optional[List[Dict[str, Any]]] = None,
     ) -> None:
-        """Execute the analysis workflow and update progress incrementally."""
+        """
+        Execute the analysis workflow and update progress incrementally.
+
+        ``completed_blocks`` are the checkpointed assessments of a resumed
+        analysis; only the blocks after them are assessed.
+        """
         try:
             paragraph_details: List[Dict[str, Any]] = script_payload.get(
                 "paragraph_details", []
@@ -188,42 +559,92 @@ class AnalysisManager:
                 category: Severity.NONE for category in Category
             }
             problem_blocks = 0
+            tier_counts = {"rules": 0, "retrieval": 0, "classifier": 0}
+            blocks_reused = 0
 
-            for index, block in enumerate(blocks, start=1):
-                if await self._is_cancelled(analysis_id):
-                    await self._update_state(
-                        analysis_id,
-                        {
-                            "status": "cancelled",
-                            "progress": round(index / len(blocks) * 100, 2),
-                        },
-                    )
-                    return
+            completed = (completed_blocks or [])[:len(blocks)]
+            resume_from = len(completed)
+            for block_result in completed:
+                if block_result["reused"]:
+                    blocks_reused += 1
+                else:
+                    tier_counts[block_result["assessment_tier"]] += 1
+                problem_blocks += self._accumulate(block_result, aggregated_categories)
 
-                block_result = await self._assess_block(
-                    block_number=index,
-                    block_paragraphs=block,
-                    criteria_document_id=criteria_document_id,
-                )
+            block_texts = [self._block_text(block) for block in blocks]
+            block_detections = [self._detect_categories(text) for text in block_texts]
 
-                block_severity_values = block_result["categories"]
-                if any(value != Severity.NONE for value in block_severity_values.values()):
-                    problem_blocks += 1
-
-                for category, severity in block_severity_values.items():
-                    if SEVERITY_ORDER.index(severity) > SEVERITY_ORDER.index(
-                        aggregated_categories[category]
-                    ):
-                        aggregated_categories[category] = severity
-
-                progress = round(index / len(blocks) * 100, 2)
-                await self._update_state(
-                    analysis_id,
-                    {
-                        "scene_assessments": block_result,
-                        "progress": progress,
-                    },
+            # Unchanged blocks of an earlier draft keep their assessment. Blocks
+            # without a match in the criteria document fall back to the whole
+            # base, so their assessment depends on the whole corpus either way.
+            criteria_version = self._knowledge_base.corpus_version()
+            if criteria_document_id:
+                criteria_version = f"{criteria_document_id}:{criteria_version}"
+            block_keys = [
+                block_fingerprint(text, criteria_version, self._analyzer_version)
+                for text in block_texts
+            ]
+            cached_assessments = [None] * resume_from + [
+                self._assessment_cache.get(key) for key in block_keys[resume_from:]
+            ]
+            retrieval_categories = [
+                [] if block < resume_from or cached is not None
+                else self._retrieval_categories(text, detection[0])
+                for block, (text, detection, cached) in enumerate(
+                    zip(block_texts, block_detections, cached_assessments)
                 )
+            ]
+            reuse = _ReferenceReuse(NearDuplicateIndex(threshold=self._near_duplicate_threshold))
+            reuse.plan(block_texts, retrieval_categories)
+
+            # Windows are assessed concurrently but published strictly in order
+            window_size = self._reference_batch_size
+            pending_windows = deque(range(resume_from, len(blocks), window_size))
+            in_flight: Deque[asyncio.Task] = deque()
+            index = resume_from
+            try:
+                while pending_windows or in_flight:
+                    while pending_windows and len(in_flight) < self._assessment_concurrency:
+                        first_block = pending_windows.popleft()
+                        in_flight.append(asyncio.create_task(self._assess_window(
+                            first_block,
+                            blocks[first_block:first_block + window_size],
+                            block_detections,
+                            retrieval_categories,
+                            cached_assessments,
+                            criteria_document_id,
+                            reuse,
+                        )))
+
+                    # Checked before waiting too, so a cancel does not wait out a window
+                    if await self._is_cancelled(analysis_id):
+                        await self._stop_cancelled(analysis_id, index, len(blocks))
+                        return
+
+                    for block_result in await in_flight.popleft():
+                        if await self._is_cancelled(analysis_id):
+                            await self._stop_cancelled(analysis_id, index, len(blocks))
+                            return
+                        index += 1
+
+                        if block_result["reused"]:
+                            blocks_reused += 1
+                        else:
+                            tier_counts[block_result["assessment_tier"]] += 1
+                            self._assessment_cache.put(block_keys[index - 1], block_result)
+                        problem_blocks += self._accumulate(block_result, aggregated_categories)
+
+                        progress = round(index / len(blocks) * 100, 2)
+                        await self._update_state(
+                            analysis_id,
+                            {
+                                "scene_assessments": block_result,
+                                "progress": progress,
+                            },
+                        )
+            finally:
+                for task in in_flight:
+                    task.cancel()
 
             rating_summary = self._build_rating_summary(
                 aggregated_categories=aggregated_categories,
@@ -238,6 +659,11 @@ class AnalysisManager:
                 {
                     "rating_result": rating_summary,
                     "recommendations": recommendations,
+                    "processing_stats": {
+                        **reuse.stats(len(blocks)),
+                        "tier_counts": tier_counts,
+                        "blocks_reused": blocks_reused,
+                    },
                     "status": "completed",
                     "progress": 100.0,
                 },
@@ -253,25 +679,50 @@ class AnalysisManager:
             )
 
     async def _update_state(self, analysis_id: str, payload: Dict[str, Any]) -> None:
-        async with self._lock:
-            state = self._analyses.get(analysis_id)
-            if not state:
+        state = self._analyses.get(analysis_id)
+        if state is None:
+            return
+        # A cancelled analysis keeps its status even if the worker finishes
+        if state.cancel_requested and payload.get("status", "cancelled") != "cancelled":
+            return
+        if self._job_store is not None:
+            fields = dict(payload)
+            assessment = fields.pop("scene_assessments", None)
+            checkpointed = await self._job_store.checkpoint(
+                analysis_id,
+                fields,
+                self._worker_id,
+                lease_seconds=self._lease_seconds,
+                block_index=len(state.snapshot["scene_assessments"]) if assessment is not None else None,
+                assessment=assessment,
+            )
+            if not checkpointed:
+                self._drop_lost_lease(analysis_id)
                 return
-
-            assessments = state.setdefault("scene_assessments", [])
-            if "scene_assessments" in payload and isinstance(payload["scene_assessments"], dict):
-                assessments.append(payload.pop("scene_assessments"))
-            state.update(payload)
+            # A cancel may have landed while the checkpoint was written
+            if state.cancel_requested and payload.get("status", "cancelled") != "cancelled":
+                return
+        state.publish(payload)
 
     async def _gather_assessments(self, analysis_id: str) -> List[Dict[str, Any]]:
-        async with self._lock:
-            state = self._analyses.get(analysis_id, {})
-            return list(state.get("scene_assessments", []))
+        state = self._analyses.get(analysis_id)
+        return list(state.snapshot["scene_assessments"]) if state is not None else []
+
+    async def _stop_cancelled(self, analysis_id: str, published: int, total: int) -> None:
+        """Record a cancelled run with the progress of its published blocks."""
+        await self._update_state(
+            analysis_id,
+            {"status": "cancelled", "progress": round(published / total * 100, 2)},
+        )
 
     async def _is_cancelled(self, analysis_id: str) -> bool:
-        async with self._lock:
-            state = self._analyses.get(analysis_id)
-            return bool(state and state.get("status") == "cancelled")
+        state = self._analyses.get(analysis_id)
+        if state is None:
+            # A worker that lost its lease stops like a cancelled one
+            return self._job_store is not None
+        if not state.cancel_requested and self._job_store is not None:
+            state.cancel_requested = await self._job_store.is_cancel_requested(analysis_id)
+        return state.cancel_requested
 
     def _build_blocks(self, paragraph_details: List[Dict[str, Any]], max_words: int = 160):
         """Group consecutive paragraphs into semantic blocks by word count."""
@@ -301,24 +752,206 @@ class AnalysisManager:
 
         return blocks
 
+    async def _assess_window(
+        self,
+        first_block: int,
+        window: List[List[Dict[str, Any]]],
+        block_detections: List[tuple],
+        retrieval_categories: List[Optional[List[Category]]],
+        cached_assessments: List[Optional[Dict[str, Any]]],
+        criteria_document_id: Optional[str],
+        reuse: _ReferenceReuse,
+    ) -> List[Dict[str, Any]]:
+        """Fetch references for a window of blocks and assess the changed ones."""
+        window_end = first_block + len(window)
+        # Scene checks waiting on the knowledge base go first
+        await self._scheduler.yield_to_interactive()
+        references = await self._fetch_window_references(
+            first_block,
+            [self._block_text(block) for block in window],
+            retrieval_categories[first_block:window_end],
+            criteria_document_id,
+            reuse,
+        )
+        results: List[Dict[str, Any]] = []
+        for position, block in enumerate(window):
+            block_index = first_block + position
+            cached = cached_assessments[block_index]
+            if cached is not None:
+                results.append(self._reuse_assessment(
+                    block_number=block_index + 1,
+                    block_paragraphs=block,
+                    detection=block_detections[block_index],
+                    cached=cached,
+                ))
+                continue
+            await self._scheduler.yield_to_interactive()
+            results.append(await self._assess_block(
+                block_number=block_index + 1,
+                block_paragraphs=block,
+                criteria_document_id=criteria_document_id,
+                references=references[position],
+                detection=block_detections[block_index],
+                retrieval_categories=retrieval_categories[block_index],
+            ))
+        return results
+
+    async def _fetch_window_references(
+        self,
+        first_block: int,
+        block_texts: List[str],
+        block_categories: List[Optional[List[Category]]],
+        criteria_document_id: Optional[str],
+        reuse: _ReferenceReuse,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Fetch references for a window of blocks, once per near-duplicate group.
+
+        Blocks planned as lookups are queried in one batch and resolve their
+        shared futures; the other blocks wait for the lookup they reuse,
+        which always belongs to this or an earlier window.
+        """
+        lookups = [
+            position for position in range(len(block_texts))
+            if reuse.sources[first_block + position] == first_block + position
+        ]
+        try:
+            fetched = await self._fetch_references(
+                [block_texts[position] for position in lookups],
+                criteria_document_id,
+                [block_categories[position] for position in lookups],
+            )
+        except BaseException as exc:
+            for position in lookups:
+                future = reuse.references[first_block + position]
+                if future.done():
+                    continue
+                if isinstance(exc, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(RuntimeError(f"Reference lookup failed: {exc}"))
+            raise
+
+        for position, refs in zip(lookups, fetched):
+            reuse.references[first_block + position].set_result(refs)
+
+        references: List[List[Dict[str, Any]]] = []
+        for position in range(len(block_texts)):
+            source = reuse.sources[first_block + position]
+            references.append([] if source is None else await reuse.references[source])
+        return references
+
+    async def _fetch_references(
+        self,
+        block_texts: List[str],
+        criteria_document_id: Optional[str],
+        block_categories: Optional[List[Optional[List[Category]]]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Fetch references for blocks from the matching criteria partitions.
+
+        Lookups are scoped to the criteria document when one is set and, when
+        ``block_categories`` is given, to the chunks tagged with the block's
+        categories. Blocks with an empty category list skip retrieval and
+        ``None`` entries are looked up without a category filter. Blocks
+        sharing a category set are fetched with one batch query.
+        """
+        references: List[List[Dict[str, Any]]] = [[] for _ in block_texts]
+        groups: Dict[frozenset, List[int]] = {}
+        for index in range(len(block_texts)):
+            if block_categories is None or block_categories[index] is None:
+                groups.setdefault(frozenset(), []).append(index)
+            elif block_categories[index]:
+                tags = frozenset(category.value for category in block_categories[index])
+                groups.setdefault(tags, []).append(index)
+
+        for tags, indexes in groups.items():
+            filters: Dict[str, Any] = {}
+            if criteria_document_id:
+                filters["document_id"] = criteria_document_id
+            if tags:
+                filters["categories"] = sorted(tags)
+
+            found = await self._knowledge_base.query_many(
+                [block_texts[index] for index in indexes],
+                top_k=2,
+                filters=filters or None,
+            )
+            for index, refs in zip(indexes, found):
+                references[index] = refs
+
+            # Blocks with no match in the selected partitions fall back to the whole base
+            missing = [index for index, refs in zip(indexes, found) if not refs]
+            if filters and missing:
+                fallback = await self._knowledge_base.query_many(
+                    [block_texts[index] for index in missing], top_k=2,
+                )
+                for index, refs in zip(missing, fallback):
+                    references[index] = refs
+        return references
+
+    @staticmethod
+    def _flagged_categories(categories: Dict[Category, Severity]) -> List[Category]:
+        return [category for category, severity in categories.items() if severity != Severity.NONE]
+
+    def _retrieval_categories(
+        self,
+        text: str,
+        categories: Dict[Category, Severity],
+    ) -> Optional[List[Category]]:
+        """
+        Categories whose criteria a block is checked against.
+
+        Flagged blocks use their detected categories. In cascade mode a clean
+        block is borderline when it only contains criteria wording (e.g.
+        "насилие" without a severity keyword) and is checked against those
+        categories; other clean blocks skip retrieval. Without the cascade
+        clean blocks get an unscoped lookup (``None``).
+        """
+        flagged = self._flagged_categories(categories)
+        if flagged:
+            return flagged
+        if not self._cascade:
+            return None
+        return [Category(value) for value in tag_categories(text)]
+
+    @staticmethod
+    def _is_low_confidence(categories: Dict[Category, Severity], borderline: bool) -> bool:
+        """Rules are unsure about borderline blocks and blocks with mild matches only."""
+        highest = max(categories.values(), key=SEVERITY_ORDER.index)
+        return borderline or highest == Severity.MILD
+
+    @staticmethod
+    def _block_text(block_paragraphs: List[Dict[str, Any]]) -> str:
+        return " ".join(detail["text"] for detail in block_paragraphs)
+
     async def _assess_block(
         self,
         block_number: int,
         block_paragraphs: List[Dict[str, Any]],
         criteria_document_id: Optional[str],
+        references: Optional[List[Dict[str, Any]]] = None,
+        detection: Optional[tuple] = None,
+        retrieval_categories: Optional[List[Category]] = None,
     ) -> Dict[str, Any]:
         """Assign rating metadata for a single block."""
-        block_text = " ".join(detail["text"] for detail in block_paragraphs)
-        categories, flagged_content, highlights = self._detect_categories(block_text)
-        block_rating = self._calculate_block_rating(categories)
+        block_text = self._block_text(block_paragraphs)
+        categories, flagged_content, highlights = detection or self._detect_categories(block_text)
 
-        references = await self._knowledge_base.query(block_text, top_k=2)
-        if criteria_document_id:
-            references = [ref for ref in references if ref["document_id"] == criteria_document_id] or references
+        if references is None:
+            retrieval_categories = self._retrieval_categories(block_text, categories)
+            references = (await self._fetch_references(
+                [block_text], criteria_document_id, [retrieval_categories],
+            ))[0]
 
-        page_numbers = [detail.get("page", 1) for detail in block_paragraphs]
-        page_from, page_to = min(page_numbers), max(page_numbers)
-        page_range = str(page_from) if page_from == page_to else f"{page_from}-{page_to}"
+        tier = "rules" if retrieval_categories == [] else "retrieval"
+        borderline = bool(retrieval_categories) and not self._flagged_categories(categories)
+        if self._block_classifier is not None and self._is_low_confidence(categories, borderline):
+            revised = await self._block_classifier(block_text, categories, references)
+            if revised:
+                categories = {**categories, **revised}
+            tier = "classifier"
+        block_rating = self._calculate_block_rating(categories)
 
         heading = block_paragraphs[0]["text"][:80]
         comment = self._build_comment(block_rating, categories, references)
@@ -326,60 +959,117 @@ class AnalysisManager:
         return {
             "scene_number": block_number,
             "heading": heading,
-            "page_range": page_range,
+            "page_range": self._page_range(block_paragraphs),
             "age_rating": block_rating,
             "categories": categories,
             "flagged_content": flagged_content,
             "highlights": highlights,
             "llm_comment": comment,
             "references": references,
+            "assessment_tier": tier,
+            "reused": False,
             "text": block_text,
             "text_preview": block_text[:400],
         }
 
+    def _reuse_assessment(
+        self,
+        block_number: int,
+        block_paragraphs: List[Dict[str, Any]],
+        detection: tuple,
+        cached: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Rebuild a block assessment from the cached assessment of the same content."""
+        block_text = self._block_text(block_paragraphs)
+        _, flagged_content, highlights = detection
+        return {
+            "scene_number": block_number,
+            "heading": block_paragraphs[0]["text"][:80],
+            "page_range": self._page_range(block_paragraphs),
+            **cached,
+            "categories": dict(cached["categories"]),
+            "flagged_content": flagged_content,
+            "highlights": highlights,
+            "reused": True,
+            "text": block_text,
+            "text_preview": block_text[:400],
+        }
+
+    @staticmethod
+    def _restore_assessment(assessment: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a checkpointed assessment back to enum-typed ratings."""
+        return {
+            **assessment,
+            "age_rating": AgeRating(assessment["age_rating"]),
+            "categories": {
+                Category(category): Severity(severity)
+                for category, severity in assessment["categories"].items()
+            },
+        }
+
+    @staticmethod
+    def _accumulate(
+        block_result: Dict[str, Any],
+        aggregated_categories: Dict[Category, Severity],
+    ) -> int:
+        """Raise the aggregated severities to the block's; returns 1 for a problem block."""
+        block_severity_values = block_result["categories"]
+        for category, severity in block_severity_values.items():
+            if SEVERITY_ORDER.index(severity) > SEVERITY_ORDER.index(
+                aggregated_categories[category]
+            ):
+                aggregated_categories[category] = severity
+        return int(any(value != Severity.NONE for value in block_severity_values.values()))
+
+    @staticmethod
+    def _page_range(block_paragraphs: List[Dict[str, Any]]) -> str:
+        page_numbers = [detail.get("page", 1) for detail in block_paragraphs]
+        page_from, page_to = min(page_numbers), max(page_numbers)
+        return str(page_from) if page_from == page_to else f"{page_from}-{page_to}"
+
     def _detect_categories(
         self,
         text: str,
     ) -> (Dict[Category, Severity], List[str], List[Dict[str, Any]]):
-        lowered = text.lower()
         categories: Dict[Category, Severity] = {category: Severity.NONE for category in Category}
         flagged_content: List[str] = []
         highlights: List[Dict[str, Any]] = []
+        offsets = first_offsets(category_keyword_matches(text))
 
         for category, severity_map in CATEGORY_KEYWORDS.items():
-            detected_severity = Severity.NONE
-            detected_keywords: List[str] = []
-            best_match_span: Optional[tuple[int, int]] = None
-            for severity in reversed(SEVERITY_ORDER[1:]):  # skip NONE
-                keywords = severity_map.get(severity, [])
-                matches = []
-                for keyword in keywords:
-                    idx = lowered.find(keyword)
-                    if idx != -1:
-                        matches.append(keyword)
-                        if best_match_span is None or len(keyword) > (best_match_span[1] - best_match_span[0]):
-                            best_match_span = (idx, idx + len(keyword))
-                if matches:
-                    detected_severity = severity
-                    detected_keywords.extend(matches)
-                    break
-
+            # Highest severity with any keyword match decides the category
+            detected_severity = next(
+                (
+                    severity
+                    for severity in reversed(SEVERITY_ORDER[1:])  # skip NONE
+                    if offsets.get((category, severity))
+                ),
+                Severity.NONE,
+            )
             categories[category] = detected_severity
-            if detected_keywords:
-                flagged_content.append(
-                    f"{category.value.replace('_', ' ').title()}: {', '.join(sorted(set(detected_keywords)))}"
-                )
-                if best_match_span is not None:
-                    start, end = best_match_span
-                    highlights.append(
-                        {
-                            "start": start,
-                            "end": end,
-                            "text": text[start:end],
-                            "category": category.value,
-                            "severity": detected_severity.value,
-                        }
-                    )
+            if detected_severity == Severity.NONE:
+                continue
+
+            found = offsets[(category, detected_severity)]
+            detected_keywords = [
+                keyword for keyword in severity_map[detected_severity] if keyword in found
+            ]
+            flagged_content.append(
+                f"{category.value.replace('_', ' ').title()}: {', '.join(sorted(set(detected_keywords)))}"
+            )
+            # The longest matched keyword is highlighted at its first occurrence
+            longest = max(detected_keywords, key=len)
+            start = found[longest]
+            end = start + len(longest)
+            highlights.append(
+                {
+                    "start": start,
+                    "end": end,
+                    "text": text[start:end],
+                    "category": category.value,
+                    "severity": detected_severity.value,
+                }
+            )
 
         return categories, flagged_content, highlights
 
@@ -0,0 +1,168 @@
+"""
+Admission control and fair scheduling of script analyses.
+
+At most ``max_concurrent`` analyses run at once, so the embedding model and
+the vector database serve a few analyses at full speed instead of all of them
+slowly. Further analyses wait in one FIFO queue per client, and queues are
+served round-robin so a client uploading many scripts cannot starve the
+others. When ``max_queued`` analyses are waiting, new ones are rejected
+instead of growing the backlog without bound.
+
+Interactive requests (scene checks) take precedence over bulk analyses: while
+one is in progress, running analyses pause before their next block.
+"""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, Optional
+
+
+class SchedulerOverloaded(RuntimeError):
+    """Raised when the analysis queue is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Too many analyses are queued, retry later")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Ticket:
+    analysis_id: str
+    client_id: str
+    admitted: asyncio.Future
+
+
+class AnalysisScheduler:
+    """Bounded concurrency with per-client round-robin queues."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        max_queued: int = 50,
+        duration_smoothing: float = 0.3,
+    ) -> None:
+        """
+        Initialize AnalysisScheduler.
+
+        Args:
+            max_concurrent: Analyses allowed to run at the same time
+            max_queued: Waiting analyses before new ones are rejected
+            duration_smoothing: Weight of the latest analysis duration in the
+                moving average used for wait estimates
+        """
+        self._max_concurrent = max(1, max_concurrent)
+        self._max_queued = max(0, max_queued)
+        self._duration_smoothing = duration_smoothing
+        # Running analyses and their start times
+        self._running: Dict[str, float] = {}
+        # Waiting analyses per client; the first client is served next
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._average_duration: Optional[float] = None
+        self._interactive = 0
+        self._bulk_allowed = asyncio.Event()
+        self._bulk_allowed.set()
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def has_capacity(self) -> bool:
+        return len(self._running) < self._max_concurrent and not self._queues
+
+    def submit(self, analysis_id: str, client_id: str) -> asyncio.Future:
+        """
+        Admit an analysis or queue it behind the client's earlier ones.
+
+        Returns a future resolved with True once the analysis may run, or
+        with False if it was withdrawn while queued. Raises
+        ``SchedulerOverloaded`` when the queue is full.
+        """
+        admitted = asyncio.get_running_loop().create_future()
+        if self.has_capacity():
+            self._running[analysis_id] = time.monotonic()
+            admitted.set_result(True)
+            return admitted
+        if self.queued >= self._max_queued:
+            raise SchedulerOverloaded(retry_after=math.ceil(self.estimate_wait(1) or 30))
+        self._queues.setdefault(client_id, deque()).append(
+            _Ticket(analysis_id=analysis_id, client_id=client_id, admitted=admitted)
+        )
+        return admitted
+
+    def release(self, analysis_id: str) -> None:
+        """Free the slot of a finished analysis and admit the next ones."""
+        started = self._running.pop(analysis_id, None)
+        if started is not None:
+            duration = time.monotonic() - started
+            if self._average_duration is None:
+                self._average_duration = duration
+            else:
+                self._average_duration += self._duration_smoothing * (duration - self._average_duration)
+        self._dispatch()
+
+    def withdraw(self, analysis_id: str) -> bool:
+        """Remove a queued analysis; returns False if it is not queued."""
+        for client_id, queue in self._queues.items():
+            for ticket in queue:
+                if ticket.analysis_id == analysis_id:
+                    queue.remove(ticket)
+                    if not queue:
+                        del self._queues[client_id]
+                    ticket.admitted.set_result(False)
+                    return True
+        return False
+
+    def queue_positions(self) -> Dict[str, int]:
+        """1-based position of every queued analysis in admission order."""
+        queues = list(self._queues.values())
+        positions: Dict[str, int] = {}
+        depth = 0
+        while len(positions) < self.queued:
+            for queue in queues:
+                if depth < len(queue):
+                    positions[queue[depth].analysis_id] = len(positions) + 1
+            depth += 1
+        return positions
+
+    def estimate_wait(self, position: int) -> Optional[float]:
+        """Seconds until the analysis at ``position`` starts, once a duration is known."""
+        if self._average_duration is None:
+            return None
+        return round(self._average_duration * math.ceil(position / self._max_concurrent), 1)
+
+    @asynccontextmanager
+    async def interactive(self) -> AsyncIterator[None]:
+        """Hold bulk analyses at their next block while an interactive request runs."""
+        self._interactive += 1
+        self._bulk_allowed.clear()
+        try:
+            yield
+        finally:
+            self._interactive -= 1
+            if not self._interactive:
+                self._bulk_allowed.set()
+
+    async def yield_to_interactive(self) -> None:
+        """Wait until no interactive request is in progress."""
+        if self._interactive:
+            await self._bulk_allowed.wait()
+
+    def _dispatch(self) -> None:
+        while self._queues and len(self._running) < self._max_concurrent:
+            client_id, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            if queue:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            self._running[ticket.analysis_id] = time.monotonic()
+            ticket.admitted.set_result(True)
@@ -0,0 +1,107 @@
+"""
+Per-analysis state with copy-on-write snapshots.
+
+Each analysis owns one ``AnalysisState``. Its worker is the only writer: an
+update builds a new read-only snapshot and publishes it by replacing a single
+reference, which is atomic on the event loop. Status readers take the current
+snapshot without any lock and can serialize it while the worker keeps going.
+Cancellation is a plain flag the worker polls between blocks. Watchers wait
+on an event that every publish sets, then read the latest snapshot, so slow
+watchers coalesce updates instead of queueing them. A state detached from its
+process (the analysis moved to another worker) wakes its watchers one last
+time so they can follow the analysis elsewhere.
+"""
+from __future__ import annotations
+
+import asyncio
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Set, Union
+
+
+class AssessmentsView(Sequence):
+    """
+    Read-only prefix of an append-only list of block assessments.
+
+    Publishing a new assessment only creates a longer view, so snapshots
+    share the list instead of copying it; items inside a view's length never
+    change once appended.
+    """
+
+    __slots__ = ("_items", "_length")
+
+    def __init__(self, items: List[Dict[str, Any]], length: int) -> None:
+        self._items = items
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict[str, Any], List[Dict[str, Any]]]:
+        if isinstance(index, slice):
+            return [self._items[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._items[index]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._length):
+            yield self._items[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"AssessmentsView({list(self)!r})"
+
+
+class AnalysisState:
+    """Live state of one analysis; readers only see published snapshots."""
+
+    __slots__ = ("cancel_requested", "detached", "snapshot", "_assessments", "_watchers")
+
+    def __init__(self, fields: Dict[str, Any]) -> None:
+        self.cancel_requested = False
+        self.detached = False
+        self._assessments: List[Dict[str, Any]] = []
+        self._watchers: Set[asyncio.Event] = set()
+        self.snapshot: Mapping[str, Any] = MappingProxyType(
+            {**fields, "scene_assessments": AssessmentsView(self._assessments, 0)}
+        )
+
+    def publish(self, payload: Dict[str, Any]) -> Mapping[str, Any]:
+        """
+        Apply an update and publish the resulting snapshot.
+
+        A dict under ``scene_assessments`` is appended to the assessments;
+        every other key replaces the field of the previous snapshot.
+        """
+        fields = dict(self.snapshot)
+        updates = dict(payload)
+        assessment = updates.pop("scene_assessments", None)
+        if isinstance(assessment, dict):
+            self._assessments.append(assessment)
+        fields.update(updates)
+        fields["scene_assessments"] = AssessmentsView(self._assessments, len(self._assessments))
+        self.snapshot = MappingProxyType(fields)
+        for changed in self._watchers:
+            changed.set()
+        return self.snapshot
+
+    def watch(self) -> asyncio.Event:
+        """Return an event that is set whenever a new snapshot is published."""
+        changed = asyncio.Event()
+        self._watchers.add(changed)
+        return changed
+
+    def unwatch(self, changed: asyncio.Event) -> None:
+        self._watchers.discard(changed)
+
+    def detach(self) -> None:
+        """Stop publishing here and wake the watchers without a new snapshot."""
+        self.detached = True
+        for changed in self._watchers:
+            changed.set()
@@ -0,0 +1,71 @@
+"""
+Content-addressed cache of block assessments.
+
+A block assessment depends only on the block text, the criteria it was checked
+against and the analyzer that produced it. Blocks are keyed by a SHA-256
+digest of all three, so an edited draft reuses the assessments of every block
+it did not change, wherever that block moved in the script.
+"""
+from __future__ import annotations
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Fields of an assessment that depend only on the block content; position
+# dependent fields (scene number, pages, highlights) are recomputed on reuse
+CACHED_FIELDS = ("age_rating", "categories", "llm_comment", "references", "assessment_tier")
+
+
+def normalize_block_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a block text."""
+    return " ".join(text.lower().split())
+
+
+def block_fingerprint(text: str, criteria_version: str, analyzer_version: str) -> str:
+    """Return the content address of a block assessment."""
+    digest = hashlib.sha256()
+    for part in (normalize_block_text(text), criteria_version, analyzer_version):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class BlockAssessmentCache:
+    """Bounded LRU mapping of block fingerprints to assessment fields."""
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        """
+        Initialize BlockAssessmentCache.
+
+        Args:
+            max_entries: Number of assessments kept before the least recently
+                used ones are evicted
+        """
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, assessment: Dict[str, Any]) -> None:
+        if self._max_entries <= 0:
+            return
+        self._entries[key] = {field: assessment[field] for field in CACHED_FIELDS}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
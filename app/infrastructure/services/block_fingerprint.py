@@ -0,0 +1,116 @@
+"""
+Near-duplicate detection for script blocks.
+
+Screenplays repeat stage directions, scene transitions and choruses. Blocks are
+normalized by the shared tokenizer and split into overlapping word shingles; a
+MinHash signature of the shingle set estimates the Jaccard similarity between
+two blocks, and locality-sensitive hashing over signature bands finds candidate
+duplicates without comparing every pair of blocks.
+"""
+from __future__ import annotations
+
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .text_tokenizer import term_id, tokenize
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def shingle_ids(text: str, size: int = 3) -> Set[int]:
+    """Return the hashed word shingles of a normalized text."""
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        return {term_id(" ".join(tokens))} if tokens else set()
+    return {term_id(" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures over hashed shingle sets."""
+
+    def __init__(self, num_perm: int = 64, seed: int = 1) -> None:
+        """
+        Initialize MinHasher.
+
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            seed: Seed of the permutation coefficients
+        """
+        rng = np.random.default_rng(seed)
+        # Coefficients below 2**31 keep a * h + b inside uint64 for 32-bit h
+        self._a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, shingles: Set[int]) -> np.ndarray:
+        if not shingles:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index that maps a block to an earlier block with near-identical text.
+
+    Candidates sharing any signature band are confirmed by their estimated
+    Jaccard similarity, so the band layout only trades recall for speed.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+    ) -> None:
+        """
+        Initialize NearDuplicateIndex.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of a duplicate
+            num_perm: MinHash signature length
+            bands: Number of LSH bands; must divide ``num_perm``
+            shingle_size: Words per shingle
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self._hasher = MinHasher(num_perm=num_perm)
+        self._rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, bytes], List[Hashable]] = {}
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def find_or_add(self, key: Hashable, text: str) -> Optional[Hashable]:
+        """
+        Return the key of an indexed near duplicate of ``text``.
+
+        When there is none, the text is indexed under ``key`` and None is
+        returned.
+        """
+        signature = self._hasher.signature(shingle_ids(text, self.shingle_size))
+        band_keys = [
+            (band, signature[start:start + self._rows].tobytes())
+            for band, start in enumerate(range(0, len(signature), self._rows))
+        ]
+
+        best_key, best_similarity = None, self.threshold
+        for band_key in band_keys:
+            for candidate in self._buckets.get(band_key, ()):
+                similarity = float(np.mean(self._signatures[candidate] == signature))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = candidate, similarity
+        if best_key is not None:
+            return best_key
+
+        self._signatures[key] = signature
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(key)
+        return None
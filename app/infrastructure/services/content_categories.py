@@ -0,0 +1,147 @@
+"""
+Content categories, severities and the keyword stems used to detect them.
+
+The definitions are shared by script analysis and by the knowledge base,
+which tags criteria chunks with categories at ingest so block reference
+lookups can be restricted to the partitions of the detected categories.
+These enums mirror the API schemas and are defined here to avoid circular
+imports.
+
+Both keyword automata are compiled once at import. Code that edits the
+keyword dictionaries at runtime calls ``reload_category_keywords()``.
+"""
+from __future__ import annotations
+
+from enum import Enum
+from typing import Iterable, List, Optional, Tuple
+
+from .keyword_matcher import KeywordAutomaton, KeywordMatch
+
+
+class Severity(str, Enum):
+    """Content severity levels."""
+    NONE = "none"
+    MILD = "mild"
+    MODERATE = "moderate"
+    SEVERE = "severe"
+
+class Category(str, Enum):
+    """Content categories for analysis."""
+    VIOLENCE = "violence"
+    SEXUAL_CONTENT = "sexual_content"
+    LANGUAGE = "language"
+    ALCOHOL_DRUGS = "alcohol_drugs"
+    DISTURBING_SCENES = "disturbing_scenes"
+
+class AgeRating(str, Enum):
+    """Age rating categories."""
+    ZERO_PLUS = "0+"
+    SIX_PLUS = "6+"
+    TWELVE_PLUS = "12+"
+    SIXTEEN_PLUS = "16+"
+    EIGHTEEN_PLUS = "18+"
+
+
+# Keyword stems per category and severity
+CATEGORY_KEYWORDS = {
+    Category.VIOLENCE: {
+        Severity.SEVERE: ["убий", "расстрел", "кров", "пытк", "казн"],
+        Severity.MODERATE: ["драка", "бой", "оруж", "удар", "атака"],
+        Severity.MILD: ["спор", "угроз", "конфликт", "схват"],
+    },
+    Category.SEXUAL_CONTENT: {
+        Severity.SEVERE: ["порн", "секс", "интим", "эротич", "совокуп"],
+        Severity.MODERATE: ["поцелу", "страсть", "половой", "обнажен"],
+        Severity.MILD: ["флирт", "намек", "романтич", "симпат"],
+    },
+    Category.LANGUAGE: {
+        Severity.SEVERE: ["нецензур", "мат", "ругательств"],
+        Severity.MODERATE: ["оскорб", "бран", "ругал"],
+        Severity.MILD: ["груб", "сарказм", "насмеш"],
+    },
+    Category.ALCOHOL_DRUGS: {
+        Severity.SEVERE: ["наркот", "героин", "инъек", "употреб"],
+        Severity.MODERATE: ["алког", "пьян", "курен", "пиво"],
+        Severity.MILD: ["бар", "вин", "шампан", "сигар"],
+    },
+    Category.DISTURBING_SCENES: {
+        Severity.SEVERE: ["труп", "расчлен", "ужас", "кошмар", "паник"],
+        Severity.MODERATE: ["страх", "крик", "паник", "страшн"],
+        Severity.MILD: ["напряж", "тревог", "волн"],
+    },
+}
+
+# Severity and rating order
+SEVERITY_ORDER = [Severity.NONE, Severity.MILD, Severity.MODERATE, Severity.SEVERE]
+RATING_ORDER = [
+    AgeRating.ZERO_PLUS,
+    AgeRating.SIX_PLUS,
+    AgeRating.TWELVE_PLUS,
+    AgeRating.SIXTEEN_PLUS,
+    AgeRating.EIGHTEEN_PLUS,
+]
+
+# Extra stems for the wording of normative documents, used only for tagging
+CRITERIA_KEYWORDS = {
+    Category.VIOLENCE: ["насили", "жесток", "преступлен"],
+    Category.SEXUAL_CONTENT: ["половы", "сексуальн"],
+    Category.LANGUAGE: ["сквернослов", "непристойн"],
+    Category.ALCOHOL_DRUGS: ["табак", "психотроп", "одурманива", "спиртн"],
+    Category.DISTURBING_SCENES: ["самоубийств", "катастроф", "смерт"],
+}
+
+# Bit assigned to each category in row tag masks
+_CATEGORY_BITS = {category: 1 << position for position, category in enumerate(Category)}
+
+
+def _compile_category_keywords(include_criteria: bool) -> KeywordAutomaton:
+    table: List[Tuple[Tuple[Category, Optional[Severity]], List[str]]] = [
+        ((category, severity), keywords)
+        for category, severity_map in CATEGORY_KEYWORDS.items()
+        for severity, keywords in severity_map.items()
+    ]
+    if include_criteria:
+        table.extend(((category, None), keywords) for category, keywords in CRITERIA_KEYWORDS.items())
+    return KeywordAutomaton(table)
+
+
+def reload_category_keywords() -> None:
+    """Recompile the keyword automata after the keyword dictionaries were edited."""
+    global _DETECTION_AUTOMATON, _TAGGING_AUTOMATON
+    _DETECTION_AUTOMATON = _compile_category_keywords(include_criteria=False)
+    _TAGGING_AUTOMATON = _compile_category_keywords(include_criteria=True)
+
+
+_DETECTION_AUTOMATON = _compile_category_keywords(include_criteria=False)
+_TAGGING_AUTOMATON = _compile_category_keywords(include_criteria=True)
+
+
+def category_keyword_matches(text: str) -> List[KeywordMatch]:
+    """
+    Find all category keywords in the text in a single pass.
+
+    Match labels are ``(Category, Severity)`` pairs from ``CATEGORY_KEYWORDS``.
+    """
+    return _DETECTION_AUTOMATON.find_all(text)
+
+
+def tag_categories(text: str) -> List[str]:
+    """Return the values of all categories whose keywords occur in the text."""
+    found = {category for match in _TAGGING_AUTOMATON.find_all(text) for category, _ in match.labels}
+    return [category.value for category in CATEGORY_KEYWORDS if category in found]
+
+
+def category_mask(categories: Iterable[str]) -> int:
+    """Pack category values into a bit mask; unknown values are ignored."""
+    mask = 0
+    for value in categories:
+        try:
+            mask |= _CATEGORY_BITS[Category(value)]
+        except ValueError:
+            continue
+    return mask
+
+
+def categories_from_mask(mask: int) -> List[str]:
+    """Unpack a bit mask built by ``category_mask`` into category values."""
+    return [category.value for category, bit in _CATEGORY_BITS.items() if mask & bit]
@@ -0,0 +1,232 @@
+"""
+Columnar storage for knowledge base entries.
+
+Paragraph chunks of a document are stored column by column instead of as one
+Python object per paragraph: entry ids as raw 16-byte UUIDs, page and
+paragraph numbers in NumPy arrays, content categories as one bit mask per
+row, and all texts in one UTF-8 buffer addressed by offsets. The document id
+and title are interned once per document. Only metadata that has no column
+is kept per row. ``KnowledgeEntry`` objects are only materialized as row views
+when a lookup needs one.
+"""
+from __future__ import annotations
+
+import hashlib
+import sys
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .content_categories import categories_from_mask, category_mask
+
+_EMPTY_METADATA: Dict[str, Any] = {}
+# Fields held in columns or once per document, never in per-row metadata
+_RESERVED_FIELDS = {
+    "text", "page", "paragraph", "paragraph_index", "categories", "document_id", "document_title",
+}
+
+
+@dataclass
+class KnowledgeEntry:
+    """Normalized representation of a paragraph-sized knowledge chunk."""
+
+    entry_id: str
+    document_id: str
+    document_title: str
+    page: int
+    paragraph: int
+    text: str
+    metadata: Dict[str, Any]
+    categories: List[str] = field(default_factory=list)
+
+
+class EntryColumns:
+    """
+    Immutable column store for the paragraphs of one document.
+
+    Row lookups are O(1): every column is indexed by row number and a text is
+    decoded from its slice of the shared buffer on demand.
+    """
+
+    __slots__ = (
+        "document_id",
+        "document_title",
+        "_entry_ids",
+        "_pages",
+        "_paragraphs",
+        "_text_buffer",
+        "_text_offsets",
+        "_row_tags",
+        "_metadata",
+        "_digest",
+    )
+
+    def __init__(
+        self,
+        document_id: str,
+        document_title: str,
+        entry_ids: np.ndarray,
+        pages: np.ndarray,
+        paragraphs: np.ndarray,
+        text_buffer: bytes,
+        text_offsets: np.ndarray,
+        row_tags: np.ndarray,
+        metadata: Tuple[Optional[Dict[str, Any]], ...],
+    ) -> None:
+        """
+        Initialize EntryColumns.
+
+        Args:
+            document_id: Id of the document all rows belong to
+            document_title: Title of that document
+            entry_ids: ``(n, 16)`` uint8 array of raw UUID bytes
+            pages: Page number per row
+            paragraphs: Paragraph number per row
+            text_buffer: UTF-8 encoded texts of all rows, concatenated
+            text_offsets: ``n + 1`` byte offsets into ``text_buffer``
+            row_tags: uint32 category bit mask per row
+            metadata: Extra metadata per row, ``None`` when there is none
+        """
+        self.document_id = sys.intern(document_id)
+        self.document_title = sys.intern(document_title)
+        self._entry_ids = entry_ids
+        self._pages = pages
+        self._paragraphs = paragraphs
+        self._text_buffer = text_buffer
+        self._text_offsets = text_offsets
+        self._row_tags = row_tags
+        self._metadata = metadata
+        self._digest: Optional[str] = None
+
+    @classmethod
+    def from_paragraphs(
+        cls,
+        document_id: str,
+        document_title: str,
+        paragraph_details: Sequence[Dict[str, Any]],
+        entry_ids: Optional[Sequence[str]] = None,
+    ) -> "EntryColumns":
+        """
+        Build the columns from parsed paragraph details, skipping empty texts.
+
+        ``entry_ids`` keeps existing ids (one per detail); new UUIDs are
+        generated otherwise. A detail's ``categories`` go to the row tags.
+        """
+        raw_ids: List[bytes] = []
+        encoded: List[bytes] = []
+        pages: List[int] = []
+        paragraphs: List[int] = []
+        tags: List[int] = []
+        metadata: List[Optional[Dict[str, Any]]] = []
+
+        for position, detail in enumerate(paragraph_details):
+            text = detail.get("text", "").strip()
+            if not text:
+                continue
+            raw_ids.append(
+                uuid.UUID(entry_ids[position]).bytes if entry_ids is not None else uuid.uuid4().bytes
+            )
+            encoded.append(text.encode("utf-8"))
+            pages.append(int(detail.get("page", 1)))
+            paragraphs.append(int(detail.get("paragraph_index", 1)))
+            tags.append(category_mask(detail.get("categories") or ()))
+            extra = {
+                sys.intern(key): value
+                for key, value in detail.items()
+                if key not in _RESERVED_FIELDS
+            }
+            metadata.append(extra or None)
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        id_column = np.frombuffer(b"".join(raw_ids), dtype=np.uint8).reshape(len(raw_ids), 16)
+
+        return cls(
+            document_id=document_id,
+            document_title=document_title,
+            entry_ids=id_column,
+            pages=np.asarray(pages, dtype=np.int32),
+            paragraphs=np.asarray(paragraphs, dtype=np.int32),
+            text_buffer=b"".join(encoded),
+            text_offsets=offsets,
+            row_tags=np.asarray(tags, dtype=np.uint32),
+            metadata=tuple(metadata),
+        )
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __getitem__(self, row: int) -> KnowledgeEntry:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return KnowledgeEntry(
+            entry_id=self.entry_id(row),
+            document_id=self.document_id,
+            document_title=self.document_title,
+            page=int(self._pages[row]),
+            paragraph=int(self._paragraphs[row]),
+            text=self.text(row),
+            metadata=dict(self._metadata[row] or _EMPTY_METADATA),
+            categories=self.categories(row),
+        )
+
+    def __iter__(self) -> Iterator[KnowledgeEntry]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def entry_id(self, row: int) -> str:
+        return str(uuid.UUID(bytes=self._entry_ids[row].tobytes()))
+
+    def entry_ids(self) -> List[str]:
+        return [self.entry_id(row) for row in range(len(self))]
+
+    @property
+    def row_tags(self) -> np.ndarray:
+        """Category bit mask per row, shared with the lexical shard."""
+        return self._row_tags
+
+    def categories(self, row: int) -> List[str]:
+        return categories_from_mask(int(self._row_tags[row]))
+
+    def text(self, row: int) -> str:
+        start, end = self._text_offsets[row], self._text_offsets[row + 1]
+        return str(memoryview(self._text_buffer)[start:end], "utf-8")
+
+    def iter_texts(self) -> Iterator[str]:
+        """Decode texts one at a time straight from the shared buffer."""
+        buffer = memoryview(self._text_buffer)
+        offsets = self._text_offsets
+        for row in range(len(self)):
+            yield str(buffer[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def content_digest(self) -> str:
+        """SHA-256 of the title and paragraph texts, computed once."""
+        if self._digest is None:
+            digest = hashlib.sha256(self.document_title.encode("utf-8"))
+            digest.update(self._text_offsets.tobytes())
+            digest.update(self._text_buffer)
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns and the per-row metadata."""
+        row_metadata = sum(
+            sys.getsizeof(extra) + sum(sys.getsizeof(value) for value in extra.values())
+            for extra in self._metadata
+            if extra
+        )
+        return (
+            self._entry_ids.nbytes
+            + self._pages.nbytes
+            + self._paragraphs.nbytes
+            + len(self._text_buffer)
+            + self._text_offsets.nbytes
+            + self._row_tags.nbytes
+            + sys.getsizeof(self._metadata)
+            + row_metadata
+        )
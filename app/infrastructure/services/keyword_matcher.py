@@ -0,0 +1,114 @@
+"""
+Multi-pattern keyword matching for rule-based content detection.
+
+Keyword dictionaries are compiled into an Aho–Corasick automaton, so a text is
+scanned once for all keywords and the scan cost does not grow with the size of
+the dictionary. Matching is case-insensitive substring search with overlapping
+matches, which is what the per-keyword ``str.find`` loops did before.
+Callers build an automaton once and keep it; an automaton does not follow
+later edits to the dictionary it was built from, so owners of editable
+dictionaries rebuild it themselves.
+"""
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """One keyword occurrence; ``labels`` are all dictionary keys listing it."""
+
+    start: int
+    end: int
+    keyword: str
+    labels: Tuple[Hashable, ...]
+
+
+class KeywordAutomaton:
+    """Aho–Corasick automaton over lowercased keywords."""
+
+    def __init__(self, table: Iterable[Tuple[Hashable, Iterable[str]]]) -> None:
+        """
+        Initialize KeywordAutomaton.
+
+        Args:
+            table: Pairs of a label and the keywords filed under it
+        """
+        labels: Dict[str, List[Hashable]] = {}
+        for label, keywords in table:
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword and label not in labels.setdefault(keyword, []):
+                    labels[keyword].append(label)
+        self._keywords: List[str] = list(labels)
+        self._labels: List[Tuple[Hashable, ...]] = [tuple(labels[k]) for k in self._keywords]
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        outputs: List[List[int]] = [[]]
+        for keyword_index, keyword in enumerate(self._keywords):
+            node = 0
+            for char in keyword:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(keyword_index)
+
+        # Breadth-first pass links every node to its longest proper suffix
+        # in the trie and inherits that suffix's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                outputs[child].extend(outputs[self._fail[child]])
+        self._output: List[Tuple[int, ...]] = [tuple(output) for output in outputs]
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """
+        Return every keyword occurrence in ``text``, ordered by end offset.
+
+        Offsets index the lowercased text, which has the same length as the
+        original for the scripts this is used on.
+        """
+        goto, fail, output = self._goto, self._fail, self._output
+        matches: List[KeywordMatch] = []
+        node = 0
+        for position, char in enumerate(text.lower()):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for keyword_index in output[node]:
+                keyword = self._keywords[keyword_index]
+                matches.append(
+                    KeywordMatch(
+                        start=position + 1 - len(keyword),
+                        end=position + 1,
+                        keyword=keyword,
+                        labels=self._labels[keyword_index],
+                    )
+                )
+        return matches
+
+
+def first_offsets(matches: Iterable[KeywordMatch]) -> Dict[Hashable, Dict[str, int]]:
+    """Map each label to the offset of the first occurrence of each of its keywords."""
+    offsets: Dict[Hashable, Dict[str, int]] = {}
+    for match in matches:
+        for label in match.labels:
+            label_offsets = offsets.setdefault(label, {})
+            if match.keyword not in label_offsets or match.start < label_offsets[match.keyword]:
+                label_offsets[match.keyword] = match.start
+    return offsets
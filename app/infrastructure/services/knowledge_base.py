@@ -12,17 +12,21 @@ hybrid search, caching, and comprehensive metrics tracking.
 from __future__ import annotations
 
 import asyncio
-import uuid
+import os
 import logging
 import time
 import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from enum import Enum
 
-import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from .content_categories import category_mask, tag_categories
+from .entry_store import EntryColumns, KnowledgeEntry
+from .lexical_index import LexicalShard, ShardedLexicalIndex
+from .query_cache import QueryResultCache
+from .query_context import RAGQueryContext
 
 logger = logging.getLogger(__name__)
 
@@ -48,19 +52,11 @@ class SearchMetrics:
     average_tfidf_score: float = 0.0
     search_times_ms: List[float] = field(default_factory=list)
     errors: int = 0
-
-
-@dataclass
-class KnowledgeEntry:
-    """Normalized representation of a paragraph-sized knowledge chunk."""
-
-    entry_id: str
-    document_id: str
-    document_title: str
-    page: int
-    paragraph: int
-    text: str
-    metadata: Dict[str, Any]
+    encoder_calls: int = 0
+    uncached_queries: int = 0
+    vector_deadline_misses: int = 0
+    batch_queries: int = 0
+    warm_start_entries: int = 0
 
 
 class KnowledgeBase:
@@ -80,6 +76,10 @@ class KnowledgeBase:
         enable_caching: bool = True,
         cache_ttl_seconds: int = 300,
         confidence_threshold: float = 0.7,
+        lexical_workers: Optional[int] = None,
+        cache_max_entries: int = 1000,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        vector_deadline_seconds: float = 2.0,
     ) -> None:
         """
         Initialize KnowledgeBase with intelligent routing.
@@ -92,11 +92,19 @@ class KnowledgeBase:
             enable_caching: Enable query result caching
             cache_ttl_seconds: Cache TTL in seconds
             confidence_threshold: Confidence threshold for auto-routing (0-1)
+            lexical_workers: Threads used for lexical scoring (default: CPU count, max 4)
+            cache_max_entries: Maximum number of cached queries
+            cache_max_bytes: Maximum estimated size of cached results in bytes
+            vector_deadline_seconds: Time AUTO routing waits for vector search
+                before answering from lexical results
         """
-        self._entries: List[KnowledgeEntry] = []
-        self._vectorizer: Optional[TfidfVectorizer] = None
-        self._matrix = None
+        # One lexical shard per document; the lock only serializes writers
+        self._lexical_index = ShardedLexicalIndex()
         self._lock = asyncio.Lock()
+        self._scoring_executor = ThreadPoolExecutor(
+            max_workers=lexical_workers or min(4, os.cpu_count() or 1),
+            thread_name_prefix="kb-lexical",
+        )
 
         # RAG integration
         self._rag_orchestrator = rag_orchestrator
@@ -107,16 +115,29 @@ class KnowledgeBase:
         self._search_strategy = search_strategy
         self._enable_hybrid_search = enable_hybrid_search
         self._enable_caching = enable_caching
-        self._cache_ttl_seconds = cache_ttl_seconds
         self._confidence_threshold = confidence_threshold
+        self._vector_deadline_seconds = vector_deadline_seconds
 
         # Caching
-        self._query_cache: Dict[str, Tuple[List[Dict[str, Any]], float]] = {}
-        self._cache_lock = asyncio.Lock()
+        self._query_cache = QueryResultCache(
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes,
+            ttl_seconds=cache_ttl_seconds,
+        )
+        # Bumped on every corpus change and folded into cache keys
+        self._corpus_generation = 0
 
         # Metrics
         self._metrics = SearchMetrics()
 
+        # Cleared while a warm start restores the corpus from the vector store
+        self._ready = asyncio.Event()
+        self._ready.set()
+        self._warm_start_task: Optional[asyncio.Task] = None
+        # Documents ingested or removed during the running warm start before it
+        # restored them; their stored copies are stale
+        self._superseded_while_warming: Set[str] = set()
+
     async def initialize(self) -> None:
         """Initialize RAG orchestrator if available."""
         if self._rag_orchestrator and self._use_rag_when_available:
@@ -142,60 +163,203 @@ class KnowledgeBase:
         Ingest (or re-ingest) a document into the knowledge base.
 
         Existing entries for the same document will be replaced.
-        Automatically syncs with RAG orchestrator if available.
+        Every chunk is tagged with the content categories it covers, which
+        partitions both indexes by category. Automatically syncs with RAG
+        orchestrator if available.
         """
-        cleaned_entries = [
-            KnowledgeEntry(
-                entry_id=str(uuid.uuid4()),
-                document_id=document_id,
-                document_title=document_title,
-                page=int(detail.get("page", 1)),
-                paragraph=int(detail.get("paragraph_index", 1)),
-                text=detail.get("text", "").strip(),
-                metadata={
-                    key: value
-                    for key, value in detail.items()
-                    if key not in {"text", "page", "paragraph_index"}
-                },
-            )
+        tagged_details = [
+            {**detail, "categories": tag_categories(detail["text"])}
             for detail in paragraph_details
             if detail.get("text", "").strip()
         ]
-
+        shard = await self._build_shard(document_id, document_title, tagged_details)
         async with self._lock:
-            self._entries = [
-                entry for entry in self._entries if entry.document_id != document_id
-            ]
-            self._entries.extend(cleaned_entries)
-            self._rebuild_index_locked()
+            previous = self._lexical_index.snapshot().shards.get(document_id)
+            self._lexical_index.publish(shard)
+            self._corpus_generation += 1
+            if previous is None and not self._ready.is_set():
+                self._superseded_while_warming.add(document_id)
         
         # Sync with RAG orchestrator if enabled
         if self._rag_enabled and self._rag_orchestrator:
-            await self._sync_to_rag_orchestrator(cleaned_entries)
+            await self._sync_to_rag_orchestrator(list(shard.entries))
+            # Drop the replaced points so a warm start does not restore them
+            if previous is not None:
+                try:
+                    await self._rag_orchestrator.delete_documents(
+                        previous.entries.entry_ids(), list(previous.entries.iter_texts()),
+                    )
+                except Exception as e:
+                    logger.warning(f"Failed to sync replaced entries to RAG: {e}")
+
+    async def _build_shard(
+        self,
+        document_id: str,
+        document_title: str,
+        tagged_details: List[Dict[str, Any]],
+        entry_ids: Optional[List[str]] = None,
+    ) -> LexicalShard:
+        """Store category-tagged paragraphs in columns and vectorize them off the event loop."""
+        columns = EntryColumns.from_paragraphs(
+            document_id, document_title, tagged_details, entry_ids,
+        )
+        # Only this document's shard is built
+        return await asyncio.to_thread(
+            self._lexical_index.build_shard,
+            document_id,
+            columns,
+            columns.iter_texts(),
+            columns.row_tags,
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        """False while the corpus is being restored from the vector store."""
+        return self._ready.is_set()
+
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Wait for a running warm start to finish; returns readiness."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.is_ready
+
+    def start_warm_start(self, page_size: int = 1024) -> Optional[asyncio.Task]:
+        """Restore the corpus from the vector store in the background."""
+        if not (self._rag_enabled and self._rag_orchestrator):
+            return None
+        if self._warm_start_task is None or self._warm_start_task.done():
+            self._ready.clear()
+            self._superseded_while_warming.clear()
+            self._warm_start_task = asyncio.create_task(self.warm_start(page_size))
+        return self._warm_start_task
+
+    async def warm_start(self, page_size: int = 1024) -> int:
+        """
+        Rebuild the entry table and lexical index from the vector store.
+
+        Point payloads are streamed with Qdrant scroll in pages of
+        ``page_size``; nothing is re-embedded or re-uploaded and point ids are
+        kept as entry ids. Documents ingested or removed while the restore
+        runs win over their restored copies; the stored points of removed
+        documents are deleted.
+
+        Returns:
+            Number of restored entries
+        """
+        start_time = time.time()
+        restored = 0
+        try:
+            documents: Dict[str, Tuple[str, List[str], List[Dict[str, Any]]]] = {}
+            async for page in self._rag_orchestrator.iter_indexed_documents(page_size):
+                for document in page:
+                    metadata = document.metadata
+                    document_id = str(metadata.get("document_id", "") or "")
+                    if not document_id or not document.text.strip():
+                        continue
+                    title = str(metadata.get("document_title", ""))
+                    _, entry_ids, details = documents.setdefault(document_id, (title, [], []))
+                    entry_ids.append(document.id)
+                    # Document-level fields are dropped by the column store
+                    details.append({
+                        **metadata,
+                        "text": document.text,
+                        "page": metadata.get("page", 1),
+                        "paragraph_index": metadata.get("paragraph", 1),
+                        "categories": metadata.get("categories") or tag_categories(document.text),
+                    })
+
+            for document_id, (title, entry_ids, details) in documents.items():
+                if document_id in self._superseded_while_warming:
+                    await self._delete_superseded(document_id, entry_ids, details)
+                    continue
+                if document_id in self._lexical_index.snapshot().shards:
+                    continue
+                # Scroll order is arbitrary; restore paragraph order
+                order = sorted(
+                    range(len(details)),
+                    key=lambda i: (int(details[i]["page"]), int(details[i]["paragraph_index"])),
+                )
+                shard = await self._build_shard(
+                    document_id,
+                    title,
+                    [details[i] for i in order],
+                    [entry_ids[i] for i in order],
+                )
+                async with self._lock:
+                    superseded = document_id in self._superseded_while_warming
+                    if not superseded:
+                        self._lexical_index.publish(shard)
+                        self._corpus_generation += 1
+                if superseded:
+                    await self._delete_superseded(document_id, entry_ids, details)
+                    continue
+                restored += shard.size
+
+            self._metrics.warm_start_entries = restored
+            logger.info(
+                f"Warm start restored {restored} entries of {len(documents)} documents "
+                f"in {(time.time() - start_time) * 1000:.0f}ms"
+            )
+        except Exception as e:
+            self._metrics.errors += 1
+            logger.error(f"Warm start from vector store failed: {e}")
+        finally:
+            self._ready.set()
+        return restored
+
+    async def _delete_superseded(
+        self,
+        document_id: str,
+        entry_ids: List[str],
+        details: List[Dict[str, Any]],
+    ) -> None:
+        """Delete stored points of a document that changed before the warm start restored it."""
+        shard = self._lexical_index.snapshot().shards.get(document_id)
+        current = set(shard.entries.entry_ids()) if shard is not None else set()
+        stale = [
+            (entry_id, detail["text"])
+            for entry_id, detail in zip(entry_ids, details)
+            if entry_id not in current
+        ]
+        if not stale:
+            return
+        try:
+            await self._rag_orchestrator.delete_documents(
+                [entry_id for entry_id, _ in stale], [text for _, text in stale],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to delete superseded entries of {document_id}: {e}")
 
     async def remove_document(self, document_id: str) -> None:
         """Remove all knowledge entries associated with a document."""
         # Get entry IDs before removal for RAG sync
-        entry_ids = []
+        entry_ids, texts = [], []
         async with self._lock:
-            entry_ids = [
-                entry.entry_id
-                for entry in self._entries
-                if entry.document_id == document_id
-            ]
-            self._entries = [
-                entry for entry in self._entries if entry.document_id != document_id
-            ]
-            self._rebuild_index_locked()
+            shard = self._lexical_index.remove(document_id)
+            if shard is not None:
+                entry_ids = shard.entries.entry_ids()
+                texts = list(shard.entries.iter_texts())
+                self._corpus_generation += 1
+            elif not self._ready.is_set():
+                # Not restored yet; keep the running warm start from restoring it
+                self._superseded_while_warming.add(document_id)
         
         # Sync with RAG orchestrator if enabled
         if self._rag_enabled and self._rag_orchestrator and entry_ids:
             try:
-                await self._rag_orchestrator.delete_documents(entry_ids)
+                await self._rag_orchestrator.delete_documents(entry_ids, texts)
             except Exception as e:
                 logger.warning(f"Failed to sync deletion to RAG: {e}")
 
-    async def query(self, text: str, top_k: int = 3, strategy: Optional[SearchStrategy] = None) -> List[Dict[str, Any]]:
+    async def query(
+        self,
+        text: str,
+        top_k: int = 3,
+        strategy: Optional[SearchStrategy] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve the top-k most relevant knowledge chunks using intelligent routing.
 
@@ -204,11 +368,16 @@ class KnowledgeBase:
         - Query result caching
         - Hybrid search combining both methods
         - Comprehensive metrics tracking
+        - Metadata filters pushed down into both retrieval legs
 
         Args:
             text: Query text
             top_k: Number of results to return
             strategy: Override default search strategy
+            filters: Metadata filters, e.g. {"document_id": "..."}; a
+                document_id filter also restricts lexical scoring to the
+                selected documents' shards and a categories filter to the
+                rows tagged with those categories
 
         Returns:
             List of relevant knowledge chunks with metadata
@@ -217,9 +386,13 @@ class KnowledgeBase:
         self._metrics.total_queries += 1
 
         try:
+            # Determine search strategy
+            effective_strategy = strategy or self._search_strategy
+            cache_key = self._generate_cache_key(text, effective_strategy, top_k, filters)
+
             # Check cache first
             if self._enable_caching:
-                cached_result = await self._get_cached_result(text)
+                cached_result = await self._get_cached_result(cache_key)
                 if cached_result:
                     self._metrics.cache_hits += 1
                     search_time_ms = (time.time() - start_time) * 1000
@@ -228,22 +401,26 @@ class KnowledgeBase:
 
             self._metrics.cache_misses += 1
 
-            # Determine search strategy
-            effective_strategy = strategy or self._search_strategy
+            # Embeddings and vector results are shared by all routing paths
+            context = RAGQueryContext()
 
             # Execute search based on strategy
-            if effective_strategy == SearchStrategy.VECTOR_ONLY:
-                results = await self._query_vector_only(text, top_k)
-            elif effective_strategy == SearchStrategy.TFIDF_ONLY:
-                results = await self._query_tfidf_only(text, top_k)
-            elif effective_strategy == SearchStrategy.HYBRID:
-                results = await self._query_hybrid(text, top_k)
-            else:  # AUTO (confidence-based routing)
-                results = await self._query_with_confidence_routing(text, top_k)
+            try:
+                if effective_strategy == SearchStrategy.VECTOR_ONLY:
+                    results = await self._query_vector_only(text, top_k, context, filters)
+                elif effective_strategy == SearchStrategy.TFIDF_ONLY:
+                    results = await self._query_tfidf_only(text, top_k, filters)
+                elif effective_strategy == SearchStrategy.HYBRID:
+                    results = await self._query_hybrid(text, top_k, context, filters)
+                else:  # AUTO (confidence-based routing)
+                    results = await self._query_with_confidence_routing(text, top_k, context, filters)
+            finally:
+                self._metrics.uncached_queries += 1
+                self._metrics.encoder_calls += context.encoder_calls
 
             # Cache results if enabled
             if self._enable_caching and results:
-                await self._cache_result(text, results)
+                await self._cache_result(cache_key, results)
 
             # Record metrics
             search_time_ms = (time.time() - start_time) * 1000
@@ -257,48 +434,216 @@ class KnowledgeBase:
             # Return empty results on error (graceful degradation)
             return []
 
-    async def _query_with_confidence_routing(self, text: str, top_k: int) -> List[Dict[str, Any]]:
-        """Query with confidence-based routing between vector and TF-IDF."""
-        # Try vector search first
-        if self._rag_enabled:
+    async def query_many(
+        self,
+        texts: List[str],
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None,
+        strategy: Optional[SearchStrategy] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve references for many texts at once.
+
+        Uncached texts are embedded in one batch and searched with one
+        multi-vector request, while the lexical leg scores all of them with
+        one sparse matrix-matrix product per shard. Routing per text follows
+        the same rules as ``query``.
+
+        Args:
+            texts: Query texts
+            top_k: Number of results per text
+            filters: Metadata filters, e.g. {"document_id": [...]}
+            strategy: Override default search strategy
+
+        Returns:
+            One list of knowledge chunks per input text, in input order
+        """
+        if not texts:
+            return []
+
+        start_time = time.time()
+        self._metrics.total_queries += len(texts)
+        self._metrics.batch_queries += 1
+        effective_strategy = strategy or self._search_strategy
+
+        results: List[List[Dict[str, Any]]] = [[] for _ in texts]
+        cache_keys = [
+            self._generate_cache_key(text, effective_strategy, top_k, filters) for text in texts
+        ]
+        pending: List[int] = []
+        for index, cache_key in enumerate(cache_keys):
+            cached_result = await self._get_cached_result(cache_key)
+            if cached_result:
+                self._metrics.cache_hits += 1
+                results[index] = cached_result
+            elif texts[index].strip():
+                self._metrics.cache_misses += 1
+                pending.append(index)
+
+        if pending:
+            # Identical texts are searched once
+            unique_texts = list(dict.fromkeys(texts[index].strip() for index in pending))
+            context = RAGQueryContext()
+            try:
+                batch_results = await self._query_many_uncached(
+                    unique_texts, top_k, filters, effective_strategy, context,
+                )
+            except Exception as e:
+                self._metrics.errors += 1
+                logger.error(f"Batch query failed: {e}")
+                batch_results = {}
+            finally:
+                self._metrics.uncached_queries += len(unique_texts)
+                self._metrics.encoder_calls += context.encoder_calls
+
+            for index in pending:
+                results[index] = batch_results.get(texts[index].strip(), [])
+                if self._enable_caching and results[index]:
+                    await self._cache_result(cache_keys[index], results[index])
+
+        self._metrics.search_times_ms.append((time.time() - start_time) * 1000)
+        return results
+
+    async def _query_many_uncached(
+        self,
+        texts: List[str],
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        strategy: SearchStrategy,
+        context: RAGQueryContext,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Run both retrieval legs for a batch and route each text."""
+        use_vector = self._rag_enabled and strategy != SearchStrategy.TFIDF_ONLY
+        use_lexical = strategy != SearchStrategy.VECTOR_ONLY
+
+        # Both legs run concurrently, with more candidates for fusion
+        vector_task = None
+        if use_vector:
+            self._metrics.vector_searches += len(texts)
+            vector_task = asyncio.ensure_future(
+                self._query_many_with_rag(texts, top_k * 2, filters, context)
+            )
+        if use_lexical:
+            lexical_sets = await self._query_many_with_tfidf(texts, top_k * 2, filters)
+        else:
+            lexical_sets = [[] for _ in texts]
+
+        vector_failed = vector_task is None
+        vector_sets: List[List[Dict[str, Any]]] = [[] for _ in texts]
+        if vector_task is not None:
             try:
-                vector_results = await self._query_with_rag(text, top_k * 2)  # Get more for comparison
-                self._metrics.vector_searches += 1
+                vector_sets = await vector_task
+            except Exception as e:
+                vector_failed = True
+                logger.warning(f"Batch vector search failed, using TF-IDF: {e}")
+
+        routed: Dict[str, List[Dict[str, Any]]] = {}
+        for text, vector_results, lexical_results in zip(texts, vector_sets, lexical_sets):
+            if strategy == SearchStrategy.VECTOR_ONLY:
+                routed[text] = vector_results[:top_k]
+            elif strategy == SearchStrategy.TFIDF_ONLY or vector_failed:
+                self._metrics.tfidf_searches += 1
+                routed[text] = lexical_results[:top_k]
+            elif strategy == SearchStrategy.AUTO and vector_results and (
+                vector_results[0].get("score", 0) >= self._confidence_threshold
+            ):
+                routed[text] = vector_results[:top_k]
+            elif strategy == SearchStrategy.HYBRID or self._enable_hybrid_search:
+                self._metrics.hybrid_searches += 1
+                routed[text] = self._fuse_search_results(vector_results, lexical_results, top_k)
+            else:
+                routed[text] = lexical_results[:top_k]
+        return routed
+
+    async def _query_with_confidence_routing(
+        self,
+        text: str,
+        top_k: int,
+        context: Optional[RAGQueryContext] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Query with confidence-based routing between vector and TF-IDF.
 
-                # Check confidence of vector results
-                if vector_results and vector_results[0].get("score", 0) >= self._confidence_threshold:
-                    # High confidence, use vector results
-                    return vector_results[:top_k]
+        Vector and lexical retrieval run concurrently and the routing decision
+        is made once both are in, so latency is bounded by the slower leg. If
+        vector search misses the deadline, lexical results are returned.
+        """
+        context = context or RAGQueryContext()
+        if not self._rag_enabled:
+            return await self._query_with_tfidf(text, top_k, filters)
 
-                # Low confidence, try hybrid if enabled
-                if self._enable_hybrid_search:
-                    return await self._query_hybrid(text, top_k)
+        # Lexical candidates double as the TF-IDF leg of the hybrid fusion
+        vector_task = asyncio.ensure_future(self._query_with_rag(text, top_k * 2, context, filters))  # Get more for comparison
+        lexical_task = asyncio.ensure_future(self._query_with_tfidf(text, top_k * 2, filters))
+        self._metrics.vector_searches += 1
 
-                # Otherwise fallback to TF-IDF
-                logger.info("Vector search confidence below threshold, using TF-IDF")
-                return await self._query_with_tfidf(text, top_k)
+        try:
+            await asyncio.wait({vector_task}, timeout=self._vector_deadline_seconds)
+            if not vector_task.done():
+                self._metrics.vector_deadline_misses += 1
+                logger.info("Vector search missed its deadline, using TF-IDF")
+                return (await lexical_task)[:top_k]
 
+            try:
+                vector_results = vector_task.result()
             except Exception as e:
                 logger.warning(f"Vector search failed, falling back to TF-IDF: {e}")
+                return (await lexical_task)[:top_k]
+
+            # Check confidence of vector results
+            if vector_results and vector_results[0].get("score", 0) >= self._confidence_threshold:
+                # High confidence, use vector results
+                return vector_results[:top_k]
+
+            lexical_results = await lexical_task
+
+            # Low confidence, fuse both legs if hybrid is enabled
+            if self._enable_hybrid_search:
+                self._metrics.hybrid_searches += 1
+                return self._fuse_search_results(vector_results, lexical_results, top_k)
 
-        # Fallback to TF-IDF
-        return await self._query_with_tfidf(text, top_k)
+            # Otherwise fallback to TF-IDF
+            logger.info("Vector search confidence below threshold, using TF-IDF")
+            return lexical_results[:top_k]
 
-    async def _query_vector_only(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+        finally:
+            for task in (vector_task, lexical_task):
+                if not task.done():
+                    task.cancel()
+
+    async def _query_vector_only(
+        self,
+        text: str,
+        top_k: int,
+        context: Optional[RAGQueryContext] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Query using only vector search."""
         if not self._rag_enabled:
             logger.warning("Vector search requested but RAG not enabled")
             return []
 
         self._metrics.vector_searches += 1
-        return await self._query_with_rag(text, top_k)
+        return await self._query_with_rag(text, top_k, context, filters)
 
-    async def _query_tfidf_only(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+    async def _query_tfidf_only(
+        self,
+        text: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Query using only TF-IDF search."""
         self._metrics.tfidf_searches += 1
-        return await self._query_with_tfidf(text, top_k)
+        return await self._query_with_tfidf(text, top_k, filters)
 
-    async def _query_hybrid(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+    async def _query_hybrid(
+        self,
+        text: str,
+        top_k: int,
+        context: Optional[RAGQueryContext] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Query using hybrid search combining vector and TF-IDF."""
         self._metrics.hybrid_searches += 1
 
@@ -308,11 +653,11 @@ class KnowledgeBase:
 
         if self._rag_enabled:
             try:
-                vector_results = await self._query_with_rag(text, top_k * 2)
+                vector_results = await self._query_with_rag(text, top_k * 2, context, filters)
             except Exception as e:
                 logger.warning(f"Vector search failed in hybrid mode: {e}")
 
-        tfidf_results = await self._query_with_tfidf(text, top_k * 2)
+        tfidf_results = await self._query_with_tfidf(text, top_k * 2, filters)
 
         # Combine and re-rank results using weighted scoring
         combined_results = self._fuse_search_results(vector_results, tfidf_results, top_k)
@@ -367,7 +712,13 @@ class KnowledgeBase:
         sorted_results = sorted(result_map.values(), key=lambda x: x["score"], reverse=True)
         return sorted_results[:top_k]
 
-    async def _query_with_rag(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+    async def _query_with_rag(
+        self,
+        text: str,
+        top_k: int,
+        context: Optional[RAGQueryContext] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Query using RAG orchestrator."""
         if not self._rag_orchestrator:
             return []
@@ -375,55 +726,135 @@ class KnowledgeBase:
         results = await self._rag_orchestrator.search(
             query=text,
             top_k=top_k,
+            filter_metadata=filters,
+            context=context,
         )
 
         # Convert RAG results to legacy format
-        legacy_results = []
-        for result in results:
-            legacy_results.append({
-                "document_id": result.metadata.get("document_id", ""),
-                "title": result.metadata.get("document_title", ""),
-                "page": result.metadata.get("page", 1),
-                "paragraph": result.metadata.get("paragraph", 1),
-                "excerpt": result.text,
-                "score": result.score,
-                "metadata": result.metadata,
-            })
-
-        return legacy_results
-
-    async def _query_with_tfidf(self, text: str, top_k: int) -> List[Dict[str, Any]]:
+        return [self._rag_result_to_legacy(result) for result in results]
+
+    async def _query_many_with_rag(
+        self,
+        texts: List[str],
+        top_k: int,
+        filters: Optional[Dict[str, Any]],
+        context: RAGQueryContext,
+    ) -> List[List[Dict[str, Any]]]:
+        """Query the RAG orchestrator for many texts in one batch."""
+        if not self._rag_orchestrator:
+            return [[] for _ in texts]
+
+        result_sets = await self._rag_orchestrator.search_many(
+            queries=texts,
+            top_k=top_k,
+            filter_metadata=filters,
+            context=context,
+        )
+        return [
+            [self._rag_result_to_legacy(result) for result in results]
+            for results in result_sets
+        ]
+
+    @staticmethod
+    def _rag_result_to_legacy(result: Any) -> Dict[str, Any]:
+        """Convert a RAG search result to the legacy reference format."""
+        return {
+            "document_id": result.metadata.get("document_id", ""),
+            "title": result.metadata.get("document_title", ""),
+            "page": result.metadata.get("page", 1),
+            "paragraph": result.metadata.get("paragraph", 1),
+            "excerpt": result.text,
+            "score": result.score,
+            "metadata": result.metadata,
+        }
+
+    @staticmethod
+    def _entry_to_legacy(entry: KnowledgeEntry, score: float) -> Dict[str, Any]:
+        """Convert a lexical hit to the legacy reference format."""
+        return {
+            "document_id": entry.document_id,
+            "title": entry.document_title,
+            "page": entry.page,
+            "paragraph": entry.paragraph,
+            "excerpt": entry.text,
+            "score": score,
+            "metadata": {**entry.metadata, "categories": entry.categories},
+        }
+
+    async def _query_with_tfidf(
+        self,
+        text: str,
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
         """Legacy TF-IDF query method."""
         query_text = text.strip()
         if not query_text:
             return []
 
-        async with self._lock:
-            if not self._entries or self._vectorizer is None or self._matrix is None:
-                return []
-
-            query_vector = self._vectorizer.transform([query_text])
-            similarities = cosine_similarity(query_vector, self._matrix)[0]
-            if not np.any(similarities):
-                return []
-
-            ranked_indices = np.argsort(similarities)[::-1][:top_k]
-            results: List[Dict[str, Any]] = []
-            for index in ranked_indices:
-                entry = self._entries[int(index)]
-                score = float(similarities[int(index)])
-                results.append(
-                    {
-                        "document_id": entry.document_id,
-                        "title": entry.document_title,
-                        "page": entry.page,
-                        "paragraph": entry.paragraph,
-                        "excerpt": entry.text,
-                        "score": score,
-                        "metadata": entry.metadata,
-                    }
-                )
-            return results
+        # Score an immutable snapshot in a worker thread; no lock is held
+        snapshot = self._lexical_index.snapshot()
+        if snapshot.is_empty:
+            return []
+
+        loop = asyncio.get_running_loop()
+        ranked = await loop.run_in_executor(
+            self._scoring_executor,
+            self._lexical_index.top_k,
+            snapshot,
+            query_text,
+            top_k,
+            self._filter_document_ids(filters),
+            self._filter_tag_mask(filters),
+        )
+
+        return [self._entry_to_legacy(entry, score) for entry, score in ranked]
+
+    async def _query_many_with_tfidf(
+        self,
+        texts: List[str],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Score many texts with one sparse matrix-matrix product per shard."""
+        snapshot = self._lexical_index.snapshot()
+        if snapshot.is_empty:
+            return [[] for _ in texts]
+
+        loop = asyncio.get_running_loop()
+        ranked_lists = await loop.run_in_executor(
+            self._scoring_executor,
+            self._lexical_index.top_k_many,
+            snapshot,
+            texts,
+            top_k,
+            self._filter_document_ids(filters),
+            self._filter_tag_mask(filters),
+        )
+        return [
+            [self._entry_to_legacy(entry, score) for entry, score in ranked]
+            for ranked in ranked_lists
+        ]
+
+    @staticmethod
+    def _filter_document_ids(filters: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Return the lexical shards selected by a document_id filter."""
+        if not filters or "document_id" not in filters:
+            return None
+        document_ids = filters["document_id"]
+        if isinstance(document_ids, str):
+            return [document_ids]
+        return list(document_ids)
+
+    @staticmethod
+    def _filter_tag_mask(filters: Optional[Dict[str, Any]]) -> int:
+        """Return the lexical row tags selected by a categories filter."""
+        if not filters or not filters.get("categories"):
+            return 0
+        categories = filters["categories"]
+        if isinstance(categories, str):
+            categories = [categories]
+        return category_mask(categories)
 
     async def _sync_to_rag_orchestrator(
         self,
@@ -447,6 +878,7 @@ class KnowledgeBase:
                         "document_title": entry.document_title,
                         "page": entry.page,
                         "paragraph": entry.paragraph,
+                        "categories": entry.categories,
                         **entry.metadata,
                     },
                 )
@@ -466,19 +898,36 @@ class KnowledgeBase:
 
     async def get_document_stats(self) -> List[Dict[str, Any]]:
         """Return aggregated statistics for indexed documents."""
-        async with self._lock:
-            stats: Dict[str, Dict[str, Any]] = {}
-            for entry in self._entries:
-                doc_stats = stats.setdefault(
-                    entry.document_id,
-                    {
-                        "document_id": entry.document_id,
-                        "title": entry.document_title,
-                        "paragraphs_indexed": 0,
-                    },
-                )
-                doc_stats["paragraphs_indexed"] += 1
-            return list(stats.values())
+        snapshot = self._lexical_index.snapshot()
+        return [
+            {
+                "document_id": shard.document_id,
+                "title": shard.entries.document_title,
+                "paragraphs_indexed": shard.size,
+            }
+            for shard in snapshot.shards.values()
+        ]
+
+    def corpus_version(self, document_id: Optional[str] = None) -> str:
+        """
+        Content version of one document, or of the whole corpus.
+
+        The version only changes when indexed texts change, so it survives
+        restarts and warm starts of the same corpus.
+        """
+        shards = self._lexical_index.snapshot().shards
+        selected = [document_id] if document_id is not None else sorted(shards)
+        digest = hashlib.sha256()
+        for selected_id in selected:
+            shard = shards.get(selected_id)
+            digest.update(selected_id.encode("utf-8"))
+            digest.update(shard.entries.content_digest().encode("ascii") if shard else b"-")
+        return digest.hexdigest()
+
+    def get_entries(self) -> List[KnowledgeEntry]:
+        """Materialize all indexed entries as row views of the current snapshot."""
+        snapshot = self._lexical_index.snapshot()
+        return [entry for shard in snapshot.shards.values() for entry in shard.entries]
 
     async def get_rag_status(self) -> Dict[str, Any]:
         """Get RAG integration status."""
@@ -486,7 +935,9 @@ class KnowledgeBase:
             "rag_available": self._rag_orchestrator is not None,
             "rag_enabled": self._rag_enabled,
             "use_rag_when_available": self._use_rag_when_available,
-            "legacy_entries_count": len(self._entries),
+            "legacy_entries_count": self._lexical_index.snapshot().total_rows,
+            "ready": self.is_ready,
+            "warm_start_entries": self._metrics.warm_start_entries,
         }
         
         if self._rag_enabled and self._rag_orchestrator:
@@ -498,61 +949,40 @@ class KnowledgeBase:
         
         return status
 
-    def _rebuild_index_locked(self) -> None:
-        """Rebuild the TF-IDF index; caller must hold the lock."""
-        texts = [entry.text for entry in self._entries if entry.text]
-        if not texts:
-            self._vectorizer = None
-            self._matrix = None
-            return
-
-        self._vectorizer = TfidfVectorizer(
-            lowercase=True,
-            ngram_range=(1, 2),
-            max_features=5000,
-        )
-        self._matrix = self._vectorizer.fit_transform(texts)
-    async def _get_cached_result(self, query_text: str) -> Optional[List[Dict[str, Any]]]:
+    async def _get_cached_result(self, cache_key: Tuple) -> Optional[List[Dict[str, Any]]]:
         """Get cached result if available and not expired."""
         if not self._enable_caching:
             return None
+        return self._query_cache.get(cache_key)
 
-        cache_key = self._generate_cache_key(query_text)
-
-        async with self._cache_lock:
-            if cache_key in self._query_cache:
-                cached_results, timestamp = self._query_cache[cache_key]
-                if time.time() - timestamp < self._cache_ttl_seconds:
-                    return cached_results
-                else:
-                    # Remove expired cache entry
-                    del self._query_cache[cache_key]
-
-        return None
-
-    async def _cache_result(self, query_text: str, results: List[Dict[str, Any]]) -> None:
+    async def _cache_result(self, cache_key: Tuple, results: List[Dict[str, Any]]) -> None:
         """Cache query results."""
         if not self._enable_caching or not results:
             return
+        self._query_cache.put(cache_key, results)
 
-        cache_key = self._generate_cache_key(query_text)
-
-        async with self._cache_lock:
-            self._query_cache[cache_key] = (results, time.time())
-
-            # Clean up old cache entries if too many
-            if len(self._query_cache) > 1000:  # Configurable limit
-                oldest_key = min(
-                    self._query_cache.keys(),
-                    key=lambda k: self._query_cache[k][1]
-                )
-                del self._query_cache[oldest_key]
+    def _generate_cache_key(
+        self,
+        query_text: str,
+        strategy: SearchStrategy,
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple:
+        """
+        Generate a cache key for the query.
 
-    def _generate_cache_key(self, query_text: str) -> str:
-        """Generate a cache key for the query."""
+        The corpus generation is part of the key, so entries cached before an
+        ingest or removal are never served afterwards.
+        """
         # Normalize query and create hash
         normalized = query_text.strip().lower()
-        return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+        return (
+            hashlib.md5(normalized.encode('utf-8')).hexdigest(),
+            strategy.value,
+            top_k,
+            json.dumps(filters, sort_keys=True, default=str) if filters else None,
+            self._corpus_generation,
+        )
 
     def get_search_metrics(self) -> Dict[str, Any]:
         """Get comprehensive search metrics."""
@@ -566,20 +996,36 @@ class KnowledgeBase:
             if (self._metrics.cache_hits + self._metrics.cache_misses) > 0 else 0.0
         )
 
+        encoder_calls_per_query = (
+            self._metrics.encoder_calls / self._metrics.uncached_queries
+            if self._metrics.uncached_queries > 0 else 0.0
+        )
+
         return {
             "total_queries": self._metrics.total_queries,
             "vector_searches": self._metrics.vector_searches,
             "tfidf_searches": self._metrics.tfidf_searches,
             "hybrid_searches": self._metrics.hybrid_searches,
+            "batch_queries": self._metrics.batch_queries,
+            "warm_start_entries": self._metrics.warm_start_entries,
+            "ready": self.is_ready,
             "cache_hits": self._metrics.cache_hits,
             "cache_misses": self._metrics.cache_misses,
             "cache_hit_rate": cache_hit_rate,
+            "cache_entries": len(self._query_cache),
+            "cache_size_bytes": self._query_cache.size_bytes,
+            "cache_evictions": self._query_cache.evictions,
+            "corpus_generation": self._corpus_generation,
             "average_search_time_ms": avg_search_time,
+            "encoder_calls": self._metrics.encoder_calls,
+            "encoder_calls_per_query": encoder_calls_per_query,
+            "vector_deadline_misses": self._metrics.vector_deadline_misses,
             "errors": self._metrics.errors,
             "search_strategy": self._search_strategy.value,
             "caching_enabled": self._enable_caching,
             "hybrid_enabled": self._enable_hybrid_search,
             "confidence_threshold": self._confidence_threshold,
+            "vector_deadline_seconds": self._vector_deadline_seconds,
         }
 
     def set_search_strategy(self, strategy: SearchStrategy) -> None:
@@ -598,6 +1044,7 @@ class KnowledgeBase:
         cache_ttl_seconds: Optional[int] = None,
         enable_hybrid_search: Optional[bool] = None,
         confidence_threshold: Optional[float] = None,
+        vector_deadline_seconds: Optional[float] = None,
     ) -> None:
         """Update runtime configuration."""
         if enable_caching is not None:
@@ -606,7 +1053,7 @@ class KnowledgeBase:
                 self.clear_cache()
 
         if cache_ttl_seconds is not None:
-            self._cache_ttl_seconds = cache_ttl_seconds
+            self._query_cache.ttl_seconds = cache_ttl_seconds
 
         if enable_hybrid_search is not None:
             self._enable_hybrid_search = enable_hybrid_search
@@ -614,4 +1061,7 @@ class KnowledgeBase:
         if confidence_threshold is not None:
             self._confidence_threshold = confidence_threshold
 
+        if vector_deadline_seconds is not None:
+            self._vector_deadline_seconds = vector_deadline_seconds
+
         logger.info("KnowledgeBase configuration updated")
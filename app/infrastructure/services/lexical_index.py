@@ -0,0 +1,280 @@
+"""
+Sharded lexical index for the knowledge base.
+
+Each criteria document owns one shard holding the term vectors of its
+paragraphs. All shards share a hashed vocabulary, so a shard can be built
+without looking at any other document and ingesting or removing a document
+never refits the rest of the corpus. Corpus-wide inverse document frequencies
+are derived from per-shard document frequencies and applied on the query side
+when the shards are merged at query time.
+
+Readers work on immutable snapshots that are swapped in atomically; writers
+build new shards off to the side and only publish the finished snapshot.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_N_FEATURES = 2 ** 18
+
+
+@dataclass(frozen=True)
+class LexicalShard:
+    """Term vectors and document frequencies of a single document."""
+
+    document_id: str
+    # Row-addressable entries, e.g. an ``EntryColumns`` store
+    entries: Sequence[Any]
+    # Sublinear term frequencies, L2-normalized per row
+    matrix: sparse.csr_matrix
+    # Document frequency of each hashed term within this shard
+    df_indices: np.ndarray
+    df_counts: np.ndarray
+    # Optional bit mask of partitions (e.g. content categories) per row
+    row_tags: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.entries)
+
+    def rows_tagged(self, tag_mask: int) -> np.ndarray:
+        """Return the rows carrying any of the tags in ``tag_mask``."""
+        if self.row_tags is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.row_tags & tag_mask)
+
+
+@dataclass(frozen=True)
+class LexicalSnapshot:
+    """Immutable view of all shards plus the corpus-wide idf weights."""
+
+    shards: Mapping[str, LexicalShard] = field(
+        default_factory=lambda: MappingProxyType({})
+    )
+    document_frequency: Optional[np.ndarray] = None
+    idf: Optional[np.ndarray] = None
+    total_rows: int = 0
+    generation: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return self.total_rows == 0
+
+
+class ShardedLexicalIndex:
+    """
+    Per-document lexical index over a shared hashed vocabulary.
+
+    ``build_shard`` is pure and may run concurrently with queries; ``publish``
+    and ``remove`` replace the current snapshot with a new one. Callers must
+    serialize writers, readers never need a lock.
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES) -> None:
+        """
+        Initialize ShardedLexicalIndex.
+
+        Args:
+            n_features: Size of the hashed term space shared by all shards
+        """
+        self.n_features = n_features
+        self._vectorizer = HashingVectorizer(
+            n_features=n_features,
+            lowercase=True,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm=None,
+        )
+        self._snapshot = LexicalSnapshot()
+
+    def snapshot(self) -> LexicalSnapshot:
+        """Return the current immutable snapshot."""
+        return self._snapshot
+
+    def transform(self, texts: Iterable[str]) -> sparse.csr_matrix:
+        """Map texts to sublinear term-frequency vectors in the hashed space."""
+        matrix = self._vectorizer.transform(texts).tocsr()
+        matrix.data = 1.0 + np.log(matrix.data)
+        return matrix
+
+    def build_shard(
+        self,
+        document_id: str,
+        entries: Sequence[Any],
+        texts: Iterable[str],
+        row_tags: Optional[Sequence[int]] = None,
+    ) -> LexicalShard:
+        """Vectorize the paragraphs of one document into a new shard."""
+        matrix = normalize(self.transform(texts), norm="l2", copy=False)
+        df_indices, df_counts = np.unique(matrix.indices, return_counts=True)
+        return LexicalShard(
+            document_id=document_id,
+            entries=entries,
+            matrix=matrix,
+            df_indices=df_indices,
+            df_counts=df_counts,
+            row_tags=None if row_tags is None else np.asarray(row_tags, dtype=np.uint32),
+        )
+
+    def publish(self, shard: LexicalShard) -> LexicalSnapshot:
+        """Add or replace the shard of a document."""
+        current = self._snapshot
+        shards: Dict[str, LexicalShard] = dict(current.shards)
+        document_frequency = self._copy_frequency(current)
+        total_rows = current.total_rows
+
+        previous = shards.get(shard.document_id)
+        if previous is not None:
+            np.subtract.at(document_frequency, previous.df_indices, previous.df_counts)
+            total_rows -= previous.size
+
+        if shard.size:
+            shards[shard.document_id] = shard
+            np.add.at(document_frequency, shard.df_indices, shard.df_counts)
+            total_rows += shard.size
+        else:
+            shards.pop(shard.document_id, None)
+
+        return self._swap(shards, document_frequency, total_rows)
+
+    def remove(self, document_id: str) -> Optional[LexicalShard]:
+        """Drop the shard of a document, returning it if it existed."""
+        current = self._snapshot
+        previous = current.shards.get(document_id)
+        if previous is None:
+            return None
+
+        shards = dict(current.shards)
+        del shards[document_id]
+        document_frequency = self._copy_frequency(current)
+        np.subtract.at(document_frequency, previous.df_indices, previous.df_counts)
+        self._swap(shards, document_frequency, current.total_rows - previous.size)
+        return previous
+
+    def top_k(
+        self,
+        snapshot: LexicalSnapshot,
+        query_text: str,
+        top_k: int,
+        document_ids: Optional[Sequence[str]] = None,
+        tag_mask: int = 0,
+    ) -> List[Tuple[Any, float]]:
+        """Return the ``top_k`` best (entry, score) pairs across all shards."""
+        return self.top_k_many(snapshot, [query_text], top_k, document_ids, tag_mask)[0]
+
+    def top_k_many(
+        self,
+        snapshot: LexicalSnapshot,
+        query_texts: Sequence[str],
+        top_k: int,
+        document_ids: Optional[Sequence[str]] = None,
+        tag_mask: int = 0,
+    ) -> List[List[Tuple[Any, float]]]:
+        """
+        Return the ``top_k`` best (entry, score) pairs for each query.
+
+        All queries are scored with one sparse matrix-matrix product per
+        shard. Query terms are weighted by the snapshot idf; document rows are
+        already normalized, so scores are cosines between the weighted query
+        and each paragraph's term vector. The similarity matrix stays sparse,
+        so its size follows the matching rows rather than rows x queries, and
+        winners are selected from each query's non-zero scores with
+        ``argpartition`` so only k scores per query are sorted. Pure function
+        of the snapshot, safe to run in a worker thread.
+
+        Args:
+            snapshot: Snapshot to search
+            query_texts: Query texts
+            top_k: Number of results per query
+            document_ids: Restrict the search to these documents' shards
+            tag_mask: When non-zero, score only rows carrying one of these tags
+        """
+        empty: List[List[Tuple[Any, float]]] = [[] for _ in query_texts]
+        if snapshot.is_empty or snapshot.idf is None or top_k <= 0 or not query_texts:
+            return empty
+
+        shards = list(snapshot.shards.values())
+        if document_ids is not None:
+            shards = [snapshot.shards[d] for d in document_ids if d in snapshot.shards]
+        # Each block is a shard plus the rows selected from it (None: all rows)
+        blocks: List[Tuple[LexicalShard, Optional[np.ndarray]]] = []
+        for shard in shards:
+            if not tag_mask:
+                blocks.append((shard, None))
+                continue
+            rows = shard.rows_tagged(tag_mask)
+            if rows.size:
+                blocks.append((shard, rows))
+        if not blocks:
+            return empty
+
+        query_matrix = self.transform(query_texts)
+        query_matrix.data *= snapshot.idf[query_matrix.indices]
+        query_matrix = normalize(query_matrix, norm="l2", copy=False)
+
+        # Sparse (rows x queries) similarity matrix over the selected shards,
+        # one CSC column of matching rows per query
+        query_columns = query_matrix.T.tocsc()
+        similarities = sparse.vstack([
+            (shard.matrix if rows is None else shard.matrix[rows]) @ query_columns
+            for shard, rows in blocks
+        ], format="csc")
+        offsets = np.cumsum([0] + [
+            shard.size if rows is None else rows.size for shard, rows in blocks
+        ])
+
+        ranked_lists = []
+        for column in range(similarities.shape[1]):
+            start, end = similarities.indptr[column], similarities.indptr[column + 1]
+            scores = similarities.data[start:end]
+            if not np.any(scores):
+                ranked_lists.append([])
+                continue
+
+            k = min(top_k, scores.size)
+            candidates = np.argpartition(-scores, k - 1)[:k]
+            candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+            ranked = similarities.indices[start:end][candidates]
+
+            # Map flat positions back to (shard, row)
+            block_positions = np.searchsorted(offsets, ranked, side="right") - 1
+            ranked_lists.append([
+                (self._block_entry(blocks[position], index - offsets[position]), float(score))
+                for index, position, score in zip(ranked, block_positions, scores[candidates])
+            ])
+        return ranked_lists
+
+    @staticmethod
+    def _block_entry(block: Tuple[LexicalShard, Optional[np.ndarray]], offset: int) -> Any:
+        shard, rows = block
+        return shard.entries[offset if rows is None else int(rows[offset])]
+
+    def _copy_frequency(self, snapshot: LexicalSnapshot) -> np.ndarray:
+        if snapshot.document_frequency is None:
+            return np.zeros(self.n_features, dtype=np.float64)
+        return snapshot.document_frequency.copy()
+
+    def _swap(
+        self,
+        shards: Dict[str, LexicalShard],
+        document_frequency: np.ndarray,
+        total_rows: int,
+    ) -> LexicalSnapshot:
+        # Smoothed idf, as in sklearn's TfidfTransformer
+        idf = np.log((1.0 + total_rows) / (1.0 + document_frequency)) + 1.0
+        snapshot = LexicalSnapshot(
+            shards=MappingProxyType(shards),
+            document_frequency=document_frequency,
+            idf=idf,
+            total_rows=total_rows,
+            generation=self._snapshot.generation + 1,
+        )
+        self._snapshot = snapshot
+        return snapshot
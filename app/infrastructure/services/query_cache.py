@@ -0,0 +1,101 @@
+"""
+LRU cache for knowledge base query results.
+
+Entries are kept in an ``OrderedDict`` so lookups, inserts and evictions are
+O(1). The cache is bounded both by entry count and by an estimate of the
+memory held by the cached results, and entries expire after a TTL.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Rough per-result overhead of the dict and its small scalar fields
+_RESULT_OVERHEAD_BYTES = 400
+
+
+def estimate_result_bytes(results: List[Dict[str, Any]]) -> int:
+    """Estimate the memory held by a list of legacy result dicts."""
+    total = sys.getsizeof(results)
+    for result in results:
+        total += _RESULT_OVERHEAD_BYTES
+        for value in result.values():
+            if isinstance(value, str):
+                total += sys.getsizeof(value)
+            elif isinstance(value, dict):
+                total += sum(
+                    sys.getsizeof(item) for item in value.values() if isinstance(item, str)
+                )
+    return total
+
+
+class QueryResultCache:
+    """Size-bounded LRU cache with TTL expiry."""
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 300,
+    ) -> None:
+        """
+        Initialize QueryResultCache.
+
+        Args:
+            max_entries: Maximum number of cached queries
+            max_bytes: Maximum estimated size of all cached results
+            ttl_seconds: Time after which an entry is considered stale
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[List[Dict[str, Any]], float, int]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """Return cached results and mark them most recently used."""
+        item = self._entries.get(key)
+        if item is None:
+            return None
+
+        results, stored_at, _ = item
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            self._pop(key)
+            return None
+
+        self._entries.move_to_end(key)
+        return results
+
+    def put(self, key: Hashable, results: List[Dict[str, Any]]) -> None:
+        """Store results, evicting least recently used entries as needed."""
+        size = estimate_result_bytes(results)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._pop(key)
+        self._entries[key] = (results, time.monotonic(), size)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._pop(oldest_key)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _pop(self, key: Hashable) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,110 @@
+"""
+Per-request query context for retrieval.
+
+Answering one knowledge base query can touch the same query text several
+times: confidence routing, the hybrid fallback and reranking all start from
+the query embedding and the dense result set. The context memoizes both for
+the lifetime of a single request.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from .embedding_service import EmbeddingResult
+from .vector_database_service import VectorSearchResult
+
+
+class RAGQueryContext:
+    """
+    Per-request memo of query embeddings and vector result sets.
+
+    A single context is shared by every search issued while answering one
+    request (confidence routing, hybrid fusion, reranking), so each distinct
+    query text is embedded once and each distinct vector search runs once.
+    In-flight work is shared as well, which keeps concurrent legs of the same
+    request from duplicating encoder calls.
+    """
+
+    def __init__(self) -> None:
+        self._embeddings: Dict[str, asyncio.Future] = {}
+        self._results: Dict[Hashable, asyncio.Future] = {}
+        self.encoder_calls = 0
+        self.embedding_hits = 0
+        self.search_calls = 0
+        self.search_hits = 0
+
+    async def embed(
+        self,
+        text: str,
+        compute: Callable[[], Awaitable[EmbeddingResult]],
+    ) -> EmbeddingResult:
+        """Return the memoized embedding of ``text``, computing it once."""
+        if text in self._embeddings:
+            self.embedding_hits += 1
+        else:
+            self.encoder_calls += 1
+        return await self._memoize(self._embeddings, text, compute)
+
+    async def embed_many(
+        self,
+        texts: List[str],
+        compute_batch: Callable[[List[str]], Awaitable[List[EmbeddingResult]]],
+    ) -> List[EmbeddingResult]:
+        """Embed several texts, computing the missing ones in a single batch."""
+        missing = [text for text in dict.fromkeys(texts) if text not in self._embeddings]
+        self.embedding_hits += len(texts) - len(missing)
+        if missing:
+            self.encoder_calls += 1
+            loop = asyncio.get_running_loop()
+            futures = {text: loop.create_future() for text in missing}
+            self._embeddings.update(futures)
+            try:
+                results = await compute_batch(missing)
+                if len(results) != len(missing):
+                    # Unresolved futures would block every waiter forever
+                    raise RuntimeError(
+                        f"Embedding batch returned {len(results)} results for {len(missing)} texts"
+                    )
+            except BaseException:
+                for text, future in futures.items():
+                    self._embeddings.pop(text, None)
+                    future.cancel()
+                raise
+            for text, result in zip(missing, results):
+                futures[text].set_result(result)
+
+        return list(await asyncio.gather(
+            *(asyncio.shield(self._embeddings[text]) for text in texts)
+        ))
+
+    async def search(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[List[VectorSearchResult]]],
+    ) -> List[VectorSearchResult]:
+        """Return the memoized vector result set for ``key``, searching once."""
+        if key in self._results:
+            self.search_hits += 1
+        else:
+            self.search_calls += 1
+        return await self._memoize(self._results, key, compute)
+
+    @staticmethod
+    async def _memoize(
+        store: Dict[Hashable, asyncio.Future],
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        future = store.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            store[key] = future
+        try:
+            # Shield so a caller-side timeout does not cancel shared work
+            return await asyncio.shield(future)
+        except BaseException:
+            if future.done() and (future.cancelled() or future.exception() is not None):
+                # Failed work is not memoized; a later caller retries it
+                store.pop(key, None)
+            raise
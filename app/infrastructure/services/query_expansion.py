@@ -0,0 +1,155 @@
+"""
+Corpus-driven query expansion.
+
+Expansion terms come from co-occurrence statistics of the indexed corpus
+rather than from a fixed synonym list, so they follow whatever language and
+vocabulary the loaded normative documents use. Statistics are accumulated at
+ingest time and taken back when chunks are deleted; expansions are cached per
+query and invalidated whenever the corpus changes.
+"""
+from __future__ import annotations
+
+import math
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Tuple
+
+from .text_tokenizer import stem_russian, tokenize
+
+_MIN_TERM_LENGTH = 3
+
+
+class CooccurrenceQueryExpander:
+    """
+    Expand queries with terms that co-occur with the query terms in the corpus.
+
+    Two terms co-occur when they appear within ``window`` tokens of each other
+    in an indexed chunk. Candidates are ranked by the cosine association
+    ``cooc(a, b) / sqrt(df(a) * df(b))`` summed over the query terms.
+    """
+
+    def __init__(
+        self,
+        window: int = 5,
+        min_cooccurrence: int = 2,
+        max_terms: int = 3,
+        cache_size: int = 1024,
+    ) -> None:
+        """
+        Initialize CooccurrenceQueryExpander.
+
+        Args:
+            window: Token distance within which two terms co-occur
+            min_cooccurrence: Minimum co-occurrence count of an expansion term
+            max_terms: Maximum expansion terms per query
+            cache_size: Maximum number of cached query expansions
+        """
+        self.window = window
+        self.min_cooccurrence = min_cooccurrence
+        self.max_terms = max_terms
+        self.cache_size = cache_size
+
+        self._document_frequency: Counter = Counter()
+        self._cooccurrence: Dict[str, Counter] = {}
+        # Most readable surface form per stem, used to build query variants
+        self._surface_forms: Dict[str, str] = {}
+        self._generation = 0
+        self._cache: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self._document_frequency)
+
+    def add_documents(self, texts: Iterable[str]) -> None:
+        """Accumulate co-occurrence statistics for newly indexed chunks."""
+        updated = False
+        for text in texts:
+            terms = self._terms(text)
+            if not terms:
+                continue
+            updated = True
+            for stem, surface in terms:
+                self._surface_forms.setdefault(stem, surface)
+            self._count(terms, 1)
+
+        if updated:
+            self._invalidate()
+
+    def remove_documents(self, texts: Iterable[str]) -> None:
+        """
+        Take back the statistics of deleted chunks.
+
+        The cache is invalidated even when no text is known, since the
+        corpus changed either way.
+        """
+        for text in texts:
+            self._count(self._terms(text), -1)
+        self._invalidate()
+
+    def _count(self, terms: List[Tuple[str, str]], delta: int) -> None:
+        """Add ``delta`` to the statistics of one chunk; zero counts are dropped."""
+        for stem in set(stem for stem, _ in terms):
+            self._document_frequency[stem] += delta
+            if self._document_frequency[stem] <= 0:
+                del self._document_frequency[stem]
+                self._surface_forms.pop(stem, None)
+        for position, (stem, _) in enumerate(terms):
+            for other, _ in terms[position + 1:position + 1 + self.window]:
+                if other == stem:
+                    continue
+                self._add_cooccurrence(stem, other, delta)
+                self._add_cooccurrence(other, stem, delta)
+
+    def _add_cooccurrence(self, stem: str, other: str, delta: int) -> None:
+        neighbours = self._cooccurrence.setdefault(stem, Counter())
+        neighbours[other] += delta
+        if neighbours[other] <= 0:
+            del neighbours[other]
+            if not neighbours:
+                del self._cooccurrence[stem]
+
+    def _invalidate(self) -> None:
+        self._generation += 1
+        self._cache.clear()
+
+    def expand(self, query: str) -> List[str]:
+        """Return query variants, each extended with one related corpus term."""
+        key = (" ".join(tokenize(query)), self._generation)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return list(cached)
+
+        query_stems = {stem for stem, _ in self._terms(query)}
+        scores: Counter = Counter()
+        for stem in query_stems:
+            neighbours = self._cooccurrence.get(stem)
+            if not neighbours:
+                continue
+            stem_df = self._document_frequency[stem]
+            for other, count in neighbours.items():
+                if count < self.min_cooccurrence or other in query_stems:
+                    continue
+                scores[other] += count / math.sqrt(stem_df * self._document_frequency[other])
+
+        variants = [
+            f"{query} {self._surface_forms[stem]}"
+            for stem, _ in scores.most_common(self.max_terms)
+        ]
+
+        self._cache[key] = variants
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return list(variants)
+
+    @staticmethod
+    def _terms(text: str) -> List[Tuple[str, str]]:
+        """Return (stem, surface form) pairs of the content words of a text."""
+        return [
+            (stem_russian(token), token)
+            for token in tokenize(text)
+            if len(token) >= _MIN_TERM_LENGTH and not token.isdigit()
+        ]
@@ -80,9 +80,25 @@ class RAGServiceFactory:
                 hnsw_config_ef_construct=config.qdrant_hnsw_config_ef_construct,
                 timeout=config.qdrant_timeout,
                 enable_tfidf_fallback=config.enable_tfidf_fallback,
+                enable_sparse_vectors=config.enable_sparse_vectors,
             )
             logger.info(f"✅ VectorDatabaseService created: {vector_db_service is not None}")
 
+        # Section-level collection for coarse-to-fine retrieval
+        coarse_vector_db_service = None
+        if vector_db_service and config.enable_hierarchical_search:
+            coarse_vector_db_service = VectorDatabaseService(
+                qdrant_url=config.qdrant_url,
+                qdrant_api_key=config.qdrant_api_key,
+                collection_name=f"{config.qdrant_collection_name}_sections",
+                vector_size=config.qdrant_vector_size,
+                distance_metric=config.qdrant_distance_metric,
+                timeout=config.qdrant_timeout,
+                enable_tfidf_fallback=False,
+                enable_sparse_vectors=False,
+            )
+            logger.info("✅ Section-level VectorDatabaseService created")
+
         # Create RAG orchestrator if both services are available
         rag_orchestrator = None
         if embedding_service and vector_db_service:
@@ -91,6 +107,10 @@ class RAGServiceFactory:
                 vector_db_service=vector_db_service,
                 enable_hybrid_search=config.enable_hybrid_search,
                 search_timeout=config.rag_search_timeout,
+                coarse_vector_db_service=coarse_vector_db_service,
+                coarse_top_k=config.hierarchical_coarse_top_k,
+                section_size=config.hierarchical_section_size,
+                expansion_confidence_threshold=config.rag_expansion_confidence_threshold,
             )
             logger.info(f"✅ RAGOrchestrator created: {rag_orchestrator is not None}")
         else:
@@ -135,6 +155,9 @@ class RAGServiceFactory:
             logger.warning("RAG services already initialized")
             return cls._knowledge_base
         
+        if config is None:
+            config = get_rag_config()
+
         # Create services
         embedding_service, vector_db_service, rag_orchestrator, knowledge_base = \
             await cls.create_services(config)
@@ -157,6 +180,10 @@ class RAGServiceFactory:
             if knowledge_base:
                 await knowledge_base.initialize()
                 logger.info("KnowledgeBase initialized")
+                if config.enable_warm_start and knowledge_base.start_warm_start(
+                    config.warm_start_page_size
+                ):
+                    logger.info("KnowledgeBase warm start scheduled")
             
             cls._initialized = True
             logger.info("All RAG services initialized successfully")
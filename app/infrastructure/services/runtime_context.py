@@ -6,7 +6,10 @@ from app.infrastructure.repositories.file_system_document_parser import FileSyst
 from app.infrastructure.services.openrouter_client import OpenRouterClient
 from app.config.settings import Settings  # fixed import path
 
+from .analysis_archive import AnalysisArchive
+from .analysis_jobs import create_job_store
 from .analysis_manager import AnalysisManager
+from .analysis_scheduler import AnalysisScheduler
 from .script_store import ScriptStore
 
 
@@ -32,6 +35,7 @@ async def _initialize_services():
 
 _knowledge_base = None
 _analysis_manager = None
+_analysis_worker = None
 
 
 async def get_knowledge_base():
@@ -48,10 +52,50 @@ async def get_analysis_manager():
     if _knowledge_base is None:
         _knowledge_base = await get_knowledge_base()
     if _analysis_manager is None:
-        _analysis_manager = AnalysisManager(knowledge_base=_knowledge_base, script_store=script_store)
+        _analysis_manager = AnalysisManager(
+            knowledge_base=_knowledge_base,
+            script_store=script_store,
+            reference_batch_size=settings.analysis_reference_batch_size,
+            assessment_concurrency=settings.analysis_concurrency,
+            cascade=settings.analysis_cascade,
+            assessment_cache_size=settings.analysis_assessment_cache_size,
+            job_store=create_job_store(
+                settings.analysis_job_backend,
+                sqlite_path=settings.analysis_job_sqlite_path,
+                redis_url=settings.analysis_job_redis_url,
+            ),
+            lease_seconds=settings.analysis_job_lease_seconds,
+            run_locally=settings.analysis_job_run_in_api,
+            scheduler=AnalysisScheduler(
+                max_concurrent=settings.analysis_max_concurrent,
+                max_queued=settings.analysis_max_queued,
+            ),
+            archive=AnalysisArchive(settings.analysis_archive_dir),
+            retained_analyses=settings.analysis_retained,
+            retention_seconds=settings.analysis_retention_seconds,
+        )
     return _analysis_manager
 
 
+async def start_analysis_worker():
+    """Resume queued and orphaned analysis jobs in this process (shared backends only)."""
+    global _analysis_worker
+    if settings.analysis_job_backend == "memory":
+        return None
+    if _analysis_worker is None or _analysis_worker.done():
+        manager = await get_analysis_manager()
+        _analysis_worker = asyncio.create_task(manager.run_worker())
+    return _analysis_worker
+
+
+async def stop_analysis_worker():
+    """Stop the background analysis worker started by start_analysis_worker."""
+    global _analysis_worker
+    if _analysis_worker is not None:
+        _analysis_worker.cancel()
+        _analysis_worker = None
+
+
 # Backward compatible module-level placeholders
 knowledge_base = None  # Will be set by get_knowledge_base()
 analysis_manager = None  # Will be set by get_analysis_manager()
@@ -9,7 +9,7 @@ pipeline.
 """
 
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 from app.presentation.api.schemas import (
     AgeRating,
@@ -17,6 +17,8 @@ from app.presentation.api.schemas import (
     SceneViolation,
 )
 
+from .keyword_matcher import KeywordAutomaton, first_offsets
+
 
 @dataclass
 class SimpleRule:
@@ -47,12 +49,14 @@ class SimpleRulesEngine:
 
     Limitations:
     - No morphology / lemmatization.
-    - Case-insensitive substring search only.
+    - Case-insensitive substring search only (one automaton pass per scene).
     - Rating is computed as max rating_level across triggered rules.
     """
 
     def __init__(self) -> None:
         self._normative_doc = self._build_default_normative_doc()
+        self._automaton: Optional[KeywordAutomaton] = None
+        self._automaton_key: Optional[Tuple[str, str, int]] = None
         self._rating_order: Dict[AgeRating, int] = {
             AgeRating.ZERO_PLUS: 0,
             AgeRating.SIX_PLUS: 1,
@@ -121,30 +125,42 @@ class SimpleRulesEngine:
         """
         Run all simple rules against scene_text and return violations.
         """
-        text_lower = scene_text.lower()
+        rules = self._normative_doc.rules
+        offsets = first_offsets(self._rule_automaton().find_all(scene_text))
         violations: List[SceneViolation] = []
 
-        for rule in self._normative_doc.rules:
-            # very naive: first keyword that appears triggers the rule
-            for kw in rule.keywords:
-                kw_lower = kw.lower()
-                idx = text_lower.find(kw_lower)
-                if idx != -1:
-                    snippet = scene_text[max(0, idx - 20): idx + len(kw_lower) + 20]
-                    violations.append(
-                        SceneViolation(
-                            rule_id=rule.rule_id,
-                            law_ref=rule.law_ref,
-                            rating_level=rule.rating_level,
-                            category=rule.category,
-                            snippet=snippet.strip(),
-                            comment=rule.comment,
-                        )
-                    )
-                    break  # do not add multiple times per rule
+        for index, rule in enumerate(rules):
+            found = offsets.get(index)
+            if not found:
+                continue
+            # the first listed keyword that appears triggers the rule, once
+            kw_lower = next(kw.lower() for kw in rule.keywords if kw.lower() in found)
+            idx = found[kw_lower]
+            snippet = scene_text[max(0, idx - 20): idx + len(kw_lower) + 20]
+            violations.append(
+                SceneViolation(
+                    rule_id=rule.rule_id,
+                    law_ref=rule.law_ref,
+                    rating_level=rule.rating_level,
+                    category=rule.category,
+                    snippet=snippet.strip(),
+                    comment=rule.comment,
+                )
+            )
 
         return violations
 
+    def _rule_automaton(self) -> KeywordAutomaton:
+        """Automaton over the rule keywords, compiled again only for a new document version."""
+        doc = self._normative_doc
+        key = (doc.doc_id, doc.version, id(doc.rules))
+        if key != self._automaton_key:
+            self._automaton = KeywordAutomaton(
+                (index, rule.keywords) for index, rule in enumerate(doc.rules)
+            )
+            self._automaton_key = key
+        return self._automaton
+
     def compute_final_rating(self, violations: List[SceneViolation]) -> AgeRating:
         """
         Compute final rating as max rating_level across violations.
@@ -0,0 +1,86 @@
+"""
+BM25 sparse encoder for hybrid retrieval.
+
+Documents are encoded with BM25 term-frequency saturation and length
+normalization; the inverse document frequency part is applied by Qdrant
+through the ``IDF`` modifier of the sparse vector, so corpus-wide statistics
+never have to be recomputed on the application side.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from .text_tokenizer import term_id, tokenize
+
+
+@dataclass
+class SparseVectorData:
+    """Sparse vector in coordinate form."""
+    indices: List[int]
+    values: List[float]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"indices": self.indices, "values": self.values}
+
+    def is_empty(self) -> bool:
+        return not self.indices
+
+
+class BM25SparseEncoder:
+    """
+    Encode texts into BM25-weighted sparse vectors.
+
+    The average document length used for length normalization is tracked as a
+    running mean over all encoded documents, seeded with ``avg_doc_length``.
+    """
+
+    def __init__(
+        self,
+        k1: float = 1.2,
+        b: float = 0.75,
+        avg_doc_length: float = 120.0,
+    ) -> None:
+        """
+        Initialize BM25SparseEncoder.
+
+        Args:
+            k1: Term frequency saturation parameter
+            b: Document length normalization parameter
+            avg_doc_length: Initial average document length in tokens
+        """
+        self.k1 = k1
+        self.b = b
+        self._total_tokens = avg_doc_length
+        self._documents = 1
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self._total_tokens / self._documents
+
+    def encode_document(self, text: str) -> SparseVectorData:
+        """Encode a document with BM25 term weights."""
+        tokens = tokenize(text)
+        if not tokens:
+            return SparseVectorData(indices=[], values=[])
+
+        doc_length = len(tokens)
+        self._total_tokens += doc_length
+        self._documents += 1
+
+        length_norm = 1 - self.b + self.b * doc_length / self.avg_doc_length
+        weights: Dict[int, float] = {}
+        for token, tf in Counter(tokens).items():
+            index = term_id(token)
+            weight = tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+            # Hash collisions are merged rather than overwritten
+            weights[index] = weights.get(index, 0.0) + weight
+
+        indices = sorted(weights)
+        return SparseVectorData(indices=indices, values=[weights[i] for i in indices])
+
+    def encode_query(self, text: str) -> SparseVectorData:
+        """Encode a query as a binary bag of term ids."""
+        indices = sorted({term_id(token) for token in tokenize(text)})
+        return SparseVectorData(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,97 @@
+"""
+Shared tokenization helpers for lexical retrieval.
+
+Sparse BM25 vectors, lexical re-ranking and query expansion all need the same
+view of a text: lowercased word tokens mapped to stable integer term ids.
+Term ids are CRC32 hashes so they stay identical across processes and restarts,
+which matters because they are persisted in the vector database.
+"""
+from __future__ import annotations
+
+import re
+import zlib
+from bisect import bisect_left
+from typing import Iterable, List, Sequence
+
+_TOKEN_PATTERN = re.compile(r"\b\w+\b")
+_CYRILLIC_PATTERN = re.compile(r"^[а-я]+$")
+
+# Inflectional endings stripped by the light Russian stemmer, longest first
+_RUSSIAN_REFLEXIVE_SUFFIXES = ("ся", "сь")
+_RUSSIAN_SUFFIXES = tuple(sorted(
+    {
+        # adjectives and participles
+        "ыми", "ими", "ого", "его", "ому", "ему", "ая", "яя", "ое", "ее", "ые",
+        "ие", "ый", "ий", "ой", "ую", "юю", "ым", "им", "их", "ых",
+        # nouns
+        "иями", "ием", "ией", "иям", "иях",
+        "ами", "ями", "ах", "ях", "ов", "ев", "ей", "ам", "ям", "ом", "ем",
+        "ия", "ью", "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+        # verbs
+        "ешь", "ете", "ет", "ют", "ут", "ит", "ат", "ят", "ла", "ло", "ли",
+        "ть", "л",
+    },
+    key=len,
+    reverse=True,
+))
+_MIN_STEM_LENGTH = 3
+
+
+def normalize_token(token: str) -> str:
+    """Lowercase a token and fold 'ё' into 'е'."""
+    return token.lower().replace("ё", "е")
+
+
+def stem_russian(token: str) -> str:
+    """Strip common Russian inflectional endings from a normalized token."""
+    if not _CYRILLIC_PATTERN.match(token):
+        return token
+
+    for suffix in _RUSSIAN_REFLEXIVE_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM_LENGTH:
+            token = token[: -len(suffix)]
+            break
+
+    for suffix in _RUSSIAN_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM_LENGTH:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str, stem: bool = False) -> List[str]:
+    """Split text into normalized word tokens, optionally stemmed."""
+    if not text:
+        return []
+    tokens = [normalize_token(token) for token in _TOKEN_PATTERN.findall(text)]
+    if stem:
+        tokens = [stem_russian(token) for token in tokens]
+    return tokens
+
+
+def term_id(token: str) -> int:
+    """Map a token to a stable unsigned 32-bit term id."""
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def term_ids(texts: Iterable[str], stem: bool = True) -> List[int]:
+    """Return the sorted, de-duplicated term ids of one or more texts."""
+    ids = set()
+    for text in texts:
+        ids.update(term_id(token) for token in tokenize(text, stem=stem))
+    return sorted(ids)
+
+
+def count_overlap(query_ids: Iterable[int], sorted_ids: Sequence[int]) -> int:
+    """
+    Count query term ids present in a sorted id array.
+
+    Runs in O(q log n), so the cost depends on the query length rather than
+    on the length of the indexed text.
+    """
+    size = len(sorted_ids)
+    overlap = 0
+    for value in query_ids:
+        position = bisect_left(sorted_ids, value)
+        if position < size and sorted_ids[position] == value:
+            overlap += 1
+    return overlap
@@ -11,7 +11,7 @@ import logging
 import uuid
 import json
 import hashlib
-from typing import List, Optional, Dict, Any, Tuple
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -25,10 +25,19 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
+    MatchAny,
     SearchParams,
     ScoredPoint,
     HnswConfigDiff,
     OptimizersConfigDiff,
+    SparseVectorParams,
+    SparseVector,
+    Modifier,
+    Prefetch,
+    FusionQuery,
+    Fusion,
+    QueryRequest,
+    PayloadSchemaType,
 )
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
@@ -64,10 +73,14 @@ class VectorDatabaseService:
     - Qdrant integration for vector search
     - Collection management
     - Upsert, delete, search operations
-    - Hybrid search (vector + TF-IDF fallback)
+    - Hybrid search (dense + BM25 sparse vectors fused with RRF)
+    - TF-IDF fallback
     - Connection pooling and health checks
     """
 
+    # Payload fields with a keyword index, used for scoped searches
+    _KEYWORD_PAYLOAD_FIELDS: Tuple[str, ...] = ("document_id", "categories")
+
     def __init__(
         self,
         qdrant_url: Optional[str] = None,
@@ -87,6 +100,8 @@ class VectorDatabaseService:
         batch_size: int = 100,  # Batch size for bulk operations
         max_connections: int = 10,  # Connection pool size
         enable_performance_monitoring: bool = True,
+        enable_sparse_vectors: bool = True,
+        sparse_vector_name: str = "bm25",
     ):
         """
         Initialize VectorDatabaseService.
@@ -104,6 +119,8 @@ class VectorDatabaseService:
             hnsw_config_ef_construct: HNSW ef_construct parameter
             timeout: Request timeout in seconds
             enable_tfidf_fallback: Enable TF-IDF fallback for search
+            enable_sparse_vectors: Store named BM25 sparse vectors next to dense vectors
+            sparse_vector_name: Name of the sparse vector in the collection
         """
         self.qdrant_url = qdrant_url
         self.qdrant_api_key = qdrant_api_key
@@ -122,6 +139,11 @@ class VectorDatabaseService:
         self.batch_size = batch_size
         self.max_connections = max_connections
         self.enable_performance_monitoring = enable_performance_monitoring
+        self.enable_sparse_vectors = enable_sparse_vectors
+        self.sparse_vector_name = sparse_vector_name
+
+        # Set when the collection actually carries the sparse vector
+        self._sparse_available = False
 
         self._client: Optional[AsyncQdrantClient] = None
         self._redis_client: Optional[aioredis.Redis] = None
@@ -146,6 +168,8 @@ class VectorDatabaseService:
         self._metrics = {
             "total_searches": 0,
             "vector_searches": 0,
+            "hybrid_searches": 0,
+            "batch_searches": 0,
             "tfidf_fallback_searches": 0,
             "upserts": 0,
             "deletes": 0,
@@ -232,6 +256,16 @@ class VectorDatabaseService:
                     logger.info(f"Recreated collection: {self.collection_name} with vector size {target_vector_size}")
                 else:
                     logger.info(f"Collection already exists: {self.collection_name} with correct vector size {target_vector_size}")
+                    sparse_vectors = collection_info.config.params.sparse_vectors or {}
+                    self._sparse_available = (
+                        self.enable_sparse_vectors and self.sparse_vector_name in sparse_vectors
+                    )
+                    if self.enable_sparse_vectors and not self._sparse_available:
+                        logger.warning(
+                            f"Collection {self.collection_name} has no sparse vector '{self.sparse_vector_name}'; "
+                            "hybrid search will use dense vectors only until the collection is recreated"
+                        )
+                    await self._ensure_payload_indexes()
 
         except Exception as e:
             logger.error(f"Error ensuring collection exists: {e}")
@@ -259,15 +293,37 @@ class VectorDatabaseService:
 
         optimizers_config = OptimizersConfigDiff()
 
+        # BM25 term weights are stored per point; Qdrant applies the IDF part
+        sparse_vectors_config = None
+        if self.enable_sparse_vectors:
+            sparse_vectors_config = {
+                self.sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF),
+            }
+
         await self._client.create_collection(
             collection_name=self.collection_name,
             vectors_config=vectors_config,
+            sparse_vectors_config=sparse_vectors_config,
             hnsw_config=hnsw_config,
             optimizers_config=optimizers_config,
             replication_factor=self.replication_factor,
             write_consistency_factor=self.write_consistency_factor,
             on_disk_payload=self.on_disk_payload,
         )
+        self._sparse_available = self.enable_sparse_vectors
+        await self._ensure_payload_indexes()
+
+    async def _ensure_payload_indexes(self) -> None:
+        """Index payload fields used in filters so scoped searches stay cheap."""
+        for field_name in self._KEYWORD_PAYLOAD_FIELDS:
+            try:
+                await self._client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType.KEYWORD,
+                )
+            except Exception as e:
+                logger.warning(f"Could not index payload field {field_name}: {e}")
 
     async def close(self) -> None:
         """Close Qdrant client and Redis connections."""
@@ -354,11 +410,22 @@ class VectorDatabaseService:
                     doc_id = str(uuid.uuid4())
             vector = doc.get("vector")
             payload = doc.get("payload", {})
+            sparse_vector = doc.get("sparse_vector")
 
             if not vector:
                 logger.warning(f"Document {doc_id} has no vector, skipping")
                 continue
 
+            if self._sparse_available and sparse_vector and sparse_vector.get("indices"):
+                # The dense vector stays the unnamed default vector
+                vector = {
+                    "": vector,
+                    self.sparse_vector_name: SparseVector(
+                        indices=sparse_vector["indices"],
+                        values=sparse_vector["values"],
+                    ),
+                }
+
             # Add performance metadata
             payload["indexed_at"] = datetime.utcnow().isoformat()
             if self.enable_performance_monitoring:
@@ -465,18 +532,7 @@ class VectorDatabaseService:
         self._performance_metrics["cache_misses"] += 1
 
         try:
-            # Build filter if provided
-            query_filter = None
-            if filter_conditions:
-                conditions = []
-                for key, value in filter_conditions.items():
-                    conditions.append(
-                        FieldCondition(
-                            key=key,
-                            match=MatchValue(value=value),
-                        )
-                    )
-                query_filter = Filter(must=conditions)
+            query_filter = self._build_filter(filter_conditions)
 
             # Search in Qdrant with optimized parameters
             search_params = None
@@ -486,27 +542,21 @@ class VectorDatabaseService:
                     exact=False,  # Use approximate search for speed
                 )
 
-            search_result = await self._client.search(
+            search_result = await self._client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query=query_vector,
                 limit=limit,
                 score_threshold=score_threshold,
                 query_filter=query_filter,
                 search_params=search_params,
+                with_payload=True,
                 with_vectors=False,
             )
 
             self._metrics["vector_searches"] += 1
 
             # Convert to VectorSearchResult
-            results = [
-                VectorSearchResult(
-                    id=str(point.id),
-                    score=point.score,
-                    payload=point.payload,
-                )
-                for point in search_result
-            ]
+            results = self._to_search_results(search_result.points)
 
             # Cache the results
             if use_cache and self._redis_client:
@@ -531,6 +581,202 @@ class VectorDatabaseService:
 
             raise
 
+    async def hybrid_search(
+        self,
+        query_vector: List[float],
+        sparse_vector: Optional[Dict[str, Any]],
+        limit: int = 10,
+        filter_conditions: Optional[Dict[str, Any]] = None,
+        prefetch_limit: Optional[int] = None,
+    ) -> List[VectorSearchResult]:
+        """
+        Search dense and sparse vectors in one request and fuse them with RRF.
+
+        Both candidate lists are produced server-side by prefetch queries and
+        merged with reciprocal rank fusion, so documents that only match
+        lexically are retrieved as well. Falls back to dense search when the
+        collection has no sparse vector or the query has no lexical terms.
+
+        Args:
+            query_vector: Dense query embedding
+            sparse_vector: Sparse query vector with 'indices' and 'values'
+            limit: Maximum number of fused results
+            filter_conditions: Metadata filters applied to both legs
+            prefetch_limit: Candidates fetched per leg before fusion
+
+        Returns:
+            List of search results scored by RRF
+        """
+        if not self._sparse_available or not sparse_vector or not sparse_vector.get("indices"):
+            return await self.search(
+                query_vector=query_vector,
+                limit=limit,
+                filter_conditions=filter_conditions,
+            )
+
+        start_time = datetime.utcnow() if self.enable_performance_monitoring else None
+        self._metrics["total_searches"] += 1
+        candidates = max(prefetch_limit or limit * 4, limit)
+
+        try:
+            query_filter = self._build_filter(filter_conditions)
+            response = await self._client.query_points(
+                collection_name=self.collection_name,
+                prefetch=[
+                    Prefetch(
+                        query=query_vector,
+                        limit=candidates,
+                        filter=query_filter,
+                    ),
+                    Prefetch(
+                        query=SparseVector(
+                            indices=sparse_vector["indices"],
+                            values=sparse_vector["values"],
+                        ),
+                        using=self.sparse_vector_name,
+                        limit=candidates,
+                        filter=query_filter,
+                    ),
+                ],
+                query=FusionQuery(fusion=Fusion.RRF),
+                limit=limit,
+                with_payload=True,
+                with_vectors=False,
+            )
+
+            self._metrics["hybrid_searches"] += 1
+            results = self._to_search_results(response.points)
+
+            if self.enable_performance_monitoring and start_time:
+                operation_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+                self._performance_metrics["operation_times"].append(operation_time)
+
+            logger.debug(f"Hybrid search returned {len(results)} results")
+            return results
+
+        except Exception as e:
+            self._metrics["errors"] += 1
+            logger.error(f"Hybrid search error: {e}")
+            raise
+
+    async def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        limit: int = 10,
+        score_threshold: Optional[float] = None,
+        filter_conditions: Optional[List[Optional[Dict[str, Any]]]] = None,
+    ) -> List[List[VectorSearchResult]]:
+        """
+        Search several query vectors in a single request.
+
+        Args:
+            query_vectors: Query embedding vectors
+            limit: Maximum number of results per query
+            score_threshold: Minimum similarity score
+            filter_conditions: Optional metadata filters, one per query vector
+
+        Returns:
+            One list of search results per query vector, in input order
+        """
+        if not query_vectors:
+            return []
+
+        start_time = datetime.utcnow() if self.enable_performance_monitoring else None
+        self._metrics["total_searches"] += len(query_vectors)
+        filters = filter_conditions or [None] * len(query_vectors)
+
+        try:
+            responses = await self._client.query_batch_points(
+                collection_name=self.collection_name,
+                requests=[
+                    QueryRequest(
+                        query=query_vector,
+                        filter=self._build_filter(conditions),
+                        limit=limit,
+                        score_threshold=score_threshold,
+                        with_payload=True,
+                        with_vector=False,
+                    )
+                    for query_vector, conditions in zip(query_vectors, filters)
+                ],
+            )
+
+            self._metrics["vector_searches"] += len(query_vectors)
+            self._metrics["batch_searches"] += 1
+            results = [self._to_search_results(response.points) for response in responses]
+
+            if self.enable_performance_monitoring and start_time:
+                operation_time = (datetime.utcnow() - start_time).total_seconds() * 1000
+                self._performance_metrics["operation_times"].append(operation_time)
+
+            logger.debug(f"Batch search of {len(query_vectors)} queries completed")
+            return results
+
+        except Exception as e:
+            self._metrics["errors"] += 1
+            logger.error(f"Batch vector search error: {e}")
+            raise
+
+    async def scroll_payloads(
+        self,
+        page_size: int = 1024,
+        filter_conditions: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[List[VectorSearchResult]]:
+        """
+        Stream the payloads of all points, one page at a time.
+
+        Vectors are not transferred. Results carry a score of 0.0.
+
+        Args:
+            page_size: Number of points fetched per request
+            filter_conditions: Optional metadata filters
+        """
+        offset = None
+        scroll_filter = self._build_filter(filter_conditions)
+        while True:
+            points, offset = await self._client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=scroll_filter,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False,
+            )
+            if points:
+                yield [
+                    VectorSearchResult(id=str(point.id), score=0.0, payload=point.payload or {})
+                    for point in points
+                ]
+            if offset is None:
+                break
+
+    def _build_filter(self, filter_conditions: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        """Build a Qdrant filter from metadata conditions."""
+        if not filter_conditions:
+            return None
+
+        conditions = []
+        for key, value in filter_conditions.items():
+            # List values match any of the given values
+            if isinstance(value, (list, tuple, set)):
+                match = MatchAny(any=list(value))
+            else:
+                match = MatchValue(value=value)
+            conditions.append(FieldCondition(key=key, match=match))
+        return Filter(must=conditions)
+
+    @staticmethod
+    def _to_search_results(points: List[ScoredPoint]) -> List[VectorSearchResult]:
+        """Convert Qdrant scored points to VectorSearchResult."""
+        return [
+            VectorSearchResult(
+                id=str(point.id),
+                score=point.score,
+                payload=point.payload or {},
+            )
+            for point in points
+        ]
+
     def _generate_search_cache_key(
         self,
         query_vector: List[float],
@@ -701,6 +947,7 @@ class VectorDatabaseService:
             "collection_exists": False,
             "redis_cache_available": False,
             "tfidf_fallback_available": self.enable_tfidf_fallback,
+            "sparse_vectors_available": self._sparse_available,
             "metrics": self._metrics.copy(),
             "performance_metrics": self._performance_metrics.copy() if self.enable_performance_monitoring else {},
         }
@@ -78,11 +78,20 @@ def create_app() -> FastAPI:
             print(f"❌ Failed to initialize RAG services: {e}")
             # Continue without RAG services (graceful degradation)
 
+        try:
+            from app.infrastructure.services.runtime_context import start_analysis_worker
+
+            await start_analysis_worker()
+        except Exception as e:
+            print(f"❌ Failed to start analysis worker: {e}")
+
     @app.on_event("shutdown")
     async def shutdown_event():
         """Handle application shutdown events."""
         # Close database connections, cleanup resources, etc.
-        pass
+        from app.infrastructure.services.runtime_context import stop_analysis_worker
+
+        await stop_analysis_worker()
 
     return app
 
@@ -3,13 +3,16 @@ Script analysis API routes backed by the asynchronous analysis manager.
 """
 from __future__ import annotations
 
+import json
 import logging
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List, Mapping
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from app.infrastructure.services.analysis_scheduler import SchedulerOverloaded
 from app.infrastructure.services.runtime_context import (
     get_analysis_manager,
     get_knowledge_base,
@@ -135,6 +138,8 @@ def _build_scene_assessment(raw: Dict) -> SceneAssessment:
             for fragment in raw.get("highlights", [])
             if isinstance(fragment, dict)
         ],
+        assessment_tier=raw.get("assessment_tier"),
+        reused=bool(raw.get("reused", False)),
     )
 
 
@@ -144,15 +149,25 @@ def _build_scene_assessment(raw: Dict) -> SceneAssessment:
     summary="Start script analysis",
     description="Initiate analysis of an uploaded script document.",
 )
-async def start_analysis(request: ScriptAnalysisRequest) -> ScriptAnalysisResponse:
-    """Start a new analysis task."""
+async def start_analysis(request: ScriptAnalysisRequest, http_request: Request) -> ScriptAnalysisResponse:
+    """Start a new analysis task, queued fairly per client when all slots are busy."""
     try:
         manager = await get_analysis_manager()
         state = await manager.start_analysis(
             document_id=request.document_id,
             options=request.options.dict(),
             criteria_document_id=request.criteria_document_id,
+            client_id=_client_id(http_request),
         )
+    except SchedulerOverloaded as exc:
+        raise HTTPException(
+            status_code=503,
+            detail=ErrorDetail(
+                code="ANALYSIS_QUEUE_FULL",
+                message=str(exc),
+            ).dict(),
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
     except ValueError as exc:
         raise HTTPException(
             status_code=404,
@@ -173,17 +188,62 @@ async def start_analysis(request: ScriptAnalysisRequest) -> ScriptAnalysisRespon
         scene_assessments=assessments,
         created_at=state.get("created_at", datetime.utcnow()),
         recommendations=state.get("recommendations") or [],
+        processing_stats=state.get("processing_stats"),
     )
 
 
+def _client_id(request: Request) -> str:
+    """Client whose analyses share one fair-queueing slot: X-Client-Id or the remote address."""
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "anonymous"
+
+
+def _estimated_time_remaining(state: Mapping[str, Any]) -> int | None:
+    """Expected wait while queued, extrapolated from progress while running."""
+    if state.get("status") == "queued":
+        eta = state.get("estimated_time_remaining")
+        return int(eta) if eta is not None else None
+
+    progress = state.get("progress") or 0.0
+    started_at = state.get("started_at")
+    if state.get("status") != "processing" or not started_at or not 0 < progress < 100:
+        return None
+    if isinstance(started_at, str):
+        started_at = datetime.fromisoformat(started_at)
+    elapsed = (datetime.utcnow() - started_at).total_seconds()
+    return int(elapsed * (100 - progress) / progress)
+
+
+def _status_etag(state: Mapping[str, Any], since_block: int) -> str:
+    """Weak ETag of a status response, derived from what can change between polls."""
+    return (
+        f'W/"{state.get("status", "unknown")}-{len(state.get("scene_assessments", []))}-'
+        f'{state.get("progress", 0.0)}-{state.get("queue_position")}-{since_block}"'
+    )
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
 @router.get(
     "/status/{analysis_id}",
     response_model=AnalysisStatusResponse,
     summary="Get analysis status",
     description="Check the status and progress of a script analysis.",
 )
-async def get_analysis_status(analysis_id: str) -> AnalysisStatusResponse:
-    """Return current status and processed blocks for an analysis."""
+async def get_analysis_status(
+    analysis_id: str,
+    request: Request,
+    response: Response,
+    since_block: int = Query(0, ge=0, description="Return only blocks after this many processed blocks"),
+) -> AnalysisStatusResponse:
+    """Return current status and the blocks processed since ``since_block``."""
     try:
         manager = await get_analysis_manager()
         state = await manager.get_status(analysis_id)
@@ -196,21 +256,118 @@ async def get_analysis_status(analysis_id: str) -> AnalysisStatusResponse:
             ).dict(),
         ) from exc
 
-    assessments = [_build_scene_assessment(item) for item in state.get("scene_assessments", [])]
+    # Unchanged polls are answered before any block is serialized
+    etag = _status_etag(state, since_block)
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    scene_assessments = state.get("scene_assessments", [])
+    assessments = [_build_scene_assessment(item) for item in scene_assessments[since_block:]]
     rating_result = state.get("rating_result")
 
     return AnalysisStatusResponse(
         analysis_id=analysis_id,
         status=state.get("status", "unknown"),
         progress=state.get("progress", 0.0),
-        estimated_time_remaining=None,
+        estimated_time_remaining=_estimated_time_remaining(state),
+        queue_position=state.get("queue_position"),
         processed_blocks=assessments if assessments else None,
+        next_block=len(scene_assessments),
         rating_result=_build_rating_result(rating_result) if rating_result else None,
         recommendations=state.get("recommendations"),
+        processing_stats=state.get("processing_stats"),
         errors=state.get("errors"),
     )
 
 
+def _serialize_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a manager delta event into a JSON-ready payload."""
+    kind = event["event"]
+    if kind == "block":
+        payload: Dict[str, Any] = {
+            "index": event["index"],
+            "assessment": _build_scene_assessment(event["assessment"]),
+        }
+    elif kind == "status":
+        state = event["snapshot"]
+        rating_result = state.get("rating_result")
+        payload = {
+            "status": state.get("status"),
+            "progress": state.get("progress", 0.0),
+            "rating_result": _build_rating_result(rating_result) if rating_result else None,
+            "recommendations": state.get("recommendations"),
+            "processing_stats": state.get("processing_stats"),
+            "errors": state.get("errors"),
+        }
+    else:
+        payload = {key: value for key, value in event.items() if key != "event"}
+    return jsonable_encoder(payload)
+
+
+@router.get(
+    "/{analysis_id}/events",
+    summary="Stream analysis events",
+    description=(
+        "Server-sent events with one `block` event per newly assessed block, "
+        "`progress` ticks and a final `status` event."
+    ),
+)
+async def stream_analysis_events(
+    analysis_id: str,
+    request: Request,
+    since_block: int = Query(0, ge=0, description="Skip blocks before this index"),
+) -> StreamingResponse:
+    """Push analysis deltas instead of having clients poll the status."""
+    manager = await get_analysis_manager()
+    try:
+        await manager.get_status(analysis_id)
+    except KeyError as exc:
+        raise HTTPException(
+            status_code=404,
+            detail=ErrorDetail(
+                code="ANALYSIS_NOT_FOUND",
+                message=f"Analysis with ID {analysis_id} not found",
+            ).dict(),
+        ) from exc
+
+    # Reconnecting EventSource clients resume after the last block they got
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since_block = max(since_block, int(last_event_id) + 1)
+
+    async def event_source():
+        async for event in manager.stream_events(analysis_id, since_block=since_block):
+            data = json.dumps(_serialize_event(event), ensure_ascii=False)
+            event_id = f"id: {event['index']}\n" if event["event"] == "block" else ""
+            yield f"{event_id}event: {event['event']}\ndata: {data}\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/{analysis_id}/ws")
+async def analysis_events_websocket(websocket: WebSocket, analysis_id: str, since_block: int = 0):
+    """Send the same delta events as the SSE stream over a WebSocket."""
+    manager = await get_analysis_manager()
+    try:
+        await manager.get_status(analysis_id)
+    except KeyError:
+        await websocket.close(code=4404, reason="Analysis not found")
+        return
+
+    await websocket.accept()
+    try:
+        async for event in manager.stream_events(analysis_id, since_block=since_block):
+            await websocket.send_json({"event": event["event"], **_serialize_event(event)})
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.debug("Analysis %s event stream disconnected", analysis_id)
+
+
 @router.get(
     "/{analysis_id}",
     response_model=ScriptAnalysisResponse,
@@ -242,6 +399,7 @@ async def get_analysis_results(analysis_id: str) -> ScriptAnalysisResponse:
         scene_assessments=assessments,
         created_at=state.get("created_at", datetime.utcnow()),
         recommendations=state.get("recommendations"),
+        processing_stats=state.get("processing_stats"),
     )
 
 
@@ -336,7 +494,9 @@ async def check_scene(request: SceneCheckRequest) -> SceneCheckResponse:
 
         try:
             knowledge_base = await get_knowledge_base()
-            references = await knowledge_base.query(request.scene_text, top_k=1)
+            # Interactive checks go ahead of bulk analysis blocks
+            async with manager.scheduler.interactive():
+                references = await knowledge_base.query(request.scene_text, top_k=1)
         except Exception as exc:  # pragma: no cover - defensive
             logger.warning("check_scene: KnowledgeBase query failed: %s", exc)
             references = []
@@ -4,6 +4,8 @@ Health check routes.
 This module provides comprehensive endpoints for health checks and monitoring of all backend services.
 """
 import asyncio
+import os
+import sys
 from datetime import datetime
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException
@@ -20,6 +22,18 @@ from app.infrastructure.services.runtime_context import (
 router = APIRouter()
 
 
+def _process_memory() -> Dict[str, Any]:
+    """Resident memory of this process; the peak size where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return {"rss_bytes": int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")}
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"peak_rss_bytes": peak if sys.platform == "darwin" else peak * 1024}
+
+
 @router.get("/health")
 async def health_check():
     """
@@ -28,7 +42,12 @@ async def health_check():
     Returns:
         dict: Health status information.
     """
-    return {"status": "healthy", "version": "0.1.0", "timestamp": datetime.utcnow().isoformat()}
+    return {
+        "status": "healthy",
+        "version": "0.1.0",
+        "timestamp": datetime.utcnow().isoformat(),
+        "memory": _process_memory(),
+    }
 
 
 @router.get("/health/ready")
@@ -36,9 +55,15 @@ async def readiness_check():
     """
     Readiness check endpoint for load balancer health checks.
 
+    Answers 503 while the knowledge base restores its corpus from the vector
+    store, so no traffic reaches an instance with a partial index.
+
     Returns:
         dict: Readiness status information.
     """
+    kb = await get_knowledge_base()
+    if kb is not None and not kb.is_ready:
+        raise HTTPException(status_code=503, detail="Knowledge base warm start in progress")
     return {"status": "ready", "version": "0.1.0", "timestamp": datetime.utcnow().isoformat()}
 
 
@@ -55,7 +80,8 @@ async def comprehensive_health_check():
         "overall_status": "healthy",
         "services": {},
         "errors": [],
-        "warnings": []
+        "warnings": [],
+        "memory": _process_memory(),
     }
 
     try:
@@ -188,6 +214,7 @@ async def _check_core_services(health_status: Dict[str, Any]) -> None:
             "available": kb is not None,
             "has_rag_orchestrator": hasattr(kb, '_rag_orchestrator') if kb else False,
             "rag_orchestrator_available": getattr(kb, '_rag_orchestrator', None) is not None if kb else False,
+            "ready": kb.is_ready if kb else False,
         }
 
         if kb and hasattr(kb, 'get_rag_status'):
@@ -208,6 +235,8 @@ async def _check_core_services(health_status: Dict[str, Any]) -> None:
             "status": "healthy" if analysis_mgr else "unhealthy",
             "available": analysis_mgr is not None,
         }
+        if analysis_mgr:
+            services["analysis_manager"]["memory"] = analysis_mgr.memory_stats()
     except Exception as e:
         services["analysis_manager"] = {"status": "unhealthy", "error": str(e)}
         health_status["errors"].append(f"Analysis manager check failed: {str(e)}")
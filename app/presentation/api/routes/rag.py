@@ -510,6 +510,8 @@ async def rag_metrics():
                 "cache_hit_rate": rag_metrics.cache_hit_rate,
                 "vector_db_status": rag_metrics.vector_db_status,
                 "embedding_service_status": rag_metrics.embedding_service_status,
+                "hierarchical_searches": rag_metrics.hierarchical_searches,
+                "candidates_pruned": rag_metrics.candidates_pruned,
             }
         
         # Get knowledge base stats
@@ -128,6 +128,8 @@ class SceneAssessment(BaseModel):
     text: str = Field(..., description="Full text of the semantic block")
     text_preview: Optional[str] = Field(None, description="Short preview of the analyzed block text")
     highlights: List[HighlightFragment] = Field(default_factory=list, description="Highlighted fragments contributing to rating")
+    assessment_tier: Optional[str] = Field(None, description="Deepest analysis tier that assessed the block (rules, retrieval or classifier)")
+    reused: bool = Field(False, description="Assessment was reused from an earlier analysis of the same block content")
 
 
 class RatingResult(BaseModel):
@@ -139,6 +141,16 @@ class RatingResult(BaseModel):
     categories_summary: Dict[Category, Severity] = Field(..., description="Summary of highest severity per category")
 
 
+class ProcessingStats(BaseModel):
+    """Work done to analyze a script."""
+    blocks_total: int = Field(..., description="Number of analyzed blocks")
+    reference_lookups: int = Field(..., description="Blocks whose references were queried")
+    references_reused: int = Field(..., description="Blocks that reused references of a near-duplicate block")
+    reuse_rate: float = Field(..., description="Share of blocks with references that reused them (0-1)")
+    tier_counts: Dict[str, int] = Field(default_factory=dict, description="Blocks resolved by each analysis tier (rules, retrieval, classifier)")
+    blocks_reused: int = Field(0, description="Blocks whose assessment was reused from an earlier analysis")
+
+
 class ScriptAnalysisResponse(BaseModel):
     """Response model for script analysis."""
     analysis_id: str = Field(..., description="Unique identifier for the analysis")
@@ -148,6 +160,7 @@ class ScriptAnalysisResponse(BaseModel):
     scene_assessments: List[SceneAssessment] = Field(..., description="Detailed scene assessments")
     created_at: datetime = Field(..., description="Analysis timestamp")
     recommendations: Optional[List[str]] = Field(None, description="Improvement recommendations")
+    processing_stats: Optional[ProcessingStats] = Field(None, description="Processing statistics once completed")
 
 
 class SceneCheckRequest(BaseModel):
@@ -180,12 +193,15 @@ class SceneCheckResponse(BaseModel):
 class AnalysisStatusResponse(BaseModel):
     """Response model for analysis status check."""
     analysis_id: str = Field(..., description="Analysis ID")
-    status: str = Field(..., description="Current status (pending/processing/completed/failed)")
+    status: str = Field(..., description="Current status (queued/processing/completed/failed/cancelled)")
     progress: Optional[float] = Field(None, description="Progress percentage (0-100)")
     estimated_time_remaining: Optional[int] = Field(None, description="Estimated seconds remaining")
-    processed_blocks: Optional[List[SceneAssessment]] = Field(None, description="Blocks processed so far")
+    queue_position: Optional[int] = Field(None, description="Position in the analysis queue while queued (1 = next)")
+    processed_blocks: Optional[List[SceneAssessment]] = Field(None, description="Blocks processed so far (after since_block when given)")
+    next_block: int = Field(0, description="Number of blocks processed so far; pass as since_block to fetch only newer blocks")
     rating_result: Optional[RatingResult] = Field(None, description="Intermediate or final rating result")
     recommendations: Optional[List[str]] = Field(None, description="Recommendations when available")
+    processing_stats: Optional[ProcessingStats] = Field(None, description="Processing statistics once completed")
     errors: Optional[str] = Field(None, description="Error details if analysis failed")
 
 
@@ -228,9 +228,7 @@ class MigrationManager:
         logger.info("Initializing migration")
 
         # Get all entries from KnowledgeBase
-        all_entries = []
-        async with self.knowledge_base._lock:
-            all_entries = self.knowledge_base._entries.copy()
+        all_entries = self.knowledge_base.get_entries()
 
         self.status.total_documents = len(all_entries)
         self.status.total_batches = (self.status.total_documents + self.config.batch_size - 1) // self.config.batch_size
@@ -244,17 +242,16 @@ class MigrationManager:
         """Create backup of current KnowledgeBase state."""
         logger.info("Creating backup of KnowledgeBase")
 
-        async with self.knowledge_base._lock:
-            for entry in self.knowledge_base._entries:
-                self.backup_data.append({
-                    "entry_id": entry.entry_id,
-                    "document_id": entry.document_id,
-                    "document_title": entry.document_title,
-                    "page": entry.page,
-                    "paragraph": entry.paragraph,
-                    "text": entry.text,
-                    "metadata": entry.metadata
-                })
+        for entry in self.knowledge_base.get_entries():
+            self.backup_data.append({
+                "entry_id": entry.entry_id,
+                "document_id": entry.document_id,
+                "document_title": entry.document_title,
+                "page": entry.page,
+                "paragraph": entry.paragraph,
+                "text": entry.text,
+                "metadata": entry.metadata
+            })
 
         # Save backup
         with open(self.config.backup_file, 'w', encoding='utf-8') as f:
@@ -267,9 +264,7 @@ class MigrationManager:
         logger.info("Executing migration in batches")
 
         # Get entries to migrate
-        entries_to_migrate = []
-        async with self.knowledge_base._lock:
-            entries_to_migrate = self.knowledge_base._entries.copy()
+        entries_to_migrate = self.knowledge_base.get_entries()
 
         # Skip already migrated documents if resuming
         if self.config.resume_from_checkpoint:
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Standalone analysis worker.
+
+Pulls analysis jobs from the shared job store (ANALYSIS_JOB_BACKEND=sqlite or
+redis), checkpoints every assessed block and resumes jobs abandoned by a
+crashed worker. Run as many of these as needed next to the API processes.
+
+Usage:
+    python scripts/run_analysis_worker.py
+"""
+
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def main() -> int:
+    from app.infrastructure.services.runtime_context import get_analysis_manager, settings
+
+    if settings.analysis_job_backend == "memory":
+        logger.error("Workers need a shared job store: set ANALYSIS_JOB_BACKEND to sqlite or redis")
+        return 1
+
+    manager = await get_analysis_manager()
+    logger.info("Analysis worker started with the %s job store", settings.analysis_job_backend)
+    await manager.run_worker()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        logger.info("Analysis worker stopped")
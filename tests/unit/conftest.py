@@ -0,0 +1,32 @@
+"""
+Shared fixtures for unit tests.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+@pytest.fixture
+def make_knowledge_base():
+    """Factory of knowledge base doubles answering every block lookup with ``references``."""
+
+    def make(references=(), corpus_version="v1"):
+        knowledge_base = MagicMock()
+        knowledge_base.corpus_version.return_value = corpus_version
+        knowledge_base.query_many = AsyncMock(
+            side_effect=lambda texts, **kwargs: [list(references) for _ in texts]
+        )
+        return knowledge_base
+
+    return make
+
+
+@pytest.fixture
+def make_script_store():
+    """Factory of script store doubles returning ``script`` for every document."""
+
+    def make(script=None):
+        script_store = MagicMock()
+        script_store.get_script = AsyncMock(return_value=script)
+        return script_store
+
+    return make
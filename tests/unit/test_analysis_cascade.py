@@ -0,0 +1,71 @@
+"""
+Unit tests for the tiered analysis cascade.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.content_categories import Category, Severity
+
+REFERENCE = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+FILLER = " слово" * 150
+
+
+def _script(*texts):
+    # Each paragraph is long enough to become its own block
+    return {
+        "paragraph_details": [
+            {"page": 1, "paragraph_index": i, "text": text + FILLER} for i, text in enumerate(texts)
+        ]
+    }
+
+
+async def _run(manager, script):
+    manager._analyses["a1"] = AnalysisState({"status": "processing"})
+    await manager._run_analysis("a1", script, {}, None)
+    return manager._analyses["a1"].snapshot
+
+
+SCRIPT = _script(
+    "Герои пьют чай на кухне",  # clean
+    "Начинается драка во дворе",  # flagged, moderate violence
+    "Разговор о насилии в школе",  # borderline: criteria wording only
+    "Короткий спор у подъезда",  # flagged, mild violence
+)
+
+
+@pytest.mark.asyncio
+async def test_cascade_retrieves_only_flagged_and_borderline_blocks(make_knowledge_base):
+    knowledge_base = make_knowledge_base([REFERENCE])
+    state = await _run(AnalysisManager(knowledge_base, MagicMock()), SCRIPT)
+
+    queried = [text for call in knowledge_base.query_many.await_args_list for text in call.args[0]]
+    assert len(queried) == 3 and not any(text.startswith("Герои") for text in queried)
+    assert [a["assessment_tier"] for a in state["scene_assessments"]] == [
+        "rules", "retrieval", "retrieval", "retrieval",
+    ]
+    assert state["scene_assessments"][0]["references"] == []
+    assert state["processing_stats"]["tier_counts"] == {"rules": 1, "retrieval": 3, "classifier": 0}
+
+
+@pytest.mark.asyncio
+async def test_classifier_runs_only_for_low_confidence_blocks(make_knowledge_base):
+    classifier = AsyncMock(return_value={Category.VIOLENCE: Severity.MODERATE})
+    manager = AnalysisManager(make_knowledge_base([REFERENCE]), MagicMock(), block_classifier=classifier)
+    state = await _run(manager, SCRIPT)
+
+    classified = [call.args[0].split(" слово")[0] for call in classifier.await_args_list]
+    assert sorted(classified) == ["Короткий спор у подъезда", "Разговор о насилии в школе"]
+    assert state["scene_assessments"][2]["categories"][Category.VIOLENCE] == Severity.MODERATE
+    assert state["processing_stats"]["tier_counts"] == {"rules": 1, "retrieval": 1, "classifier": 2}
+
+
+@pytest.mark.asyncio
+async def test_without_cascade_every_block_is_retrieved(make_knowledge_base):
+    knowledge_base = make_knowledge_base([REFERENCE])
+    manager = AnalysisManager(knowledge_base, MagicMock(), cascade=False)
+    state = await _run(manager, SCRIPT)
+
+    assert sum(len(call.args[0]) for call in knowledge_base.query_many.await_args_list) == 4
+    assert state["processing_stats"]["tier_counts"]["retrieval"] == 4
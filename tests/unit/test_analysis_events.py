@@ -0,0 +1,120 @@
+"""
+Unit tests for pushed analysis progress events.
+"""
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_jobs import InMemoryJobStore
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.presentation.api.main import create_app
+from app.presentation.api.routes import analysis as analysis_routes
+
+
+def _assessment(number):
+    return {
+        "scene_number": number,
+        "heading": f"Сцена {number}",
+        "page_range": "1",
+        "categories": {},
+        "age_rating": "0+",
+        "text": "текст",
+    }
+
+
+def _manager():
+    manager = AnalysisManager(MagicMock(), MagicMock())
+    manager._analyses["a1"] = AnalysisState({"analysis_id": "a1", "status": "processing", "progress": 0.0})
+    return manager
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_each_block_once_then_final_status():
+    manager = _manager()
+    events = []
+
+    async def consume():
+        async for event in manager.stream_events("a1"):
+            events.append(event)
+
+    consumer = asyncio.create_task(consume())
+    await asyncio.sleep(0)
+    for number in (1, 2):
+        await manager._update_state("a1", {"scene_assessments": _assessment(number), "progress": number * 50.0})
+        await asyncio.sleep(0)
+    # Updates published while the consumer is busy are coalesced, not lost
+    await manager._update_state("a1", {"scene_assessments": _assessment(3), "progress": 90.0})
+    await manager._update_state("a1", {"status": "completed", "progress": 100.0})
+    await asyncio.wait_for(consumer, timeout=1)
+
+    blocks = [event["index"] for event in events if event["event"] == "block"]
+    assert blocks == [0, 1, 2]
+    assert events[-1]["event"] == "status" and events[-1]["snapshot"]["status"] == "completed"
+    progress = [event["progress"] for event in events if event["event"] == "progress"]
+    assert progress == sorted(progress) and progress[-1] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_after_since_block():
+    manager = _manager()
+    for number in (1, 2, 3):
+        await manager._update_state("a1", {"scene_assessments": _assessment(number)})
+    await manager._update_state("a1", {"status": "completed", "progress": 100.0})
+
+    events = [event async for event in manager.stream_events("a1", since_block=2)]
+
+    assert [event["index"] for event in events if event["event"] == "block"] == [2]
+
+
+@pytest.mark.asyncio
+async def test_stream_follows_analysis_taken_over_by_another_worker():
+    store = InMemoryJobStore()
+    manager = AnalysisManager(MagicMock(), MagicMock(), job_store=store, worker_id="w1", poll_interval=0.01)
+    state = {"analysis_id": "a1", "status": "processing", "progress": 0.0}
+    await store.create("a1", state, {}, owner="w1", lease_seconds=-1)
+    manager._analyses["a1"] = AnalysisState(state)
+
+    consumer = asyncio.create_task(_collect(manager.stream_events("a1")))
+    await asyncio.sleep(0)
+    await store.claim("w2")  # the lease expired and another worker resumed it
+    await manager._update_state("a1", {"progress": 50.0})
+    assert "a1" not in manager._analyses
+
+    await store.checkpoint("a1", {"status": "completed", "progress": 100.0}, "w2",
+                           block_index=0, assessment=_assessment(1))
+    events = await asyncio.wait_for(consumer, timeout=1)
+
+    assert [event["index"] for event in events if event["event"] == "block"] == [0]
+    assert events[-1]["event"] == "status" and events[-1]["snapshot"]["status"] == "completed"
+
+
+def test_sse_endpoint_streams_delta_events(monkeypatch):
+    manager = _manager()
+    state = manager._analyses["a1"]
+    state.publish({"scene_assessments": _assessment(1), "progress": 50.0})
+    state.publish({"scene_assessments": _assessment(2), "status": "completed", "progress": 100.0})
+
+    async def get_manager():
+        return manager
+
+    monkeypatch.setattr(analysis_routes, "get_analysis_manager", get_manager)
+    client = TestClient(create_app())
+
+    response = client.get("/api/analysis/a1/events", headers={"Last-Event-ID": "0"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    names = [line.split(": ", 1)[1] for frame in frames for line in frame.splitlines() if line.startswith("event:")]
+    assert names == ["block", "progress", "status"]
+    block = json.loads(frames[0].splitlines()[-1][len("data: "):])
+    assert block["index"] == 1 and block["assessment"]["scene_number"] == 2
+    assert client.get("/api/analysis/missing/events").status_code == 404
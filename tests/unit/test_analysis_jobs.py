@@ -0,0 +1,375 @@
+"""
+Unit tests for persistent analysis jobs, checkpoints and resumable workers.
+"""
+import asyncio
+
+import pytest
+from redis.exceptions import WatchError
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_jobs import (
+    InMemoryJobStore,
+    RedisJobStore,
+    SqliteJobStore,
+    create_job_store,
+)
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_scheduler import AnalysisScheduler
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.content_categories import AgeRating, Category
+
+REFERENCE = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+FILLER = " слово" * 150
+SCRIPT = {
+    "paragraph_details": [
+        {"page": 1, "paragraph_index": i, "text": text + FILLER}
+        for i, text in enumerate([
+            "Герои пьют чай на кухне",
+            "Начинается драка во дворе",
+            "Разговор на лестнице",
+            "Короткий спор у подъезда",
+        ])
+    ]
+}
+STATE = {"analysis_id": "a1", "document_id": "d1", "options": {}, "status": "processing", "progress": 0.0}
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of redis.asyncio used by RedisJobStore."""
+
+    def __init__(self):
+        self.data = {}
+        # Write count per key, for WATCH
+        self.versions = {}
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        self._touch(key)
+        entries = self.data.setdefault(key, {})
+        entries.update(mapping or {})
+        if field is not None:
+            entries[field] = value
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def set(self, key, value):
+        self._touch(key)
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._touch(key)
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    async def rpush(self, key, value):
+        self._touch(key)
+        self.data.setdefault(key, []).append(value)
+
+    async def lpop(self, key):
+        self._touch(key)
+        items = self.data.get(key)
+        return items.pop(0) if items else None
+
+    async def zadd(self, key, mapping):
+        self._touch(key)
+        self.data.setdefault(key, {}).update(mapping)
+
+    async def zrem(self, key, member):
+        self._touch(key)
+        return int(self.data.get(key, {}).pop(member, None) is not None)
+
+    async def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted(
+            (score, member) for member, score in self.data.get(key, {}).items()
+            if (low == "-inf" or score >= low) and score <= high
+        )
+        members = [member for _, member in members][start:]
+        return members[:num] if num is not None else members
+
+
+class FakePipeline:
+    """WATCH/MULTI/EXEC over FakeRedis: EXEC fails if a watched key was written."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._watched = {}
+        self._queued = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._watched, self._queued = {}, None
+
+    async def watch(self, *keys):
+        self._watched = {key: self._redis.versions.get(key, 0) for key in keys}
+
+    async def unwatch(self):
+        self._watched = {}
+
+    async def get(self, key):
+        return await self._redis.get(key)
+
+    async def exists(self, key):
+        return await self._redis.exists(key)
+
+    def multi(self):
+        self._queued = []
+
+    def __getattr__(self, name):
+        command = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._queued.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        watched, queued = self._watched, self._queued
+        self._watched, self._queued = {}, None
+        if any(self._redis.versions.get(key, 0) != version for key, version in watched.items()):
+            raise WatchError("Watched variable changed.")
+        return [await command(*args, **kwargs) for command, args, kwargs in queued]
+
+
+def _store(backend, tmp_path):
+    if backend == "sqlite":
+        return SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    if backend == "redis":
+        return RedisJobStore(FakeRedis())
+    return InMemoryJobStore()
+
+
+@pytest.fixture
+def knowledge_base_factory(make_knowledge_base):
+    """Knowledge bases whose lookups stop at ``stall_after`` until ``gate`` is set."""
+
+    def make(gate=None, stall_after=None):
+        knowledge_base = make_knowledge_base()
+        queried = []
+
+        async def query_many(texts, **kwargs):
+            if stall_after is not None and len(queried) >= stall_after:
+                await gate.wait()
+            queried.extend(texts)
+            return [[REFERENCE] for _ in texts]
+
+        knowledge_base.query_many.side_effect = query_many
+        knowledge_base.queried = queried
+        return knowledge_base
+
+    return make
+
+
+def _manager(knowledge_base, store, worker_id, lease_seconds=60.0):
+    return AnalysisManager(
+        knowledge_base,
+        MagicMock(),
+        reference_batch_size=1,
+        assessment_concurrency=1,
+        cascade=False,
+        job_store=store,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds,
+    )
+
+
+async def _wait_for_blocks(store, analysis_id, count):
+    for _ in range(200):
+        state = await store.load(analysis_id)
+        if len(state["scene_assessments"]) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"analysis {analysis_id} did not reach {count} blocks")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite", "redis"])
+async def test_job_store_leases_checkpoints_and_fencing(backend, tmp_path):
+    store = _store(backend, tmp_path)
+    await store.create("a1", STATE, SCRIPT)
+
+    job = await store.claim("w1", lease_seconds=-1)
+    assert job.analysis_id == "a1" and job.script_payload == SCRIPT and job.assessments == []
+    assert await store.checkpoint("a1", {"progress": 25.0}, "w1", lease_seconds=-1,
+                                  block_index=0, assessment={"scene_number": 1})
+
+    # The lease expired: another worker takes over from the checkpoint
+    job = await store.claim("w2")
+    assert job.assessments == [{"scene_number": 1}] and job.state["progress"] == 25.0
+    assert await store.claim("w3") is None
+    assert not await store.checkpoint("a1", {"progress": 50.0}, "w1")
+    assert not await store.renew("a1", "w1")
+    assert await store.renew("a1", "w2")
+
+    await store.request_cancel("a1")
+    assert await store.is_cancel_requested("a1")
+    assert await store.checkpoint("a1", {"status": "completed"}, "w2")
+
+    state = await store.load("a1")
+    assert state["status"] == "cancelled" and state["progress"] == 25.0
+    assert await store.claim("w3", lease_seconds=-1) is None
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_checkpoint_is_dropped_when_lease_moves_during_check():
+    redis = FakeRedis()
+    store = RedisJobStore(redis)
+    await store.create("a1", STATE, SCRIPT, owner="w1")
+    owner_key = "analysis:owner:a1"
+    read_owner = redis.get
+
+    async def get_then_take_over(key):
+        value = await read_owner(key)
+        if key == owner_key and value == "w1":
+            await redis.set(owner_key, "w2")  # another worker claims right after the check
+        return value
+
+    redis.get = get_then_take_over
+    assert not await store.checkpoint("a1", {"progress": 50.0}, "w1",
+                                      block_index=0, assessment={"scene_number": 1})
+
+    state = await store.load("a1")
+    assert state["progress"] == 0.0 and state["scene_assessments"] == []
+
+
+@pytest.mark.asyncio
+async def test_crashed_worker_is_resumed_from_last_checkpoint(tmp_path, knowledge_base_factory):
+    path = str(tmp_path / "jobs.sqlite3")
+    store_a, store_b = SqliteJobStore(path), SqliteJobStore(path)
+    await store_a.create("a1", STATE, SCRIPT, owner="worker-a", lease_seconds=0.05)
+
+    crashed_kb = knowledge_base_factory(gate=asyncio.Event(), stall_after=2)
+    worker_a = _manager(crashed_kb, store_a, "worker-a", lease_seconds=0.05)
+    worker_a._analyses["a1"] = AnalysisState(STATE)
+    task = asyncio.create_task(worker_a._run_analysis("a1", SCRIPT, {}, None))
+    await _wait_for_blocks(store_b, "a1", 2)
+    task.cancel()  # the worker process dies mid-analysis
+    await asyncio.sleep(0.1)
+
+    resumed_kb = knowledge_base_factory()
+    worker_b = _manager(resumed_kb, store_b, "worker-b")
+    job = await store_b.claim("worker-b")
+    await worker_b._resume(job)
+
+    status = await worker_b.get_status("a1")
+    assert status["status"] == "completed"
+    assert [a["scene_number"] for a in status["scene_assessments"]] == [1, 2, 3, 4]
+    assert all(text.startswith(("Разговор", "Короткий")) for text in resumed_kb.queried)
+    assert len(resumed_kb.queried) == 2
+    assert status["scene_assessments"][1]["categories"][Category.VIOLENCE].value != "none"
+    assert status["rating_result"]["final_rating"] != AgeRating.ZERO_PLUS
+    assert status["processing_stats"]["tier_counts"]["retrieval"] == 4
+
+    stored = await store_a.load("a1")
+    assert stored["status"] == "completed" and len(stored["scene_assessments"]) == 4
+    await store_a.close()
+    await store_b.close()
+
+
+@pytest.mark.asyncio
+async def test_status_and_cancel_work_from_another_worker(
+    tmp_path, knowledge_base_factory, make_script_store,
+):
+    store = SqliteJobStore(str(tmp_path / "jobs.sqlite3"))
+    gate = asyncio.Event()
+    worker_a = _manager(knowledge_base_factory(gate=gate, stall_after=1), store, "worker-a")
+    worker_a._script_store = make_script_store(SCRIPT)
+    api_b = _manager(knowledge_base_factory(), store, "worker-b")
+
+    started = await worker_a.start_analysis("d1", {}, None)
+    analysis_id = started["analysis_id"]
+    await _wait_for_blocks(store, analysis_id, 1)
+
+    status = await api_b.get_status(analysis_id)
+    assert status["status"] == "processing" and len(status["scene_assessments"]) == 1
+
+    await api_b.cancel_analysis(analysis_id)
+    gate.set()
+    for _ in range(100):
+        if (await worker_a.get_status(analysis_id))["status"] == "cancelled":
+            break
+        await asyncio.sleep(0.01)
+
+    assert (await worker_a.get_status(analysis_id))["status"] == "cancelled"
+    assert (await api_b.get_status(analysis_id))["status"] == "cancelled"
+    assert len((await store.load(analysis_id))["scene_assessments"]) < len(SCRIPT["paragraph_details"])
+    with pytest.raises(KeyError):
+        await api_b.get_status("missing")
+    await store.close()
+
+
+def test_create_job_store_rejects_unknown_backend():
+    assert create_job_store("memory") is None
+    with pytest.raises(ValueError):
+        create_job_store("sqlite")
+    with pytest.raises(ValueError):
+        create_job_store("kafka")
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_queued_job_leased(knowledge_base_factory, make_script_store):
+    store = InMemoryJobStore()
+    gate = asyncio.Event()
+    worker = _manager(knowledge_base_factory(gate=gate, stall_after=0), store, "worker-a", lease_seconds=0.06)
+    worker._scheduler = AnalysisScheduler(max_concurrent=1)
+    worker._script_store = make_script_store(SCRIPT)
+
+    await worker.start_analysis("d1", {}, None)
+    queued = await worker.start_analysis("d2", {}, None)
+    assert queued["status"] == "queued"
+
+    await asyncio.sleep(0.2)  # several leases long, without a single checkpoint
+    assert await store.claim("worker-b") is None
+
+    gate.set()
+    for _ in range(100):
+        if (await worker.get_status(queued["analysis_id"]))["status"] == "completed":
+            break
+        await asyncio.sleep(0.01)
+    assert (await worker.get_status(queued["analysis_id"]))["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_api_only_process_reports_queued_until_claimed(make_script_store):
+    api = AnalysisManager(
+        MagicMock(), make_script_store(SCRIPT), job_store=InMemoryJobStore(), run_locally=False,
+    )
+
+    started = await api.start_analysis("d1", {}, None)
+
+    assert started["status"] == "queued"
+    assert (await api.get_status(started["analysis_id"]))["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_cancel_during_checkpoint_is_not_overwritten(knowledge_base_factory):
+    class CancelDuringCheckpoint(InMemoryJobStore):
+        async def checkpoint(self, analysis_id, fields, *args, **kwargs):
+            if fields.get("status") == "completed":
+                await manager.cancel_analysis(analysis_id)
+            return await super().checkpoint(analysis_id, fields, *args, **kwargs)
+
+    store = CancelDuringCheckpoint()
+    manager = _manager(knowledge_base_factory(), store, "worker-a")
+    await store.create("a1", STATE, SCRIPT, owner="worker-a")
+    manager._analyses["a1"] = AnalysisState(STATE)
+
+    await manager._update_state("a1", {"status": "completed", "progress": 100.0})
+
+    assert (await manager.get_status("a1"))["status"] == "cancelled"
+    assert (await store.load("a1"))["status"] == "cancelled"
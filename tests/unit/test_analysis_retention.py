@@ -0,0 +1,142 @@
+"""
+Unit tests for bounded in-memory analysis state and the on-disk archive.
+"""
+import asyncio
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_archive import AnalysisArchive
+from app.infrastructure.services.analysis_jobs import InMemoryJobStore
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.content_categories import AgeRating, Category, Severity
+from app.presentation.api.main import create_app
+from app.presentation.api.routes import analysis as analysis_routes
+
+SCRIPT = {"paragraph_details": [{"page": 1, "paragraph_index": 0, "text": "Начинается драка во дворе"}]}
+
+
+def _finished_state():
+    state = AnalysisState({"analysis_id": "a1", "document_id": "d1", "status": "completed", "progress": 100.0})
+    state.publish({"scene_assessments": {
+        "scene_number": 1,
+        "heading": "Драка",
+        "page_range": "1",
+        "age_rating": AgeRating.TWELVE_PLUS,
+        "categories": {Category.VIOLENCE: Severity.MODERATE},
+        "text": "Начинается драка во дворе",
+        "text_preview": "Начинается драка во дворе",
+    }})
+    return state
+
+
+@pytest.fixture
+def make_manager(tmp_path, make_knowledge_base, make_script_store):
+    def make(**kwargs):
+        return AnalysisManager(
+            make_knowledge_base(), make_script_store(SCRIPT), archive=AnalysisArchive(str(tmp_path)), **kwargs,
+        )
+
+    return make
+
+
+async def _wait_until_finished(manager, analysis_id):
+    for _ in range(100):
+        if (await manager.get_status(analysis_id))["status"] == "completed":
+            await asyncio.sleep(0.01)  # let the run archive it
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"analysis {analysis_id} did not finish")
+
+
+@pytest.mark.asyncio
+async def test_archive_round_trip_is_compact(tmp_path):
+    archive = AnalysisArchive(str(tmp_path))
+    await archive.save("a1", _finished_state().snapshot)
+
+    with gzip.open(tmp_path / "a1.json.gz", "rb") as handle:
+        stored = json.loads(handle.read())
+    assert "text_preview" not in stored["scene_assessments"][0]
+
+    loaded = await archive.load("a1")
+    assert loaded["status"] == "completed"
+    assert loaded["scene_assessments"][0]["categories"] == {"violence": "moderate"}
+    assert loaded["scene_assessments"][0]["text_preview"] == "Начинается драка во дворе"
+    assert await archive.load("missing") is None
+    assert await archive.load("../a1") is None
+    assert archive.stats()["archived_analyses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_finished_analyses_beyond_retention_are_served_from_archive(make_manager):
+    manager = make_manager(retained_analyses=1)
+
+    first = (await manager.start_analysis("d1", {}, None))["analysis_id"]
+    await _wait_until_finished(manager, first)
+    second = (await manager.start_analysis("d2", {}, None))["analysis_id"]
+    await _wait_until_finished(manager, second)
+
+    assert first not in manager._analyses and second in manager._analyses
+    archived = await manager.get_status(first)
+    assert archived["status"] == "completed" and len(archived["scene_assessments"]) == 1
+
+    stats = manager.memory_stats()
+    assert stats["active_analyses"] == 0 and stats["retained_analyses"] == 1
+    assert stats["archived_analyses"] == 2 and stats["retained_json_bytes"] > 0
+
+
+@pytest.mark.asyncio
+async def test_expired_analyses_leave_memory(make_manager):
+    job_store = InMemoryJobStore()
+    manager = make_manager(retention_seconds=0, job_store=job_store)
+
+    analysis_id = (await manager.start_analysis("d1", {}, None))["analysis_id"]
+    await _wait_until_finished(manager, analysis_id)
+
+    assert manager._analyses == {}
+    assert job_store.memory_stats() == {"stored_jobs": 0, "stored_blocks": 0}
+    assert (await manager.get_status(analysis_id))["status"] == "completed"
+
+
+def test_results_endpoint_loads_archived_analysis(monkeypatch, tmp_path):
+    archive = AnalysisArchive(str(tmp_path))
+    asyncio.run(archive.save("a1", _finished_state().snapshot))
+    manager = AnalysisManager(MagicMock(), MagicMock(), archive=archive)
+
+    async def get_manager():
+        return manager
+
+    monkeypatch.setattr(analysis_routes, "get_analysis_manager", get_manager)
+    data = TestClient(create_app()).get("/api/analysis/a1").json()
+
+    assert data["status"] == "completed"
+    assert data["scene_assessments"][0]["categories"] == {"violence": "moderate"}
+    assert data["scene_assessments"][0]["text_preview"] == "Начинается драка во дворе"
+
+
+@pytest.mark.asyncio
+async def test_default_wiring_keeps_no_copy_of_evicted_analyses(monkeypatch, tmp_path, make_knowledge_base):
+    from app.infrastructure.services import runtime_context
+
+    monkeypatch.setattr(runtime_context, "_knowledge_base", make_knowledge_base())
+    monkeypatch.setattr(runtime_context, "_analysis_manager", None)
+    monkeypatch.setattr(runtime_context.settings, "analysis_archive_dir", str(tmp_path))
+    monkeypatch.setattr(runtime_context.settings, "analysis_retained", 1)
+    await runtime_context.script_store.save_script("d1", SCRIPT)
+
+    manager = await runtime_context.get_analysis_manager()
+    analysis_ids = []
+    for _ in range(3):
+        analysis_ids.append((await manager.start_analysis("d1", {}, None))["analysis_id"])
+        await _wait_until_finished(manager, analysis_ids[-1])
+
+    assert list(manager._analyses) == analysis_ids[-1:]
+    stats = manager.memory_stats()
+    assert stats.get("stored_jobs", 0) == 0
+    assert stats["retained_analyses"] == 1 and stats["archived_analyses"] == 3
+    assert (await manager.get_status(analysis_ids[0]))["status"] == "completed"
+    await runtime_context.script_store.delete_script("d1")
@@ -0,0 +1,111 @@
+"""
+Unit tests for analysis admission control and fair scheduling.
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_scheduler import AnalysisScheduler, SchedulerOverloaded
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.presentation.api.main import create_app
+from app.presentation.api.routes import analysis as analysis_routes
+
+SCRIPT = {"paragraph_details": [{"page": 1, "paragraph_index": 0, "text": "Начинается драка во дворе"}]}
+
+
+@pytest.mark.asyncio
+async def test_queued_analyses_are_served_round_robin_per_client():
+    scheduler = AnalysisScheduler(max_concurrent=1)
+    assert scheduler.submit("running", "a").result() is True
+    admitted = {aid: scheduler.submit(aid, "a") for aid in ("a1", "a2", "a3")}
+    admitted["b1"] = scheduler.submit("b1", "b")
+
+    assert scheduler.queue_positions() == {"a1": 1, "b1": 2, "a2": 3, "a3": 4}
+
+    scheduler.release("running")
+    assert admitted["a1"].result() is True and not admitted["b1"].done()
+    assert scheduler.queue_positions() == {"b1": 1, "a2": 2, "a3": 3}
+    assert scheduler.estimate_wait(2) is not None
+
+    scheduler.release("a1")
+    assert admitted["b1"].result() is True
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_and_withdrawn_analysis_never_runs():
+    scheduler = AnalysisScheduler(max_concurrent=1, max_queued=1)
+    scheduler.submit("running", "a")
+    queued = scheduler.submit("queued", "b")
+
+    with pytest.raises(SchedulerOverloaded) as excinfo:
+        scheduler.submit("rejected", "c")
+    assert excinfo.value.retry_after > 0
+
+    assert scheduler.withdraw("queued")
+    assert queued.result() is False
+    assert scheduler.queue_positions() == {}
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_hold_bulk_blocks():
+    scheduler = AnalysisScheduler()
+
+    async with scheduler.interactive():
+        bulk = asyncio.create_task(scheduler.yield_to_interactive())
+        await asyncio.sleep(0.01)
+        assert not bulk.done()
+
+    await asyncio.wait_for(bulk, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_manager_queues_beyond_concurrency_cap(make_knowledge_base, make_script_store):
+    gate = asyncio.Event()
+    knowledge_base = make_knowledge_base()
+
+    async def query_many(texts, **kwargs):
+        await gate.wait()
+        return [[] for _ in texts]
+
+    knowledge_base.query_many.side_effect = query_many
+    manager = AnalysisManager(
+        knowledge_base, make_script_store(SCRIPT), scheduler=AnalysisScheduler(max_concurrent=1),
+    )
+
+    first = await manager.start_analysis("d1", {}, None, client_id="a")
+    second = await manager.start_analysis("d2", {}, None, client_id="b")
+    assert first["status"] == "processing"
+    assert second["status"] == "queued" and second["queue_position"] == 1
+
+    gate.set()
+    for _ in range(100):
+        if (await manager.get_status(second["analysis_id"]))["status"] == "completed":
+            break
+        await asyncio.sleep(0.01)
+
+    assert (await manager.get_status(first["analysis_id"]))["status"] == "completed"
+    second_state = await manager.get_status(second["analysis_id"])
+    assert second_state["status"] == "completed" and second_state["queue_position"] is None
+
+
+def test_status_reports_queue_position_and_wait(monkeypatch):
+    manager = AnalysisManager(MagicMock(), MagicMock())
+    manager._analyses["a1"] = AnalysisState({
+        "analysis_id": "a1",
+        "status": "queued",
+        "progress": 0.0,
+        "queue_position": 3,
+        "estimated_time_remaining": 42.5,
+    })
+
+    async def get_manager():
+        return manager
+
+    monkeypatch.setattr(analysis_routes, "get_analysis_manager", get_manager)
+    data = TestClient(create_app()).get("/api/analysis/status/a1").json()
+
+    assert data["status"] == "queued"
+    assert data["queue_position"] == 3 and data["estimated_time_remaining"] == 42
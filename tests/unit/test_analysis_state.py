@@ -0,0 +1,48 @@
+"""
+Unit tests for per-analysis state snapshots in AnalysisManager.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+
+
+def test_published_snapshots_are_immutable_and_stable():
+    state = AnalysisState({"analysis_id": "a1", "status": "processing", "progress": 0.0})
+    first = state.snapshot
+
+    state.publish({"scene_assessments": {"scene_number": 1}, "progress": 50.0})
+    second = state.snapshot
+    state.publish({"scene_assessments": {"scene_number": 2}, "progress": 100.0})
+
+    assert first["progress"] == 0.0 and list(first["scene_assessments"]) == []
+    assert second["progress"] == 50.0 and second["scene_assessments"] == [{"scene_number": 1}]
+    assert state.snapshot["scene_assessments"][-1] == {"scene_number": 2}
+    assert state.snapshot["scene_assessments"][:1] == [{"scene_number": 1}]
+    with pytest.raises(TypeError):
+        second["status"] = "failed"
+
+
+@pytest.mark.asyncio
+async def test_status_polling_returns_snapshots_and_cancel_sticks():
+    script_store = MagicMock()
+    script_store.get_script = AsyncMock(return_value={"paragraph_details": []})
+    manager = AnalysisManager(MagicMock(), script_store)
+    manager._run_analysis = AsyncMock()
+
+    started = await manager.start_analysis("doc1", {}, None)
+    analysis_id = started["analysis_id"]
+    assert await manager.get_status(analysis_id) is started
+
+    await manager.cancel_analysis(analysis_id)
+    assert await manager._is_cancelled(analysis_id)
+
+    # A worker finishing after the cancel request cannot overwrite it
+    await manager._update_state(analysis_id, {"status": "completed", "progress": 100.0})
+    status = await manager.get_status(analysis_id)
+    assert status["status"] == "cancelled"
+    assert started["status"] == "processing"
+
+    with pytest.raises(KeyError):
+        await manager.get_status("missing")
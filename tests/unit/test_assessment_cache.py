@@ -0,0 +1,113 @@
+"""
+Unit tests for incremental re-analysis through the block assessment cache.
+"""
+import pytest
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.assessment_cache import BlockAssessmentCache, block_fingerprint
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+
+REFERENCE = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+FILLER = " слово" * 150
+
+
+def _draft(*texts):
+    # Each paragraph is long enough to become its own block
+    return {
+        "paragraph_details": [
+            {"page": i + 1, "paragraph_index": i, "text": text + FILLER} for i, text in enumerate(texts)
+        ]
+    }
+
+
+async def _analyze(manager, analysis_id, script, criteria_document_id=None):
+    manager._analyses[analysis_id] = AnalysisState({"status": "processing"})
+    await manager._run_analysis(analysis_id, script, {}, criteria_document_id)
+    return manager._analyses[analysis_id].snapshot
+
+
+def test_fingerprint_ignores_case_and_spacing_but_not_versions():
+    key = block_fingerprint("Начинается  драка\n", "criteria-1", "1")
+
+    assert key == block_fingerprint("начинается драка", "criteria-1", "1")
+    assert key != block_fingerprint("начинается драка", "criteria-2", "1")
+    assert key != block_fingerprint("начинается драка", "criteria-1", "2")
+
+
+def test_cache_evicts_least_recently_used():
+    cache = BlockAssessmentCache(max_entries=2)
+    assessment = {"age_rating": "0+", "categories": {}, "llm_comment": "", "references": [], "assessment_tier": "rules"}
+    cache.put("a", assessment)
+    cache.put("b", assessment)
+    cache.get("a")
+    cache.put("c", assessment)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+@pytest.mark.asyncio
+async def test_revised_draft_recomputes_only_changed_blocks(make_knowledge_base):
+    knowledge_base = make_knowledge_base([REFERENCE])
+    manager = AnalysisManager(knowledge_base, MagicMock())
+
+    await _analyze(manager, "draft1", _draft("Начинается драка", "Пьяный спор", "Кровь на полу"))
+    knowledge_base.query_many.reset_mock()
+
+    # Second draft inserts a scene and edits another
+    state = await _analyze(manager, "draft2", _draft(
+        "Начинается драка", "Новая сцена: угроза", "Пьяный спор", "Кровь на полу и труп",
+    ))
+
+    queried = [text for call in knowledge_base.query_many.await_args_list for text in call.args[0]]
+    assert [text.split(" слово")[0] for text in queried] == ["Новая сцена: угроза", "Кровь на полу и труп"]
+    assessments = state["scene_assessments"]
+    assert [a["reused"] for a in assessments] == [True, False, True, False]
+    assert assessments[2]["scene_number"] == 3 and assessments[2]["page_range"] == "3"
+    assert assessments[2]["references"] == [REFERENCE]
+    assert state["processing_stats"]["blocks_reused"] == 2
+
+    # New criteria invalidate every cached assessment
+    knowledge_base.corpus_version.return_value = "v2"
+    state = await _analyze(manager, "draft3", _draft("Начинается драка"))
+    assert state["processing_stats"]["blocks_reused"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scoped_analysis_is_invalidated_by_changes_outside_its_criteria(make_knowledge_base):
+    versions = {"criteria": "c1", None: "corpus1"}
+    knowledge_base = make_knowledge_base()
+    knowledge_base.corpus_version.side_effect = lambda document_id=None: versions[document_id]
+    # Nothing matches in the criteria document, so every block falls back to the whole base
+    knowledge_base.query_many.side_effect = (
+        lambda texts, filters=None, **kwargs: [[] if filters else [REFERENCE] for _ in texts]
+    )
+    manager = AnalysisManager(knowledge_base, MagicMock())
+    script = _draft("Начинается драка")
+
+    await _analyze(manager, "draft1", script, "criteria")
+    state = await _analyze(manager, "draft2", script, "criteria")
+    assert state["processing_stats"]["blocks_reused"] == 1
+
+    # Another document changed what the fallback finds
+    versions[None] = "corpus2"
+    state = await _analyze(manager, "draft3", script, "criteria")
+    assert state["processing_stats"]["blocks_reused"] == 0
+    assert (await _analyze(manager, "draft4", script, None))["processing_stats"]["blocks_reused"] == 0
+
+
+@pytest.mark.asyncio
+async def test_corpus_version_follows_document_content():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY)
+    paragraphs = [{"text": "Сцены насилия", "page": 1, "paragraph_index": 1}]
+    await kb.ingest_document("doc1", "ФЗ-436", paragraphs)
+    version = kb.corpus_version("doc1")
+
+    await kb.ingest_document("doc1", "ФЗ-436", paragraphs)
+    assert kb.corpus_version("doc1") == version
+
+    await kb.ingest_document("doc1", "ФЗ-436", [{**paragraphs[0], "text": "Сцены жестокости"}])
+    assert kb.corpus_version("doc1") != version
+    assert kb.corpus_version() != kb.corpus_version("missing")
@@ -0,0 +1,51 @@
+"""
+Unit tests for near-duplicate block detection and reference reuse.
+"""
+import pytest
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.block_fingerprint import NearDuplicateIndex
+
+TRANSITION = (
+    "ИНТ. КВАРТИРА — НОЧЬ. Иван входит в комнату, драка начинается снова, "
+    "соседи кричат за стеной, свет мигает, дверь хлопает"
+)
+
+
+def test_near_duplicates_map_to_first_block():
+    index = NearDuplicateIndex(threshold=0.8)
+
+    assert index.find_or_add(1, TRANSITION) is None
+    assert index.find_or_add(2, TRANSITION.upper() + "!") == 1
+    assert index.find_or_add(3, "Совершенно другой текст про погоду и прогулку в парке") is None
+    assert len(index) == 2
+
+
+@pytest.mark.asyncio
+async def test_analysis_reuses_references_of_repeated_blocks(make_knowledge_base):
+    reference = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+    knowledge_base = make_knowledge_base([reference])
+    manager = AnalysisManager(knowledge_base, MagicMock(), reference_batch_size=2)
+    manager._analyses["a1"] = AnalysisState({"status": "processing"})
+
+    # Each paragraph becomes its own block
+    filler = " слово" * 150
+    paragraphs = [
+        {"page": 1, "paragraph_index": i, "text": TRANSITION + filler} for i in range(4)
+    ]
+    await manager._run_analysis("a1", {"paragraph_details": paragraphs}, {}, None)
+
+    state = manager._analyses["a1"].snapshot
+    assert state["status"] == "completed"
+    assert [a["references"] for a in state["scene_assessments"]] == [[reference]] * 4
+    assert sum(len(call.args[0]) for call in knowledge_base.query_many.await_args_list) == 1
+    assert state["processing_stats"] == {
+        "blocks_total": 4,
+        "reference_lookups": 1,
+        "references_reused": 3,
+        "reuse_rate": 0.75,
+        "tier_counts": {"rules": 0, "retrieval": 4, "classifier": 0},
+        "blocks_reused": 0,
+    }
@@ -0,0 +1,57 @@
+"""
+Unit tests for the category-partitioned criteria index.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.content_categories import Category, category_mask, tag_categories
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+
+
+def _paragraphs(*texts):
+    return [{"text": text, "page": 1, "paragraph_index": i + 1} for i, text in enumerate(texts)]
+
+
+def test_criteria_chunks_are_tagged_from_keywords():
+    assert tag_categories("Запрещены сцены насилия и жестокости") == ["violence"]
+    assert set(tag_categories("Употребление алкоголя и табака")) == {"alcohol_drugs"}
+    assert tag_categories("Общие положения закона") == []
+    assert category_mask(["violence", "unknown"]) == category_mask([Category.VIOLENCE.value])
+
+
+@pytest.mark.asyncio
+async def test_category_filter_searches_only_tagged_chunks():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY)
+    await kb.ingest_document("doc1", "ФЗ-436", _paragraphs(
+        "Информационная продукция со сценами насилия",
+        "Информационная продукция об употреблении алкоголя",
+    ))
+
+    results = await kb.query(
+        "информационная продукция", top_k=2, filters={"categories": ["alcohol_drugs"]},
+    )
+
+    assert [r["excerpt"] for r in results] == ["Информационная продукция об употреблении алкоголя"]
+    assert results[0]["metadata"]["categories"] == ["alcohol_drugs"]
+
+
+@pytest.mark.asyncio
+async def test_clean_blocks_skip_retrieval():
+    knowledge_base = MagicMock()
+    knowledge_base.query_many = AsyncMock(
+        side_effect=lambda texts, **kwargs: [[{"document_id": "doc1"}] for _ in texts]
+    )
+    manager = AnalysisManager(knowledge_base, MagicMock())
+
+    references = await manager._fetch_references(
+        ["Герои пьют чай", "Начинается драка", "Снова драка"],
+        None,
+        [[], [Category.VIOLENCE], [Category.VIOLENCE]],
+    )
+
+    assert references == [[], [{"document_id": "doc1"}], [{"document_id": "doc1"}]]
+    knowledge_base.query_many.assert_awaited_once()
+    call = knowledge_base.query_many.await_args
+    assert call.args[0] == ["Начинается драка", "Снова драка"]
+    assert call.kwargs["filters"] == {"categories": ["violence"]}
@@ -0,0 +1,65 @@
+"""
+Unit tests for the columnar knowledge entry store.
+"""
+import numpy as np
+import pytest
+
+from app.infrastructure.services.entry_store import EntryColumns
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+
+
+def test_rows_round_trip_through_columns():
+    columns = EntryColumns.from_paragraphs("doc1", "ФЗ-436", [
+        {"text": " Сцены насилия ", "page": 2, "paragraph_index": 5, "section": "ст. 5"},
+        {"text": "   "},
+        {"text": "Употребление алкоголя", "page": 3, "paragraph_index": 1},
+    ])
+
+    assert len(columns) == 2
+    first, last = columns[0], columns[-1]
+    assert (first.document_id, first.document_title) == ("doc1", "ФЗ-436")
+    assert (first.page, first.paragraph, first.text) == (2, 5, "Сцены насилия")
+    assert first.metadata == {"section": "ст. 5"}
+    assert (last.text, last.metadata) == ("Употребление алкоголя", {})
+    assert list(columns.iter_texts()) == ["Сцены насилия", "Употребление алкоголя"]
+
+    # Entry ids are stable across row lookups
+    assert columns[0].entry_id == columns.entry_ids()[0] != columns[1].entry_id
+    with pytest.raises(IndexError):
+        columns[2]
+
+
+def test_categories_are_kept_as_row_tags():
+    columns = EntryColumns.from_paragraphs("doc1", "ФЗ-436", [
+        {"text": "Сцены насилия", "categories": ["violence"], "document_id": "doc1", "paragraph": 1},
+        {"text": "Употребление алкоголя", "categories": ["alcohol_drugs", "violence"]},
+        {"text": "Вступление"},
+    ])
+
+    assert columns.row_tags.dtype == np.uint32
+    assert [entry.categories for entry in columns] == [
+        ["violence"], ["violence", "alcohol_drugs"], [],
+    ]
+    # Neither categories nor document-level fields are stored per row
+    assert [entry.metadata for entry in columns] == [{}, {}, {}]
+
+    with_section = EntryColumns.from_paragraphs("doc1", "ФЗ-436", [
+        {"text": "Сцены насилия", "section": "ст. 5"},
+    ])
+    assert with_section.nbytes > EntryColumns.from_paragraphs("doc1", "ФЗ-436", [
+        {"text": "Сцены насилия"},
+    ]).nbytes
+
+
+@pytest.mark.asyncio
+async def test_knowledge_base_exposes_row_views():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY, enable_caching=False)
+    await kb.ingest_document("doc1", "ФЗ-436", [
+        {"text": "Сцены насилия", "page": 4, "paragraph_index": 2},
+    ])
+
+    results = await kb.query("сцены насилия", top_k=1)
+
+    assert results[0]["title"] == "ФЗ-436"
+    assert (results[0]["page"], results[0]["paragraph"]) == (4, 2)
+    assert [entry.text for entry in kb.get_entries()] == ["Сцены насилия"]
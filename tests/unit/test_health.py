@@ -2,6 +2,7 @@
 Tests for health check endpoints.
 """
 import pytest
+from unittest.mock import AsyncMock, MagicMock
 from fastapi.testclient import TestClient
 
 from app.presentation.api.main import create_app
@@ -29,4 +30,24 @@ def test_readiness_check(client):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] == "ready"
-    assert "version" in data
\ No newline at end of file
+    assert "version" in data
+
+
+def test_health_check_reports_process_memory(client):
+    """Test health check endpoint reports the memory used by the process."""
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    memory = response.json()["memory"]
+    assert (memory.get("rss_bytes") or memory.get("peak_rss_bytes")) > 0
+
+
+def test_readiness_waits_for_knowledge_base_warm_start(client, monkeypatch):
+    """Test readiness check reports 503 until the warm start has finished."""
+    from app.presentation.api.routes import health
+
+    kb = MagicMock(is_ready=False)
+    monkeypatch.setattr(health, "get_knowledge_base", AsyncMock(return_value=kb))
+    assert client.get("/api/health/ready").status_code == 503
+
+    kb.is_ready = True
+    assert client.get("/api/health/ready").json()["status"] == "ready"
@@ -0,0 +1,69 @@
+"""
+Unit tests for concurrent vector and lexical retrieval in AUTO routing.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGSearchResult
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+
+
+def _rag_result(score):
+    return RAGSearchResult(
+        document_id="p1",
+        text="Сцены насилия",
+        score=score,
+        metadata={"document_id": "vector-doc", "page": 1},
+    )
+
+
+async def _make_kb(search, **kwargs):
+    orchestrator = MagicMock()
+    orchestrator.search = search
+    orchestrator.index_documents_batch = AsyncMock()
+    kb = KnowledgeBase(
+        rag_orchestrator=orchestrator,
+        search_strategy=SearchStrategy.AUTO,
+        enable_caching=False,
+        **kwargs,
+    )
+    kb._rag_enabled = True
+    await kb.ingest_document("lexical-doc", "ФЗ-436", [{"text": "сцены насилия", "paragraph_index": 1}])
+    return kb
+
+
+@pytest.mark.asyncio
+async def test_vector_deadline_miss_returns_lexical_results():
+    async def slow_search(**kwargs):
+        await asyncio.sleep(5)
+        return [_rag_result(0.99)]
+
+    kb = await _make_kb(slow_search, vector_deadline_seconds=0.05)
+
+    results = await asyncio.wait_for(kb.query("сцены насилия", top_k=1), timeout=1)
+
+    assert [r["document_id"] for r in results] == ["lexical-doc"]
+    assert kb.get_search_metrics()["vector_deadline_misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_fuses_legs_without_repeating_vector_search():
+    search = AsyncMock(return_value=[_rag_result(0.3)])
+    kb = await _make_kb(search)
+
+    results = await kb.query("сцены насилия", top_k=2)
+
+    assert {r["document_id"] for r in results} == {"vector-doc", "lexical-doc"}
+    search.assert_awaited_once()
+    assert kb.get_search_metrics()["hybrid_searches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_confident_vector_results_win():
+    kb = await _make_kb(AsyncMock(return_value=[_rag_result(0.95)]))
+
+    results = await kb.query("сцены насилия", top_k=1)
+
+    assert [r["document_id"] for r in results] == ["vector-doc"]
@@ -0,0 +1,197 @@
+"""
+Unit tests for coarse-to-fine hierarchical retrieval.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGDocument, RAGOrchestrator
+from app.infrastructure.services.embedding_service import EmbeddingResult
+from app.infrastructure.services.vector_database_service import VectorDatabaseService
+
+VECTORS = {
+    "насилие": [1.0, 0.0, 0.0],
+    "жестокость": [0.9, 0.1, 0.0],
+    "алкоголь": [0.0, 1.0, 0.0],
+    "табак": [0.1, 0.9, 0.0],
+}
+
+
+def _embedding(text):
+    return EmbeddingResult(
+        text=text,
+        embedding=VECTORS.get(text.split()[0], [0.0, 0.0, 1.0]),
+        model="test-model",
+        provider="mock",
+    )
+
+
+def _make_service(name):
+    return VectorDatabaseService(
+        qdrant_url=None,
+        collection_name=name,
+        vector_size=3,
+        enable_tfidf_fallback=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_is_scoped_to_selected_sections():
+    embedding_service = MagicMock()
+    embedding_service.initialize = AsyncMock()
+    embedding_service.close = AsyncMock()
+    embedding_service.health_check = AsyncMock(return_value={"status": "healthy"})
+    embedding_service.get_metrics = MagicMock(return_value={})
+    embedding_service.embed_text = AsyncMock(side_effect=_embedding)
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [_embedding(text) for text in texts]
+    )
+
+    orchestrator = RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=_make_service("paragraphs"),
+        coarse_vector_db_service=_make_service("paragraphs_sections"),
+        coarse_top_k=1,
+        enable_query_expansion=False,
+        enable_result_reranking=False,
+    )
+    await orchestrator.initialize()
+
+    documents = [
+        RAGDocument(
+            id=f"00000000-0000-0000-0000-00000000000{i}",
+            text=text,
+            metadata={"document_id": document_id, "paragraph_index": i},
+        )
+        for i, (document_id, text) in enumerate([
+            ("violence", "насилие в кадре"),
+            ("violence", "жестокость героев"),
+            ("substances", "алкоголь на экране"),
+            ("substances", "табак и курение"),
+        ])
+    ]
+    await orchestrator.index_documents_batch(documents)
+
+    results = await orchestrator.search("насилие", top_k=4)
+
+    assert results
+    assert {r.metadata["document_id"] for r in results} == {"violence"}
+    assert all(r.metadata["section_id"] == "violence:0" for r in results)
+
+    metrics = await orchestrator.get_metrics()
+    assert metrics.hierarchical_searches == 1
+    assert metrics.candidates_pruned == 2
+
+    await orchestrator.delete_documents([documents[2].id, documents[3].id])
+    assert "substances:0" not in orchestrator._section_sizes
+
+    await orchestrator.close()
+
+
+@pytest.mark.asyncio
+async def test_sections_survive_a_restart():
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(side_effect=_embedding)
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [_embedding(text) for text in texts]
+    )
+    paragraphs, sections = _make_service("paragraphs"), _make_service("paragraphs_sections")
+    await paragraphs.initialize()
+    await sections.initialize()
+
+    def orchestrator():
+        return RAGOrchestrator(
+            embedding_service=embedding_service,
+            vector_db_service=paragraphs,
+            coarse_vector_db_service=sections,
+            coarse_top_k=1,
+            enable_query_expansion=False,
+            enable_result_reranking=False,
+        )
+
+    def paragraph(i, document_id, text):
+        return RAGDocument(
+            id=f"00000000-0000-0000-0000-00000000000{i}",
+            text=text,
+            metadata={"document_id": document_id, "paragraph_index": i},
+        )
+
+    await orchestrator().index_documents_batch([
+        paragraph(0, "violence", "насилие в кадре"),
+        paragraph(1, "substances", "алкоголь на экране"),
+    ])
+
+    # A new process scopes searches before it has indexed anything
+    restarted = orchestrator()
+    results = await restarted.search("насилие", top_k=2)
+    assert {r.metadata["document_id"] for r in results} == {"violence"}
+    assert restarted._metrics["hierarchical_searches"] == 1
+    assert restarted._metrics["candidates_pruned"] == 1
+
+    # Sections of other documents are not counted as pruned
+    await restarted.search("насилие", top_k=2, filter_metadata={"document_id": "violence"})
+    assert restarted._metrics["candidates_pruned"] == 1
+
+    # and folds new paragraphs into the stored sums instead of replacing them
+    await restarted.index_document(paragraph(2, "violence", "жестокость героев"))
+    stored = {
+        point.payload["section_id"]: point.payload
+        async for page in sections.scroll_payloads() for point in page
+    }
+    assert stored["violence:0"]["paragraph_count"] == 2
+    assert stored["violence:0"]["vector_sum"] == pytest.approx([1.9, 0.1, 0.0])
+
+    # Paragraphs seen by the warm start can be removed from their sections
+    restarted = orchestrator()
+    async for _ in restarted.iter_indexed_documents():
+        pass
+    await restarted.delete_documents([paragraph(1, "substances", "").id])
+    assert [
+        point.payload["section_id"] async for page in sections.scroll_payloads() for point in page
+    ] == ["violence:0"]
+
+
+@pytest.mark.asyncio
+async def test_category_filter_selects_sections_with_matching_paragraphs():
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(side_effect=_embedding)
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [_embedding(text) for text in texts]
+    )
+    paragraphs, sections = _make_service("paragraphs"), _make_service("paragraphs_sections")
+    await paragraphs.initialize()
+    await sections.initialize()
+    orchestrator = RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=paragraphs,
+        coarse_vector_db_service=sections,
+        coarse_top_k=1,
+        enable_query_expansion=False,
+        enable_result_reranking=False,
+    )
+
+    await orchestrator.index_documents_batch([
+        RAGDocument(
+            id=f"00000000-0000-0000-0000-00000000000{i}",
+            text=text,
+            metadata={"document_id": document_id, "paragraph_index": i, "categories": categories},
+        )
+        for i, (document_id, text, categories) in enumerate([
+            ("violence", "насилие в кадре", ["violence"]),
+            ("substances", "алкоголь на экране", ["alcohol_drugs"]),
+            ("substances", "табак и курение", ["alcohol_drugs", "smoking"]),
+        ])
+    ])
+    stored = {
+        point.payload["section_id"]: point.payload["categories"]
+        async for page in sections.scroll_payloads() for point in page
+    }
+    assert stored["substances:0"] == ["alcohol_drugs", "smoking"]
+
+    # The closest section has no paragraph in the category; the coarse search skips it
+    results = await orchestrator.search(
+        "насилие", top_k=2, filter_metadata={"categories": ["alcohol_drugs"]},
+    )
+    assert {r.metadata["document_id"] for r in results} == {"substances"}
+    assert all(r.metadata["section_id"] == "substances:0" for r in results)
+    assert orchestrator._metrics["hierarchical_searches"] == 1
+    assert orchestrator._metrics["candidates_pruned"] == 0
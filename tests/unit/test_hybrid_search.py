@@ -0,0 +1,105 @@
+"""
+Unit tests for sparse+dense hybrid retrieval.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGOrchestrator
+from app.infrastructure.services.embedding_service import EmbeddingResult
+from app.infrastructure.services.sparse_encoder import BM25SparseEncoder
+from app.infrastructure.services.text_tokenizer import term_id
+from app.infrastructure.services.vector_database_service import (
+    VectorDatabaseService,
+    VectorSearchResult,
+)
+
+
+def test_encode_document_saturates_term_frequency():
+    encoder = BM25SparseEncoder(avg_doc_length=4)
+
+    vector = encoder.encode_document("кровь кровь кровь насилие")
+
+    weights = dict(zip(vector.indices, vector.values))
+    assert weights[term_id("кровь")] > weights[term_id("насилие")]
+    assert weights[term_id("кровь")] < 3 * weights[term_id("насилие")]
+    assert vector.indices == sorted(vector.indices)
+
+
+def test_encode_query_is_binary_and_deduplicated():
+    encoder = BM25SparseEncoder()
+
+    vector = encoder.encode_query("Статья 5 статья")
+
+    assert len(vector.indices) == 2
+    assert vector.values == [1.0, 1.0]
+    assert encoder.encode_query("   ").is_empty()
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_retrieves_lexical_only_match():
+    """A document far away in embedding space is found through the sparse leg."""
+    service = VectorDatabaseService(
+        qdrant_url=None,
+        collection_name="hybrid_test",
+        vector_size=3,
+        enable_tfidf_fallback=False,
+    )
+    await service.initialize()
+    encoder = BM25SparseEncoder()
+
+    texts = {
+        "00000000-0000-0000-0000-000000000001": ("общие положения закона", [1.0, 0.0, 0.0]),
+        "00000000-0000-0000-0000-000000000002": ("информационная продукция 18+", [0.0, 1.0, 0.0]),
+        "00000000-0000-0000-0000-000000000003": ("классификация продукции", [0.0, 0.0, 1.0]),
+    }
+    await service.upsert_documents([
+        {
+            "id": doc_id,
+            "vector": vector,
+            "sparse_vector": encoder.encode_document(text).to_dict(),
+            "payload": {"text": text},
+        }
+        for doc_id, (text, vector) in texts.items()
+    ])
+
+    dense_only = await service.search(query_vector=[1.0, 0.0, 0.0], limit=1)
+    hybrid = await service.hybrid_search(
+        query_vector=[1.0, 0.0, 0.0],
+        sparse_vector=encoder.encode_query("информационная продукция").to_dict(),
+        limit=3,
+        prefetch_limit=1,
+    )
+
+    assert [r.id for r in dense_only] == ["00000000-0000-0000-0000-000000000001"]
+    assert "00000000-0000-0000-0000-000000000002" in {r.id for r in hybrid}
+    assert service.get_metrics()["hybrid_searches"] == 1
+
+    await service.close()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_hybrid_search_uses_single_fused_request():
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(return_value=EmbeddingResult(
+        text="query", embedding=[0.1] * 3, model="test-model", provider="mock",
+    ))
+    vector_db_service = MagicMock()
+    vector_db_service.hybrid_search = AsyncMock(return_value=[
+        VectorSearchResult(id="doc1", score=0.5, payload={"text": "Статья 5", "page": 1}),
+    ])
+    vector_db_service.search = AsyncMock()
+
+    orchestrator = RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=vector_db_service,
+    )
+
+    results = await orchestrator.hybrid_search("статья 5", top_k=3)
+
+    assert [r.document_id for r in results] == ["doc1"]
+    assert results[0].metadata["fusion"] == "rrf"
+    vector_db_service.hybrid_search.assert_awaited_once()
+    vector_db_service.search.assert_not_called()
+    call = vector_db_service.hybrid_search.await_args.kwargs
+    assert call["limit"] == 3
+    assert call["sparse_vector"]["indices"]
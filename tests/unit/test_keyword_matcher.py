@@ -0,0 +1,84 @@
+"""
+Unit tests for the Aho–Corasick keyword matcher and category detection.
+"""
+import random
+
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services import content_categories
+from app.infrastructure.services.content_categories import (
+    CATEGORY_KEYWORDS,
+    CRITERIA_KEYWORDS,
+    SEVERITY_ORDER,
+    Category,
+    reload_category_keywords,
+    tag_categories,
+)
+from app.infrastructure.services.keyword_matcher import KeywordAutomaton
+
+
+def _find_loop_detection(text):
+    """Category detection as done with one str.find per keyword."""
+    lowered = text.lower()
+    result = {}
+    for category, severity_map in CATEGORY_KEYWORDS.items():
+        for severity in reversed(SEVERITY_ORDER[1:]):
+            matches, span = [], None
+            for keyword in severity_map.get(severity, []):
+                idx = lowered.find(keyword)
+                if idx != -1:
+                    matches.append(keyword)
+                    if span is None or len(keyword) > span[1] - span[0]:
+                        span = (idx, idx + len(keyword))
+            if matches:
+                result[category] = (severity, sorted(set(matches)), span)
+                break
+    return result
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = KeywordAutomaton([("pronoun", ["he", "she", "his"]), ("other", ["hers", "he"])])
+
+    matches = [(m.start, m.keyword, m.labels) for m in automaton.find_all("uSHErs")]
+
+    assert matches == [
+        (1, "she", ("pronoun",)),
+        (2, "he", ("pronoun", "other")),
+        (2, "hers", ("other",)),
+    ]
+
+
+def test_category_automata_are_compiled_once_and_reloaded_on_demand():
+    compiled = content_categories._TAGGING_AUTOMATON
+    assert tag_categories("драка") == ["violence"]
+    assert content_categories._TAGGING_AUTOMATON is compiled
+
+    CRITERIA_KEYWORDS[Category.LANGUAGE].append("абырвалг")
+    try:
+        assert tag_categories("абырвалг") == []
+        reload_category_keywords()
+        assert tag_categories("абырвалг") == ["language"]
+    finally:
+        CRITERIA_KEYWORDS[Category.LANGUAGE].remove("абырвалг")
+        reload_category_keywords()
+
+
+def test_detection_matches_find_loop_semantics():
+    manager = AnalysisManager(MagicMock(), MagicMock())
+    stems = [k for severity_map in CATEGORY_KEYWORDS.values() for ks in severity_map.values() for k in ks]
+    words = stems + ["герой", "идёт", "домой", "МАТЕМАТИКА", "Кровать", "паника"]
+    rng = random.Random(7)
+
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 12)))
+        categories, flagged, highlights = manager._detect_categories(text)
+        expected = _find_loop_detection(text)
+
+        assert {c: s for c, s in categories.items() if s.value != "none"} == {
+            c: severity for c, (severity, _, _) in expected.items()
+        }
+        assert [(h["start"], h["end"]) for h in highlights] == [span for _, _, span in expected.values()]
+        assert len(flagged) == len(expected)
+        for line, (category, (_, keywords, _)) in zip(flagged, expected.items()):
+            assert line.endswith(", ".join(keywords))
@@ -0,0 +1,83 @@
+"""
+Unit tests for the sharded lexical index of the knowledge base.
+"""
+import pytest
+
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+from app.infrastructure.services.lexical_index import ShardedLexicalIndex
+
+
+def _paragraphs(*texts):
+    return [{"text": text, "page": 1, "paragraph_index": i + 1} for i, text in enumerate(texts)]
+
+
+def test_publish_touches_only_own_shard():
+    index = ShardedLexicalIndex(n_features=2 ** 12)
+    first = index.build_shard("doc1", ["a", "b"], ["сцены насилия", "употребление алкоголя"])
+    second = index.build_shard("doc2", ["c"], ["нецензурная брань"])
+
+    index.publish(first)
+    before = index.snapshot()
+    index.publish(second)
+    after = index.snapshot()
+
+    assert after.shards["doc1"] is first
+    assert after.total_rows == 3
+    assert after.generation == before.generation + 1
+    # Published snapshots are immutable
+    assert before.total_rows == 2 and "doc2" not in before.shards
+
+    index.remove("doc1")
+    assert index.snapshot().total_rows == 1
+    assert index.snapshot().document_frequency.sum() == pytest.approx(
+        second.df_counts.sum()
+    )
+
+
+def test_top_k_ranks_across_shards():
+    index = ShardedLexicalIndex(n_features=2 ** 12)
+    index.publish(index.build_shard("doc1", ["a", "b"], ["сцены насилия", "алкоголь"]))
+    index.publish(index.build_shard("doc2", ["c", "d"], ["насилия нет", "сцены насилия и крови"]))
+
+    ranked = index.top_k(index.snapshot(), "сцены насилия", top_k=2)
+
+    assert [entry for entry, _ in ranked] == ["a", "d"]
+    assert ranked[0][1] >= ranked[1][1] > 0
+    assert index.top_k(index.snapshot(), "погода", top_k=2) == []
+
+
+def test_top_k_many_returns_only_matching_rows_per_query():
+    index = ShardedLexicalIndex(n_features=2 ** 12)
+    index.publish(index.build_shard("doc1", ["a", "b"], ["сцены насилия", "алкоголь"], [1, 2]))
+    index.publish(index.build_shard("doc2", ["c", "d"], ["табак и курение", "алкоголь и табак"], [2, 2]))
+
+    ranked = index.top_k_many(
+        index.snapshot(), ["алкоголь", "табак", "погода", "насилия"], top_k=3, tag_mask=2,
+    )
+
+    assert [{entry for entry, _ in hits} for hits in ranked] == [{"b", "d"}, {"c", "d"}, set(), set()]
+    assert all(score > 0 for hits in ranked for _, score in hits)
+
+
+@pytest.mark.asyncio
+async def test_knowledge_base_queries_merge_shards():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY, enable_caching=False)
+    await kb.ingest_document("doc1", "ФЗ-436", _paragraphs(
+        "Информационная продукция, содержащая сцены насилия",
+        "Изображение употребления алкоголя",
+    ))
+    await kb.ingest_document("doc2", "Рекомендации", _paragraphs(
+        "Нецензурная брань запрещена для детей",
+    ))
+
+    results = await kb.query("нецензурная брань", top_k=1)
+    assert results[0]["document_id"] == "doc2"
+    assert results[0]["title"] == "Рекомендации"
+
+    # Re-ingest replaces only the document's own shard
+    await kb.ingest_document("doc1", "ФЗ-436", _paragraphs("Сцены насилия"))
+    stats = {s["document_id"]: s["paragraphs_indexed"] for s in await kb.get_document_stats()}
+    assert stats == {"doc1": 1, "doc2": 1}
+
+    await kb.remove_document("doc2")
+    assert await kb.query("нецензурная брань", top_k=1) == []
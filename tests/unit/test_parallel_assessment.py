@@ -0,0 +1,94 @@
+"""
+Unit tests for bounded-parallel block assessment in AnalysisManager.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+
+
+def _paragraphs(count):
+    # Each paragraph is long enough to become its own block
+    filler = " слово" * 150
+    return [
+        {"page": 1, "paragraph_index": i, "text": f"Сцена {i}: начинается драка номер {i}{filler}"}
+        for i in range(count)
+    ]
+
+
+class _SlowKnowledgeBase:
+    """Knowledge base stub that records how many lookups overlap."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def corpus_version(self, document_id=None):
+        return "v1"
+
+    async def query_many(self, texts, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        reference = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+        return [[reference] for _ in texts]
+
+
+def _manager(knowledge_base, concurrency):
+    manager = AnalysisManager(
+        knowledge_base,
+        MagicMock(),
+        reference_batch_size=1,
+        assessment_concurrency=concurrency,
+    )
+    manager._analyses["a1"] = AnalysisState({"status": "processing"})
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_blocks_are_assessed_concurrently_and_published_in_order():
+    knowledge_base = _SlowKnowledgeBase()
+    manager = _manager(knowledge_base, concurrency=3)
+    progress = []
+    update_state = manager._update_state
+
+    async def record_progress(analysis_id, updates):
+        if "progress" in updates:
+            progress.append(updates["progress"])
+        await update_state(analysis_id, updates)
+
+    manager._update_state = record_progress
+    await manager._run_analysis("a1", {"paragraph_details": _paragraphs(8)}, {}, None)
+
+    state = manager._analyses["a1"].snapshot
+    assert state["status"] == "completed"
+    assert 1 < knowledge_base.max_in_flight <= 3
+    assert [a["scene_number"] for a in state["scene_assessments"]] == list(range(1, 9))
+    assert progress == sorted(progress) and progress[-1] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_cancellation_stops_outstanding_windows():
+    knowledge_base = _SlowKnowledgeBase()
+    manager = _manager(knowledge_base, concurrency=2)
+
+    async def cancel_after_two_blocks(analysis_id):
+        return len(manager._analyses[analysis_id].snapshot.get("scene_assessments") or []) >= 2
+
+    manager._is_cancelled = cancel_after_two_blocks
+    await manager._run_analysis("a1", {"paragraph_details": _paragraphs(8)}, {}, None)
+    await asyncio.sleep(0.05)
+
+    state = manager._analyses["a1"].snapshot
+    assert state["status"] == "cancelled"
+    assert len(state["scene_assessments"]) == 2
+    # Progress reflects the published blocks only
+    assert state["progress"] == 25.0
+    assert knowledge_base.in_flight == 0
@@ -0,0 +1,57 @@
+"""
+Unit tests for the knowledge base query result cache.
+"""
+import pytest
+
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+from app.infrastructure.services.query_cache import QueryResultCache, estimate_result_bytes
+
+
+def _result(text):
+    return [{"document_id": "doc", "excerpt": text, "score": 1.0, "metadata": {}}]
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = QueryResultCache(max_entries=2)
+    cache.put("a", _result("a"))
+    cache.put("b", _result("b"))
+    assert cache.get("a") is not None
+
+    cache.put("c", _result("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_byte_budget_bounds_cache_size():
+    size = estimate_result_bytes(_result("x" * 1000))
+    cache = QueryResultCache(max_entries=100, max_bytes=size * 2)
+
+    for key in range(5):
+        cache.put(key, _result("x" * 1000))
+
+    assert len(cache) == 2
+    assert cache.size_bytes <= size * 2
+    cache.clear()
+    assert cache.size_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_ingest_invalidates_cached_queries():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY)
+    await kb.ingest_document("doc1", "ФЗ-436", [{"text": "сцены насилия", "paragraph_index": 1}])
+
+    first = await kb.query("сцены насилия", top_k=1)
+    assert await kb.query("сцены насилия", top_k=1) is first
+    assert kb.get_search_metrics()["cache_hits"] == 1
+
+    # top_k is part of the key
+    assert len(await kb.query("сцены насилия", top_k=2)) == 1
+    assert kb.get_search_metrics()["cache_hits"] == 1
+
+    await kb.ingest_document("doc2", "Рекомендации", [{"text": "сцены насилия", "paragraph_index": 1}])
+    refreshed = await kb.query("сцены насилия", top_k=2)
+
+    assert {r["document_id"] for r in refreshed} == {"doc1", "doc2"}
+    assert kb.get_search_metrics()["cache_hits"] == 1
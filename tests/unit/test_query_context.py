@@ -0,0 +1,89 @@
+"""
+Unit tests for per-request query embedding and result memoization.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGOrchestrator
+from app.infrastructure.services.embedding_service import EmbeddingResult
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+from app.infrastructure.services.query_context import RAGQueryContext
+from app.infrastructure.services.vector_database_service import VectorSearchResult
+
+
+def _make_orchestrator():
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(return_value=EmbeddingResult(
+        text="query", embedding=[0.1] * 3, model="test-model", provider="mock",
+    ))
+    vector_db_service = MagicMock()
+    vector_db_service.search = AsyncMock(return_value=[
+        # Below the confidence threshold, so AUTO routing falls through to hybrid
+        VectorSearchResult(id="p1", score=0.3, payload={
+            "text": "Сцены насилия", "document_id": "doc1", "page": 1,
+        }),
+    ])
+    return RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=vector_db_service,
+        enable_query_expansion=False,
+    )
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_routing_embeds_query_once():
+    orchestrator = _make_orchestrator()
+    kb = KnowledgeBase(rag_orchestrator=orchestrator, search_strategy=SearchStrategy.AUTO)
+    kb._rag_enabled = True
+
+    results = await kb.query("сцены насилия", top_k=2)
+
+    assert results and results[0]["document_id"] == "doc1"
+    orchestrator.embedding_service.embed_text.assert_awaited_once()
+    orchestrator.vector_db_service.search.assert_awaited_once()
+    metrics = kb.get_search_metrics()
+    assert metrics["hybrid_searches"] == 1
+    assert metrics["encoder_calls_per_query"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_context_shares_in_flight_work_and_retries_failures():
+    context = RAGQueryContext()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return "embedding"
+
+    first, second = await asyncio.gather(
+        context.embed("q", compute), context.embed("q", compute),
+    )
+    assert first == second == "embedding"
+    assert len(calls) == 1
+    assert context.encoder_calls == 1 and context.embedding_hits == 1
+
+    async def failing():
+        raise RuntimeError("encoder down")
+
+    with pytest.raises(RuntimeError):
+        await context.search("key", failing)
+    assert await context.search("key", AsyncMock(return_value=[])) == []
+
+
+@pytest.mark.asyncio
+async def test_short_embedding_batch_fails_instead_of_hanging():
+    context = RAGQueryContext()
+
+    async def short_batch(texts):
+        return ["embedding"] * (len(texts) - 1)
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(context.embed_many(["a", "b"], short_batch), timeout=1)
+
+    async def full_batch(texts):
+        return [f"embedding {text}" for text in texts]
+
+    assert await context.embed_many(["a", "b"], full_batch) == ["embedding a", "embedding b"]
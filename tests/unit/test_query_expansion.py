@@ -0,0 +1,113 @@
+"""
+Unit tests for corpus-driven query expansion.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGDocument, RAGOrchestrator
+from app.infrastructure.services.embedding_service import EmbeddingResult
+from app.infrastructure.services.query_expansion import CooccurrenceQueryExpander
+from app.infrastructure.services.vector_database_service import VectorSearchResult
+
+CORPUS = [
+    "Запрещено изображение насилия и жестокости",
+    "Сцены насилия и жестокости допускаются с маркировкой 18+",
+    "Употребление алкоголя запрещено показывать детям",
+]
+
+
+def _embedding(text):
+    return EmbeddingResult(text=text, embedding=[0.1] * 3, model="test-model", provider="mock")
+
+
+def test_expander_uses_corpus_cooccurrence_and_caches():
+    expander = CooccurrenceQueryExpander(min_cooccurrence=2)
+    expander.add_documents(CORPUS)
+
+    variants = expander.expand("насилие")
+
+    assert variants[0] == "насилие жестокости"
+    assert expander.expand("насилие") == variants
+    assert expander.expand("погода") == []
+
+    generation = expander.generation
+    expander.add_documents(["жестокость и насилие в кадре"])
+    assert expander.generation == generation + 1
+
+
+def test_removed_documents_leave_statistics_and_cache():
+    expander = CooccurrenceQueryExpander(min_cooccurrence=1)
+    expander.add_documents(CORPUS)
+    assert "насилие жестокости" in expander.expand("насилие")
+
+    expander.remove_documents(CORPUS[:2])
+
+    assert expander.expand("насилие") == []
+    expander.remove_documents(CORPUS[2:])
+    assert expander.vocabulary_size == 0 and expander._cooccurrence == {}
+
+
+def _make_orchestrator(top_score):
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(side_effect=_embedding)
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [_embedding(text) for text in texts]
+    )
+    vector_db_service = MagicMock()
+    vector_db_service.upsert_documents = AsyncMock(return_value=["p1", "p2", "p3"])
+    vector_db_service.search = AsyncMock(return_value=[
+        VectorSearchResult(id="p1", score=top_score, payload={"text": CORPUS[0]}),
+    ])
+    orchestrator = RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=vector_db_service,
+        query_expander=CooccurrenceQueryExpander(min_cooccurrence=1),
+        enable_result_reranking=False,
+    )
+    return orchestrator
+
+
+@pytest.mark.asyncio
+async def test_low_confidence_search_embeds_variants_in_one_batch():
+    orchestrator = _make_orchestrator(top_score=0.2)
+    await orchestrator.index_documents_batch([
+        RAGDocument(id=f"p{i}", text=text, metadata={}) for i, text in enumerate(CORPUS)
+    ])
+    orchestrator.embedding_service.embed_batch.reset_mock()
+
+    await orchestrator.search("насилие", top_k=2)
+
+    orchestrator.embedding_service.embed_text.assert_awaited_once_with("насилие")
+    orchestrator.embedding_service.embed_batch.assert_awaited_once()
+    variants = orchestrator.embedding_service.embed_batch.await_args.args[0]
+    assert 1 <= len(variants) <= orchestrator.max_query_expansions
+    assert all(v.startswith("насилие ") for v in variants)
+
+
+@pytest.mark.asyncio
+async def test_confident_first_pass_skips_expansion():
+    orchestrator = _make_orchestrator(top_score=0.95)
+    await orchestrator.index_documents_batch([
+        RAGDocument(id=f"p{i}", text=text, metadata={}) for i, text in enumerate(CORPUS)
+    ])
+    orchestrator.embedding_service.embed_batch.reset_mock()
+
+    await orchestrator.search("насилие", top_k=2)
+
+    orchestrator.embedding_service.embed_batch.assert_not_called()
+    orchestrator.vector_db_service.search.assert_awaited_once()
+    assert orchestrator._metrics["expansions_skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deleting_documents_updates_expansions():
+    orchestrator = _make_orchestrator(top_score=0.2)
+    orchestrator.vector_db_service.delete_documents = AsyncMock(return_value=True)
+    await orchestrator.index_documents_batch([
+        RAGDocument(id=f"p{i}", text=text, metadata={}) for i, text in enumerate(CORPUS)
+    ])
+    assert orchestrator.query_expander.expand("насилие")
+
+    await orchestrator.delete_documents(["p0", "p1"], CORPUS[:2])
+
+    assert orchestrator.query_expander.expand("насилие") == []
@@ -0,0 +1,82 @@
+"""
+Unit tests for batched reference lookup.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGOrchestrator
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+from app.infrastructure.services.query_context import RAGQueryContext
+from app.infrastructure.services.vector_database_service import VectorSearchResult
+
+
+def _paragraphs(*texts):
+    return [{"text": text, "page": 1, "paragraph_index": i + 1} for i, text in enumerate(texts)]
+
+
+def _make_orchestrator():
+    embedding_service = MagicMock()
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [MagicMock(embedding=[0.1, 0.2]) for _ in texts]
+    )
+    vector_db_service = MagicMock()
+    vector_db_service.search_batch = AsyncMock(
+        side_effect=lambda query_vectors, **kwargs: [
+            [VectorSearchResult(id=f"p{i}", score=0.9, payload={"text": "Сцены насилия"})]
+            for i in range(len(query_vectors))
+        ]
+    )
+    return RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=vector_db_service,
+    ), embedding_service, vector_db_service
+
+
+@pytest.mark.asyncio
+async def test_search_many_uses_one_embedding_batch_and_one_search():
+    orchestrator, embedding_service, vector_db_service = _make_orchestrator()
+    context = RAGQueryContext()
+
+    result_sets = await orchestrator.search_many(
+        ["сцены насилия", "алкоголь", "брань"], top_k=1, context=context,
+    )
+
+    assert len(result_sets) == 3
+    assert all(len(results) == 1 for results in result_sets)
+    embedding_service.embed_batch.assert_awaited_once()
+    vector_db_service.search_batch.assert_awaited_once()
+    assert context.encoder_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_query_many_returns_aligned_results():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY)
+    await kb.ingest_document("doc1", "ФЗ-436", _paragraphs("Сцены насилия и крови"))
+    await kb.ingest_document("doc2", "Рекомендации", _paragraphs("Нецензурная брань"))
+
+    results = await kb.query_many(["нецензурная брань", "погода", "сцены насилия"], top_k=1)
+
+    assert [r[0]["document_id"] if r else None for r in results] == ["doc2", None, "doc1"]
+    assert results[0] == await kb.query("нецензурная брань", top_k=1)
+
+    scoped = await kb.query_many(["сцены насилия"], top_k=1, filters={"document_id": "doc2"})
+    assert scoped == [[]]
+
+
+@pytest.mark.asyncio
+async def test_analysis_fetches_references_in_batches(make_knowledge_base):
+    reference = {"document_id": "doc1", "title": "ФЗ-436", "page": 1, "paragraph": 1}
+    knowledge_base = make_knowledge_base([reference])
+    knowledge_base.query = AsyncMock(return_value=[])
+    manager = AnalysisManager(knowledge_base, MagicMock(), reference_batch_size=2)
+    manager._analyses["a1"] = AnalysisState({"status": "processing"})
+
+    paragraphs = [{"page": 1, "paragraph_index": i, "text": " ".join(f"драка{i}x{j}" for j in range(100))} for i in range(5)]
+    await manager._run_analysis("a1", {"paragraph_details": paragraphs}, {}, None)
+
+    assert manager._analyses["a1"].snapshot["status"] == "completed"
+    assert len(manager._analyses["a1"].snapshot["scene_assessments"]) == 5
+    assert knowledge_base.query_many.await_count == 3
+    knowledge_base.query.assert_not_awaited()
@@ -0,0 +1,59 @@
+"""
+Unit tests for criteria-scoped knowledge base retrieval.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGSearchResult
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+
+
+def _paragraphs(*texts):
+    return [{"text": text, "page": 1, "paragraph_index": i + 1} for i, text in enumerate(texts)]
+
+
+@pytest.mark.asyncio
+async def test_document_filter_selects_lexical_shards():
+    kb = KnowledgeBase(search_strategy=SearchStrategy.TFIDF_ONLY)
+    await kb.ingest_document("doc1", "ФЗ-436", _paragraphs("Сцены насилия и жестокости"))
+    await kb.ingest_document("doc2", "Рекомендации", _paragraphs("Сцены насилия допустимы в историческом контексте"))
+
+    unscoped = await kb.query("сцены насилия", top_k=1)
+    scoped = await kb.query("сцены насилия", top_k=1, filters={"document_id": "doc2"})
+
+    assert unscoped[0]["document_id"] == "doc1"
+    assert [r["document_id"] for r in scoped] == ["doc2"]
+    assert await kb.query("сцены насилия", filters={"document_id": "missing"}) == []
+
+
+@pytest.mark.asyncio
+async def test_document_filter_reaches_vector_search():
+    orchestrator = MagicMock()
+    orchestrator.search = AsyncMock(return_value=[
+        RAGSearchResult(document_id="p1", text="Сцены насилия", score=0.9, metadata={"document_id": "doc2"}),
+    ])
+    kb = KnowledgeBase(rag_orchestrator=orchestrator, search_strategy=SearchStrategy.VECTOR_ONLY)
+    kb._rag_enabled = True
+
+    results = await kb.query("сцены насилия", top_k=1, filters={"document_id": "doc2"})
+
+    assert results[0]["document_id"] == "doc2"
+    assert orchestrator.search.await_args.kwargs["filter_metadata"] == {"document_id": "doc2"}
+
+
+@pytest.mark.asyncio
+async def test_blocks_without_criteria_matches_fall_back_to_whole_base():
+    reference = {"document_id": "other", "excerpt": "Сцены насилия", "score": 0.5}
+
+    async def query_many(texts, top_k, filters=None):
+        return [[] if filters else [reference] for _ in texts]
+
+    knowledge_base = MagicMock()
+    knowledge_base.query_many = AsyncMock(side_effect=query_many)
+    manager = AnalysisManager(knowledge_base, MagicMock())
+
+    references = await manager._fetch_references(["сцены насилия"], "criteria-doc")
+
+    assert references == [[reference]]
+    assert knowledge_base.query_many.await_args_list[0].kwargs["filters"] == {"document_id": "criteria-doc"}
@@ -41,3 +41,16 @@ def test_analyze_scene_detects_strong_language_and_updates_rating(engine: Simple
     # Правило для сильной лексики поднимает рейтинг минимум до 16+
     assert final_rating in {AgeRating.SIXTEEN_PLUS, AgeRating.EIGHTEEN_PLUS}
 
+
+
+def test_rule_automaton_is_rebuilt_only_for_a_new_document_version(engine: SimpleRulesEngine) -> None:
+    engine.analyze_scene("драка")
+    compiled = engine._rule_automaton()
+    engine.analyze_scene("кровь")
+    assert engine._rule_automaton() is compiled
+
+    engine.normative_doc.rules[0].keywords.append("поединок")
+    engine.normative_doc.version = "1.1"
+
+    assert engine._rule_automaton() is not compiled
+    assert [v.rule_id for v in engine.analyze_scene("начался поединок")] == [engine.normative_doc.rules[0].rule_id]
@@ -0,0 +1,62 @@
+"""
+Unit tests for cursor-based analysis status polling with ETags.
+"""
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+
+from app.infrastructure.services.analysis_manager import AnalysisManager
+from app.infrastructure.services.analysis_state import AnalysisState
+from app.presentation.api.main import create_app
+from app.presentation.api.routes import analysis as analysis_routes
+
+
+def _assessment(number):
+    return {
+        "scene_number": number,
+        "heading": f"Сцена {number}",
+        "page_range": "1",
+        "categories": {},
+        "age_rating": "0+",
+        "text": "текст",
+    }
+
+
+def _client(monkeypatch):
+    manager = AnalysisManager(MagicMock(), MagicMock())
+    state = AnalysisState({"analysis_id": "a1", "status": "processing", "progress": 0.0})
+    manager._analyses["a1"] = state
+
+    async def get_manager():
+        return manager
+
+    monkeypatch.setattr(analysis_routes, "get_analysis_manager", get_manager)
+    return TestClient(create_app()), state
+
+
+def test_since_block_returns_only_new_blocks(monkeypatch):
+    client, state = _client(monkeypatch)
+    for number in (1, 2, 3):
+        state.publish({"scene_assessments": _assessment(number), "progress": number * 30.0})
+
+    data = client.get("/api/analysis/status/a1", params={"since_block": 2}).json()
+
+    assert [block["scene_number"] for block in data["processed_blocks"]] == [3]
+    assert data["next_block"] == 3
+    caught_up = client.get("/api/analysis/status/a1", params={"since_block": 3}).json()
+    assert caught_up["processed_blocks"] is None
+
+
+def test_unchanged_poll_gets_not_modified(monkeypatch):
+    client, state = _client(monkeypatch)
+    state.publish({"scene_assessments": _assessment(1), "progress": 50.0})
+
+    first = client.get("/api/analysis/status/a1")
+    etag = first.headers["etag"]
+    repeat = client.get("/api/analysis/status/a1", headers={"If-None-Match": etag})
+
+    assert repeat.status_code == 304 and repeat.headers["etag"] == etag
+    assert repeat.content == b""
+
+    state.publish({"scene_assessments": _assessment(2), "progress": 100.0})
+    changed = client.get("/api/analysis/status/a1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
@@ -0,0 +1,80 @@
+"""
+Unit tests for index-time term ids and query-time overlap scoring.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGDocument, RAGOrchestrator
+from app.infrastructure.services.embedding_service import EmbeddingResult
+from app.infrastructure.services.text_tokenizer import (
+    count_overlap,
+    stem_russian,
+    term_ids,
+    tokenize,
+)
+from app.infrastructure.services.vector_database_service import VectorSearchResult
+
+
+def test_stemmer_collapses_russian_inflections():
+    assert stem_russian("насилие") == stem_russian("насилия") == stem_russian("насилием")
+    assert stem_russian("script") == "script"
+    assert tokenize("Ёлка ЁЖ") == ["елка", "еж"]
+
+
+def test_term_ids_are_sorted_and_overlap_counts_matches():
+    ids = term_ids(["Сцены насилия", "сцена насилия"])
+
+    assert ids == sorted(set(ids))
+    assert count_overlap(term_ids(["сцена насилием"]), ids) == 2
+    assert count_overlap(term_ids(["алкоголь"]), ids) == 0
+
+
+@pytest.fixture
+def orchestrator():
+    embedding_service = MagicMock()
+    embedding_service.embed_text = AsyncMock(return_value=EmbeddingResult(
+        text="query", embedding=[0.1] * 3, model="test-model", provider="mock",
+    ))
+    vector_db_service = MagicMock()
+    vector_db_service.upsert_documents = AsyncMock(return_value=["doc1"])
+    vector_db_service.search = AsyncMock(return_value=[])
+    return RAGOrchestrator(
+        embedding_service=embedding_service,
+        vector_db_service=vector_db_service,
+    )
+
+
+@pytest.mark.asyncio
+async def test_index_document_stores_term_ids_in_payload(orchestrator):
+    await orchestrator.index_document(
+        RAGDocument(id="doc1", text="Сцены насилия запрещены", metadata={"title": "Статья 5"}),
+        wait_for_indexing=True,
+    )
+
+    documents = orchestrator.vector_db_service.upsert_documents.await_args.args[0]
+    payload = documents[0]["payload"]
+    assert payload["term_ids"] == term_ids(["Сцены насилия запрещены"])
+    assert payload["metadata_term_ids"] == term_ids(["Статья 5"])
+    assert payload["token_count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_search_reranks_with_stored_term_ids(orchestrator):
+    orchestrator.vector_db_service.search = AsyncMock(return_value=[
+        VectorSearchResult(id="a", score=0.50, payload={
+            "text": "нейтральный текст",
+            "term_ids": term_ids(["нейтральный текст"]),
+            "metadata_term_ids": [],
+        }),
+        VectorSearchResult(id="b", score=0.45, payload={
+            # Stored ids win over the raw text, so rerank never re-tokenizes it
+            "text": "",
+            "term_ids": term_ids(["сцены насилия"]),
+            "metadata_term_ids": [],
+        }),
+    ])
+
+    results = await orchestrator.search("насилие в сцене", top_k=2)
+
+    assert [r.document_id for r in results] == ["b", "a"]
+    assert "term_ids" not in results[0].metadata
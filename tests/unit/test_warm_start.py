@@ -0,0 +1,105 @@
+"""
+Unit tests for restoring the knowledge base from the vector store.
+"""
+import asyncio
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.domain.services.rag_orchestrator import RAGDocument, RAGOrchestrator
+from app.infrastructure.services.knowledge_base import KnowledgeBase, SearchStrategy
+from app.infrastructure.services.vector_database_service import VectorSearchResult
+
+
+def _point(document_id, paragraph, text):
+    return VectorSearchResult(id=str(uuid.uuid4()), score=0.0, payload={
+        "text": text,
+        "document_id": document_id,
+        "document_title": "ФЗ-436",
+        "page": 1,
+        "paragraph": paragraph,
+        "embedding_model": "mock",
+        "term_ids": [1, 2],
+    })
+
+
+def _make_orchestrator(pages):
+    async def scroll_payloads(page_size):
+        for page in pages:
+            yield page
+
+    vector_db_service = MagicMock()
+    vector_db_service.scroll_payloads = scroll_payloads
+    return RAGOrchestrator(embedding_service=MagicMock(), vector_db_service=vector_db_service)
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_streams_documents_without_index_fields():
+    point = _point("doc1", 1, "Сцены насилия")
+    orchestrator = _make_orchestrator([[point]])
+
+    pages = [page async for page in orchestrator.iter_indexed_documents(page_size=10)]
+
+    document = pages[0][0]
+    assert isinstance(document, RAGDocument)
+    assert document.id == point.id and document.text == "Сцены насилия"
+    assert "term_ids" not in document.metadata and "embedding_model" not in document.metadata
+    assert document.metadata["document_id"] == "doc1"
+
+
+@pytest.mark.asyncio
+async def test_warm_start_rebuilds_lexical_index_from_payloads():
+    # Paragraphs of one document arrive out of order and across pages
+    second = _point("doc1", 2, "Употребление алкоголя")
+    first = _point("doc1", 1, "Сцены насилия")
+    orchestrator = _make_orchestrator([[second], [first, _point("doc2", 1, "Нецензурная брань")]])
+    orchestrator.delete_documents = AsyncMock()
+    kb = KnowledgeBase(rag_orchestrator=orchestrator, search_strategy=SearchStrategy.TFIDF_ONLY)
+    kb._rag_enabled = True
+
+    kb.start_warm_start(page_size=1)
+    assert not kb.is_ready
+    assert await kb.wait_until_ready(timeout=5)
+
+    entries = [entry for entry in kb.get_entries() if entry.document_id == "doc1"]
+    assert [entry.entry_id for entry in entries] == [first.id, second.id]
+    assert entries[1].categories == ["alcohol_drugs"]
+    assert entries[1].metadata == {}
+
+    results = await kb.query("нецензурная брань", top_k=1)
+    assert results[0]["document_id"] == "doc2"
+    assert kb.get_search_metrics()["warm_start_entries"] == 3
+
+    # Point ids are kept, so removal reaches the stored vectors
+    await kb.remove_document("doc1")
+    orchestrator.delete_documents.assert_awaited_once_with(
+        [first.id, second.id], ["Сцены насилия", "Употребление алкоголя"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_document_removed_during_warm_start_is_not_restored():
+    stale = _point("doc1", 1, "Сцены насилия")
+    kept = _point("doc2", 1, "Нецензурная брань")
+    gate = asyncio.Event()
+
+    async def scroll_payloads(page_size):
+        yield [stale]
+        await gate.wait()
+        yield [kept]
+
+    orchestrator = _make_orchestrator([])
+    orchestrator.vector_db_service.scroll_payloads = scroll_payloads
+    orchestrator.delete_documents = AsyncMock()
+    kb = KnowledgeBase(rag_orchestrator=orchestrator, search_strategy=SearchStrategy.TFIDF_ONLY)
+    kb._rag_enabled = True
+
+    kb.start_warm_start(page_size=1)
+    await asyncio.sleep(0.01)
+    await kb.remove_document("doc1")
+    gate.set()
+    assert await kb.wait_until_ready(timeout=5)
+
+    assert {entry.document_id for entry in kb.get_entries()} == {"doc2"}
+    orchestrator.delete_documents.assert_awaited_once_with([stale.id], ["Сцены насилия"])